@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+对比 IVF 近似最近邻索引与精确搜索的 recall@1 和查询延迟。
+使用合成的 128 维人脸编码（每人若干条带噪声的样本）。
+使用方法：
+    python scripts/benchmark_ann_index.py --sizes 1000 10000 100000
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# 添加 src 目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root / "src"))
+
+from ann_index import IVFIndex
+from face_gallery import FaceGallery
+
+
+def make_gallery(size, per_person, rng, index=None):
+    """生成合成图库：身份中心间距约 1.0，同一身份内噪声约 0.3"""
+    people = max(1, size // per_person)
+    centers = rng.normal(scale=1.0 / np.sqrt(2 * 128), size=(people, 128)) * np.sqrt(2)
+    labels = rng.integers(0, people, size=size)
+    encodings = centers[labels] + rng.normal(scale=0.3 / np.sqrt(128), size=(size, 128))
+
+    gallery = FaceGallery(capacity=size, index=index)
+    gallery.add_many(encodings, [f"person_{label}" for label in labels])
+    return gallery, centers
+
+
+def time_queries(gallery, queries):
+    """逐条查询（模拟每帧少量人脸），返回结果和平均延迟（毫秒）"""
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.extend(gallery.match(query[None, :]))
+    elapsed = time.perf_counter() - start
+    return results, elapsed / len(queries) * 1000
+
+
+def run(size, args, rng):
+    exact, centers = make_gallery(size, args.per_person, rng)
+
+    index = IVFIndex(nprobe=args.nprobe, min_size=0, target_recall=args.target_recall)
+    build_start = time.perf_counter()
+    approx = FaceGallery(capacity=size, index=index)
+    approx.add_many(exact.encodings, [exact.names[label] for label in exact.labels])
+    build_time = time.perf_counter() - build_start
+
+    picks = rng.integers(0, len(centers), size=args.queries)
+    queries = centers[picks] + rng.normal(scale=0.3 / np.sqrt(128), size=(args.queries, 128))
+
+    exact_results, exact_ms = time_queries(exact, queries)
+    approx_results, approx_ms = time_queries(approx, queries)
+
+    hits = sum(
+        a['name'] == e['name'] and abs(a['distance'] - e['distance']) < 1e-5
+        for a, e in zip(approx_results, exact_results)
+    )
+    return {
+        'size': size,
+        'nlist': len(index.centroids),
+        'nprobe': index.nprobe,
+        'build_s': build_time,
+        'recall': hits / args.queries,
+        'exact_ms': exact_ms,
+        'ann_ms': approx_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IVF index against exact search")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--per-person', type=int, default=5)
+    parser.add_argument('--nprobe', type=int, default=8)
+    parser.add_argument('--target-recall', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'size':>8} {'nlist':>6} {'nprobe':>6} {'build(s)':>9} "
+          f"{'recall@1':>9} {'exact(ms)':>10} {'ann(ms)':>8} {'speedup':>8}")
+    for size in args.sizes:
+        r = run(size, args, rng)
+        print(f"{r['size']:>8} {r['nlist']:>6} {r['nprobe']:>6} {r['build_s']:>9.2f} "
+              f"{r['recall']:>9.3f} {r['exact_ms']:>10.3f} {r['ann_ms']:>8.3f} "
+              f"{r['exact_ms'] / r['ann_ms']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
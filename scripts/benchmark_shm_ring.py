@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+对比跨进程传递 640x480 BGR 帧的两种方式：
+1. multiprocessing.Queue（每帧 pickle + 管道复制）
+2. SharedFrameRing（共享内存槽，只传递槽号和序号）
+生产者按目标帧率写帧，消费者读取并做一次轻量处理（均值），统计送达率、
+发布到读取的延迟和双方每帧的 CPU 时间。
+使用方法：
+    python scripts/benchmark_shm_ring.py --fps 30 60 --seconds 5
+"""
+
+import sys
+import time
+import queue
+import argparse
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+
+# 添加 src 目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from utils.shm_ring import SharedFrameRing
+
+FRAME_SHAPE = (480, 640, 3)
+
+
+def _pace(start, index, fps):
+    """等待到第 index 帧的发布时间"""
+    if fps:
+        delay = start + index / fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _make_frames(count=8):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, FRAME_SHAPE, dtype=np.uint8) for _ in range(count)]
+
+
+def queue_producer(frame_queue, fps, frame_count, results):
+    frames = _make_frames()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    dropped = 0
+    for i in range(frame_count):
+        _pace(start, i, fps)
+        try:
+            # 限速时队列满则丢帧（与实时采集一致），不限速时阻塞以测量最大吞吐
+            frame_queue.put((i, time.time(), frames[i % len(frames)]), block=not fps)
+        except queue.Full:
+            dropped += 1
+    frame_queue.put(None)
+    results.put(('producer', time.process_time() - cpu_start, time.perf_counter() - start, dropped))
+
+
+def queue_consumer(frame_queue, results):
+    latencies = []
+    cpu_start = time.process_time()
+    while True:
+        item = frame_queue.get()
+        if item is None:
+            break
+        _, timestamp, frame = item
+        frame[::8, ::8].mean()
+        latencies.append(time.time() - timestamp)
+    results.put(('consumer', time.process_time() - cpu_start, latencies))
+
+
+def ring_producer(ring, fps, frame_count, done, results):
+    frames = _make_frames()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    dropped = 0
+    for i in range(frame_count):
+        _pace(start, i, fps)
+        # 模拟采集设备直接写入共享槽（cap.read(view) 同样只写一次）
+        slot, view = ring.begin_write()
+        if slot is None:
+            dropped += 1
+            continue
+        np.copyto(view, frames[i % len(frames)])
+        ring.commit(slot)
+    done.set()
+    results.put(('producer', time.process_time() - cpu_start, time.perf_counter() - start, dropped))
+
+
+def ring_consumer(ring, done, results):
+    latencies = []
+    last_seq = 0
+    cpu_start = time.process_time()
+    while True:
+        item = ring.acquire_latest(last_seq, timeout=0.1)
+        if item is None:
+            if done.is_set():
+                break
+            continue
+        slot, last_seq, timestamp, frame = item
+        frame[::8, ::8].mean()
+        latencies.append(time.time() - timestamp)
+        ring.release(slot)
+    results.put(('consumer', time.process_time() - cpu_start, latencies))
+
+
+def run(transport, fps, seconds, args, context):
+    frame_count = int(fps * seconds) if fps else args.max_frames
+    results = context.Queue()
+
+    if transport == 'queue':
+        frame_queue = context.Queue(maxsize=args.depth)
+        producer = context.Process(target=queue_producer, args=(frame_queue, fps, frame_count, results))
+        consumer = context.Process(target=queue_consumer, args=(frame_queue, results))
+        ring = None
+    else:
+        ring = SharedFrameRing(FRAME_SHAPE, slots=args.depth, context=context)
+        done = context.Event()
+        producer = context.Process(target=ring_producer, args=(ring, fps, frame_count, done, results))
+        consumer = context.Process(target=ring_consumer, args=(ring, done, results))
+
+    consumer.start()
+    producer.start()
+    stats = {}
+    for _ in range(2):
+        role, *values = results.get()
+        stats[role] = values
+    for process in (producer, consumer):
+        process.join()
+    if ring is not None:
+        ring.close()
+
+    producer_cpu, elapsed, dropped = stats['producer']
+    consumer_cpu, latencies = stats['consumer']
+    latencies = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    delivered = len(latencies)
+    return {
+        'transport': transport,
+        'fps': fps or 'max',
+        'delivered': f"{delivered}/{frame_count}",
+        'rate': delivered / elapsed,
+        'p50': np.percentile(latencies, 50),
+        'p99': np.percentile(latencies, 99),
+        'producer_cpu': producer_cpu / frame_count * 1000,
+        'consumer_cpu': consumer_cpu / max(delivered, 1) * 1000,
+        'dropped': dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared-memory frame ring against multiprocessing.Queue")
+    parser.add_argument('--fps', type=float, nargs='+', default=[30, 60], help="0 = as fast as possible")
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--depth', type=int, default=4, help="queue depth / ring slots")
+    parser.add_argument('--max-frames', type=int, default=600, help="frames for --fps 0")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+
+    print(f"{'transport':>9} {'fps':>5} {'delivered':>10} {'frames/s':>9} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'prod CPU ms':>12} {'cons CPU ms':>12} {'dropped':>8}")
+    for fps in args.fps:
+        for transport in ('queue', 'shm'):
+            r = run(transport, fps, args.seconds, args, context)
+            print(f"{r['transport']:>9} {r['fps']:>5} {r['delivered']:>10} {r['rate']:>9.1f} "
+                  f"{r['p50']:>8.2f} {r['p99']:>8.2f} {r['producer_cpu']:>12.3f} "
+                  f"{r['consumer_cpu']:>12.3f} {r['dropped']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+将现有的人脸数据转换为共享图库文件（见 src/gallery_store.py）。
+来源：
+1. data/faces/<人名>/*.jpg（复用编码缓存，只编码新图像）
+2. data/master_face_encoding.pkl（face_memory_train.py 保存的主人编码）
+使用方法：
+    python scripts/convert_gallery.py --output data/face_gallery.bin --dtype int8
+"""
+
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+# 添加 src 目录到 Python 路径（需排在已安装的 face_recognition 包之前）
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from face_recognition import FaceRecognition
+from frame_processor import build_gallery_options
+from gallery_store import GalleryFile, write_gallery
+from utils.settings import load_settings
+from utils.storage_utils import load_encoding
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert face data to a memory-mapped gallery file")
+    parser.add_argument('--config', default='config/settings.yaml')
+    parser.add_argument('--output', default=None, help="defaults to face_recognition.gallery_file")
+    parser.add_argument('--dtype', choices=['float32', 'float16', 'int8'], default='float32')
+    parser.add_argument('--pickle', default=None, help="defaults to encoding_output_path")
+    parser.add_argument('--pickle-name', default='master', help="name for the pickled encoding")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    settings = load_settings(args.config)
+
+    output = args.output or settings.face_recognition.gallery_file or 'data/face_gallery.bin'
+    pickle_path = Path(args.pickle or settings.encoding_output_path)
+
+    # 扫描 data/faces（不读取已有的图库文件），按 compaction 配置压缩为原型
+    recognizer = FaceRecognition(
+        cache_path=settings.face_recognition.encoding_cache,
+        load_workers=settings.face_recognition.load_workers,
+        gallery_options=build_gallery_options(settings)
+    )
+    gallery = recognizer.gallery
+
+    if pickle_path.exists():
+        gallery.add(load_encoding(pickle_path), args.pickle_name)
+        print(f"Added pickled encoding from {pickle_path} as '{args.pickle_name}'")
+
+    raw_encodings, raw_labels = gallery.raw_encodings()
+    write_gallery(output, gallery.encodings, gallery.labels, gallery.names, dtype=args.dtype,
+                  raw_encodings=raw_encodings, raw_labels=raw_labels)
+
+    # 校验：重新映射并比较
+    check = GalleryFile(output)
+    error = abs(check.float32_encodings() - gallery.encodings).max() if len(check) else 0.0
+    print(f"✅ {len(check)} encodings of {len(check.names)} people written to {output} "
+          f"({args.dtype}, max abs error {error:.2e})")
+
+
+if __name__ == "__main__":
+    main()
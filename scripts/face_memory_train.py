@@ -8,37 +8,54 @@
 4. 按 'q' 键退出
 """
 
-import cv2
-import yaml
 import os
+import sys
+from pathlib import Path
+
+import cv2
+
+# 添加 src 目录到 Python 路径（排在已安装的 face_recognition 包之后）
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root / "src"))
+
 from utils.camera_utils import get_camera_stream
-from utils.face_utils import encode_face
+from utils.face_utils import FaceDetector
+from utils.settings import load_settings
 from utils.storage_utils import save_encoding
 
-config = yaml.safe_load(open("config/settings.yaml"))
-camera = get_camera_stream(config['camera_index'])
 
-print("📷 请正对摄像头，准备拍摄主人面孔。按 's' 拍摄，'q' 退出。")
+def main():
+    settings = load_settings()
+    detector = FaceDetector(settings)
+    camera = get_camera_stream(settings.camera_index)
 
-while True:
-    ret, frame = camera.read()
-    if not ret:
-        continue
-    cv2.imshow("Master Face Capture", frame)
-    key = cv2.waitKey(1) & 0xFF
+    print("📷 请正对摄像头，准备拍摄主人面孔。按 's' 拍摄，'q' 退出。")
 
-    if key == ord('s'):
-        encoding = encode_face(frame)
-        if encoding is not None:
-            os.makedirs("data", exist_ok=True)
-            save_encoding(config['encoding_output_path'], encoding)
-            print("✅ 主人脸部编码已保存！")
+    frame_buffer = None  # 复用的采集缓冲，避免每帧分配
+    while True:
+        ret, frame = camera.read(frame_buffer)
+        if not ret:
+            continue
+        frame_buffer = frame
+        cv2.imshow("Master Face Capture", frame)
+        key = cv2.waitKey(1) & 0xFF
+
+        if key == ord('s'):
+            encoding = detector.encode_face(frame)
+            if encoding is not None:
+                os.makedirs("data", exist_ok=True)
+                save_encoding(settings.encoding_output_path, encoding)
+                print("✅ 主人脸部编码已保存！")
+                break
+            else:
+                print("⚠️ 未检测到人脸，请重试。")
+        elif key == ord('q'):
+            print("❌ 退出采集")
             break
-        else:
-            print("⚠️ 未检测到人脸，请重试。")
-    elif key == ord('q'):
-        print("❌ 退出采集")
-        break
-
-camera.release()
-cv2.destroyAllWindows() 
\ No newline at end of file
+
+    camera.release()
+    cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ import json
 # 添加项目根目录到 Python 路径
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
+sys.path.append(str(project_root / "src"))
 
 from src.owner_cognition.memory_store import MemoryStore
 from src.owner_cognition.bond_evaluator import BondEvaluator
@@ -1,34 +1,24 @@
 import cv2
-import yaml
 import logging
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 class Camera:
-    def __init__(self, config_path="config/settings.yaml"):
-        """Initialize camera with settings from config file."""
-        self.config = self._load_config(config_path)
+    def __init__(self, settings):
+        """Initialize camera with the camera section of the loaded settings."""
+        self.settings = settings.camera
         self.camera = None
+        self._frame_buffer = None
         self._initialize_camera()
 
-    def _load_config(self, config_path):
-        """Load camera configuration from YAML file."""
-        try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
-            return config['camera']
-        except Exception as e:
-            logger.error(f"Failed to load camera config: {e}")
-            raise
-
     def _initialize_camera(self):
         """Initialize camera with configured settings."""
         try:
-            self.camera = cv2.VideoCapture(self.config['device_id'])
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.config['width'])
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config['height'])
-            self.camera.set(cv2.CAP_PROP_FPS, self.config['fps'])
+            self.camera = cv2.VideoCapture(self.settings.device_id)
+            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.settings.width)
+            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.settings.height)
+            self.camera.set(cv2.CAP_PROP_FPS, self.settings.fps)
             
             if not self.camera.isOpened():
                 raise RuntimeError("Failed to open camera")
@@ -39,14 +29,15 @@ class Camera:
             raise
 
     def capture_frame(self):
-        """Capture a single frame from the camera."""
+        """Capture a single frame into a reused buffer (valid until the next call)."""
         if not self.camera:
             raise RuntimeError("Camera not initialized")
         
-        ret, frame = self.camera.read()
+        ret, frame = self.camera.read(self._frame_buffer)
         if not ret:
             raise RuntimeError("Failed to capture frame")
         
+        self._frame_buffer = frame
         return frame
 
     def release(self):
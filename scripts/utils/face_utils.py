@@ -7,43 +7,39 @@ import cv2
 import numpy as np
 import face_recognition
 import logging
-import yaml
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 class FaceDetector:
-    def __init__(self, config_path="config/settings.yaml"):
-        """Initialize face detector with settings from config file."""
-        self.config = self._load_config(config_path)
-        self.face_recognition_config = self.config['face_recognition']
+    def __init__(self, settings):
+        """Initialize face detector with the loaded settings (see utils.settings.load_settings)."""
+        self.model = settings.training.face_encoding_model
+        self.tolerance = settings.face_recognition.tolerance
+        self._rgb_buffer = None
 
-    def _load_config(self, config_path):
-        """Load face recognition configuration from YAML file."""
-        try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load face recognition config: {e}")
-            raise
+    def _to_rgb(self, frame):
+        """Convert BGR to RGB into a reused contiguous buffer (valid until the next call)."""
+        if self._rgb_buffer is None or self._rgb_buffer.shape != frame.shape:
+            self._rgb_buffer = np.empty_like(frame)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
 
     def detect_faces(self, frame):
         """Detect faces in the given frame."""
         # Convert BGR to RGB
-        rgb_frame = frame[:, :, ::-1]
+        rgb_frame = self._to_rgb(frame)
         
         # Detect face locations
         face_locations = face_recognition.face_locations(
             rgb_frame,
-            model=self.config['training']['face_encoding_model']
+            model=self.model
         )
         
         return face_locations
 
     def encode_face(self, frame):
         """Encode face features from the given frame."""
-        rgb = frame[:, :, ::-1]  # BGR to RGB
+        rgb = self._to_rgb(frame)  # BGR to RGB
         face_locations = face_recognition.face_locations(rgb)
         if not face_locations:
             return None
@@ -58,7 +54,7 @@ class FaceDetector:
         matches = face_recognition.compare_faces(
             [known_encoding],
             face_encoding,
-            tolerance=self.face_recognition_config['tolerance']
+            tolerance=self.tolerance
         )
         
         return matches[0]
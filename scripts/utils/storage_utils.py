@@ -6,28 +6,17 @@
 import pickle
 import cv2
 import logging
-import yaml
 from pathlib import Path
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 class StorageManager:
-    def __init__(self, config_path="config/settings.yaml"):
-        """Initialize storage manager with settings from config file."""
-        self.config = self._load_config(config_path)
+    def __init__(self, settings):
+        """Initialize storage manager with the loaded settings (see utils.settings.load_settings)."""
+        self.save_images = settings.logging.save_images
         self._setup_directories()
 
-    def _load_config(self, config_path):
-        """Load storage configuration from YAML file."""
-        try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load storage config: {e}")
-            raise
-
     def _setup_directories(self):
         """Create necessary directories if they don't exist."""
         # Create data directory
@@ -71,7 +60,7 @@ class StorageManager:
 
     def save_face_image(self, frame, face_location):
         """Save captured face image."""
-        if not self.config['logging']['save_images']:
+        if not self.save_images:
             return
             
         try:
@@ -0,0 +1,241 @@
+import logging
+import math
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    倒排文件（IVF）近似最近邻索引
+
+    用 k-means 将图库编码划分为 nlist 个簇，查询时只扫描距离最近的 nprobe 个簇。
+    图库规模低于 min_size 时不启用，由调用方退回精确搜索。
+    """
+
+    def __init__(self, dim=128, nlist=None, nprobe=8, min_size=2000,
+                 target_recall=None, train_iters=10, seed=0):
+        """
+        初始化索引
+
+        Args:
+            dim (int): 编码维度
+            nlist (int): 簇数量，为None时按 4*sqrt(N) 自动选择
+            nprobe (int): 每次查询扫描的簇数量
+            min_size (int): 启用索引的最小图库规模，低于该值使用精确搜索
+            target_recall (float): 目标 recall@1，设置后重建时自动调节 nprobe
+            train_iters (int): k-means 迭代次数
+            seed (int): 随机种子
+        """
+        self.logger = logging.getLogger(__name__)
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_size = min_size
+        self.target_recall = target_recall
+        self.train_iters = train_iters
+        self.rng = np.random.default_rng(seed)
+
+        self.centroids = None
+        self.trained_size = 0
+        self._lists = []
+        self._pending = []
+
+    def clone(self):
+        """
+        创建参数相同、尚未训练的新索引
+
+        Returns:
+            IVFIndex: 新索引
+        """
+        return IVFIndex(
+            dim=self.dim,
+            nlist=self.nlist,
+            nprobe=self.nprobe,
+            min_size=self.min_size,
+            target_recall=self.target_recall,
+            train_iters=self.train_iters,
+            seed=int(self.rng.integers(1 << 31))
+        )
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def is_active(self, size):
+        """
+        判断当前图库规模下是否使用索引
+
+        Args:
+            size (int): 图库编码数量
+
+        Returns:
+            bool: 是否使用近似搜索
+        """
+        return self.is_trained and size >= self.min_size
+
+    def needs_rebuild(self, size):
+        """图库跨过启用阈值或规模翻倍后需要重新训练"""
+        if size < self.min_size:
+            return False
+        return not self.is_trained or size >= 2 * self.trained_size
+
+    def _nearest_centroids(self, vectors, count=1, chunk_size=8192):
+        """分块计算每个向量最近的 count 个簇中心"""
+        centroid_sq = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        result = np.empty((vectors.shape[0], count), dtype=np.int64)
+
+        for start in range(0, vectors.shape[0], chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            # |c|^2 - 2 x·c，省略与簇无关的 |x|^2
+            scores = chunk @ self.centroids.T
+            scores *= -2.0
+            scores += centroid_sq[None, :]
+            if count == 1:
+                result[start:start + chunk_size, 0] = np.argmin(scores, axis=1)
+            else:
+                part = np.argpartition(scores, count - 1, axis=1)[:, :count]
+                order = np.argsort(np.take_along_axis(scores, part, axis=1), axis=1)
+                result[start:start + chunk_size] = np.take_along_axis(part, order, axis=1)
+
+        return result
+
+    def _train(self, vectors, nlist):
+        """在（采样后的）向量上训练 k-means 簇中心"""
+        max_train = 64 * nlist
+        if vectors.shape[0] > max_train:
+            sample = self.rng.choice(vectors.shape[0], max_train, replace=False)
+            vectors = vectors[sample]
+
+        init = self.rng.choice(vectors.shape[0], nlist, replace=False)
+        self.centroids = vectors[init].copy()
+
+        for _ in range(self.train_iters):
+            assign = self._nearest_centroids(vectors)[:, 0]
+            counts = np.bincount(assign, minlength=nlist)
+            sums = np.stack([
+                np.bincount(assign, weights=vectors[:, j], minlength=nlist)
+                for j in range(self.dim)
+            ], axis=1).astype(np.float32)
+
+            empty = counts == 0
+            counts[empty] = 1
+            self.centroids = sums / counts[:, None]
+
+            # 空簇用随机样本重新初始化
+            if empty.any():
+                reseed = self.rng.choice(vectors.shape[0], int(empty.sum()), replace=False)
+                self.centroids[empty] = vectors[reseed]
+
+    def build(self, encodings):
+        """
+        在全部图库编码上重建索引
+
+        Args:
+            encodings: (N, dim) 图库编码矩阵，行号即返回的候选编号
+        """
+        encodings = np.asarray(encodings, dtype=np.float32)
+        size = encodings.shape[0]
+        if size == 0:
+            return
+
+        nlist = self.nlist or max(1, int(round(4 * math.sqrt(size))))
+        nlist = min(nlist, size)
+        self._train(encodings, nlist)
+
+        assign = self._nearest_centroids(encodings)[:, 0]
+        order = np.argsort(assign, kind='stable')
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(nlist)]
+        self._pending = [[] for _ in range(nlist)]
+        self.trained_size = size
+
+        if self.target_recall is not None:
+            self.tune(encodings, self.target_recall)
+
+        self.logger.info(
+            f"ANN index built: {size} encodings, {nlist} lists, nprobe={self.nprobe}"
+        )
+
+    def add(self, rows, encodings):
+        """
+        增量插入编码（分配到最近的簇，不重新训练）
+
+        Args:
+            rows: 新编码在图库中的行号
+            encodings: (N, dim) 新编码
+        """
+        if not self.is_trained:
+            return
+
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        assign = self._nearest_centroids(encodings)[:, 0]
+        for row, list_id in zip(np.atleast_1d(rows), assign):
+            self._pending[list_id].append(int(row))
+
+    def _list(self, list_id):
+        """返回簇的成员行号，合并增量插入的待处理项"""
+        pending = self._pending[list_id]
+        if pending:
+            self._lists[list_id] = np.concatenate(
+                [self._lists[list_id], np.asarray(pending, dtype=np.int64)]
+            )
+            pending.clear()
+        return self._lists[list_id]
+
+    def candidates(self, queries, nprobe=None):
+        """
+        为每个查询返回候选行号
+
+        Args:
+            queries: (N, dim) 查询编码
+            nprobe (int): 扫描的簇数量，默认使用 self.nprobe
+
+        Returns:
+            list: 每个查询一个行号数组
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        nprobe = min(nprobe or self.nprobe, len(self._lists))
+        probes = self._nearest_centroids(queries, count=nprobe)
+        return [
+            np.concatenate([self._list(list_id) for list_id in probe])
+            for probe in probes
+        ]
+
+    def tune(self, encodings, target_recall, sample_size=200, noise=0.3):
+        """
+        按目标 recall@1 自动选择最小的 nprobe
+
+        以加噪的图库样本作为查询，与精确搜索结果比较。
+
+        Args:
+            encodings: (N, dim) 图库编码矩阵
+            target_recall (float): 目标 recall@1
+            sample_size (int): 用于评估的查询数量
+            noise (float): 查询噪声的期望范数（与同一人多次采集的编码差异相当）
+
+        Returns:
+            int: 选定的 nprobe
+        """
+        size = encodings.shape[0]
+        sample = self.rng.choice(size, min(sample_size, size), replace=False)
+        queries = encodings[sample] + self.rng.normal(
+            scale=noise / math.sqrt(self.dim), size=(len(sample), self.dim)
+        ).astype(np.float32)
+
+        sq_norms = np.einsum('ij,ij->i', encodings, encodings)
+        exact = np.argmin(sq_norms[None, :] - 2.0 * queries @ encodings.T, axis=1)
+
+        nprobe = 1
+        while nprobe < len(self._lists):
+            hits = 0
+            for query, expected, rows in zip(queries, exact, self.candidates(queries, nprobe)):
+                if len(rows) == 0:
+                    continue
+                scores = sq_norms[rows] - 2.0 * encodings[rows] @ query
+                hits += rows[np.argmin(scores)] == expected
+            if hits / len(queries) >= target_recall:
+                break
+            nprobe *= 2
+
+        self.nprobe = min(nprobe, len(self._lists))
+        return self.nprobe
@@ -0,0 +1,505 @@
+"""
+多摄像头：每路摄像头一个采集 + 识别工作进程，共享同一个只读图库文件，
+识别事件经队列汇总后按采集时间合并为带摄像头编号的单一有序事件流。
+"""
+
+import os
+import time
+import heapq
+import queue
+import hashlib
+import logging
+import threading
+import multiprocessing
+from pathlib import Path
+
+import cv2
+
+from face_recognition import FaceRecognition
+from frame_processor import build_gallery_options, start_frame_processor
+from gallery_store import write_gallery
+from gallery_watcher import GalleryWatcher
+from recognition_events import build_event_subscribers, build_recognition_events
+from utils import metrics
+from utils.camera import Camera
+from utils.frame_sources import create_frame_source
+from utils.logger import setup_logger, shutdown_logger
+from utils.shm_ring import SharedFrameRing
+
+DEFAULT_GALLERY_FILE = "data/face_gallery.bin"
+FACES_DIR = "data/faces"
+
+
+def pin_to_cpus(cpus):
+    """
+    将当前进程绑定到指定 CPU 集合（不支持的平台上忽略）
+
+    Args:
+        cpus: CPU 编号列表，为空时不绑定
+
+    Returns:
+        set: 实际生效的 CPU 集合，未绑定时为 None
+    """
+    if not cpus or not hasattr(os, 'sched_setaffinity'):
+        return None
+    os.sched_setaffinity(0, set(cpus))
+    # OpenCV 内部线程数与绑定的核数一致，避免多个进程争抢
+    cv2.setNumThreads(len(cpus))
+    return os.sched_getaffinity(0)
+
+
+def face_set_signature(faces_dir=FACES_DIR):
+    """
+    计算人脸图像集合的签名（文件列表、大小和修改时间）
+
+    Args:
+        faces_dir: 人脸图像目录
+
+    Returns:
+        str: 签名（十六进制）
+    """
+    faces_dir = Path(faces_dir)
+    digest = hashlib.sha1()
+    if faces_dir.exists():
+        for path in sorted(faces_dir.glob("*/*.jpg")):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            digest.update(f"{path.relative_to(faces_dir)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _signature_path(gallery_path):
+    """图库文件旁记录人脸图像签名的文件"""
+    return Path(f"{gallery_path}.faces")
+
+
+def shared_gallery_stale(gallery_path, signature):
+    """
+    判断共享图库文件是否需要重新生成
+
+    Args:
+        gallery_path: 图库文件路径
+        signature (str): 当前人脸图像集合的签名（见 face_set_signature）
+
+    Returns:
+        bool: 文件不存在、签名不一致或有图像比文件新时为 True
+    """
+    gallery_path = Path(gallery_path)
+    if not gallery_path.exists():
+        return True
+    signature_path = _signature_path(gallery_path)
+    if signature_path.exists():
+        return signature_path.read_text(encoding='utf-8').strip() != signature
+
+    # 外部生成的文件（如 scripts/convert_gallery.py）没有签名，按修改时间判断
+    mtime = gallery_path.stat().st_mtime_ns
+    return any(path.stat().st_mtime_ns > mtime for path in Path(FACES_DIR).glob("*/*.jpg"))
+
+
+def write_shared_gallery(settings, gallery_path, signature):
+    """
+    扫描 data/faces 生成共享图库文件
+
+    按 compaction 配置压缩后写入原型，开启精确复核时原始编码写入单独的段，
+    工作进程直接映射，不再各自压缩或复制。文件先写临时文件再原子替换，
+    工作进程的 GalleryWatcher 检测到文件变化后重新映射。
+
+    Args:
+        settings (Settings): 配置对象
+        gallery_path: 图库文件路径
+        signature (str): 扫描前计算的人脸图像签名，扫描期间新增的图像留待下次生成
+
+    Returns:
+        int: 写入的编码数量
+    """
+    recognition = settings.face_recognition
+    # 不传 gallery_path：总是扫描 data/faces（编码缓存保证只编码新图像）
+    recognizer = FaceRecognition(
+        cache_path=recognition.encoding_cache,
+        load_workers=recognition.load_workers,
+        load_chunk_size=recognition.load_chunk_size,
+        gallery_options=build_gallery_options(settings)
+    )
+    gallery = recognizer.gallery
+    raw_encodings, raw_labels = gallery.raw_encodings()
+    write_gallery(gallery_path, gallery.encodings, gallery.labels, gallery.names,
+                  raw_encodings=raw_encodings, raw_labels=raw_labels)
+
+    signature_path = _signature_path(gallery_path)
+    temp_path = signature_path.with_name(f"{signature_path.name}.tmp")
+    temp_path.write_text(signature, encoding='utf-8')
+    os.replace(temp_path, signature_path)
+    return len(gallery)
+
+
+def prepare_shared_gallery(settings):
+    """
+    确保存在供所有工作进程映射的最新图库文件
+
+    文件不存在、data/faces 中的图像集合已变化或有图像比文件新时重新生成。
+
+    Args:
+        settings (Settings): 配置对象
+
+    Returns:
+        str: 图库文件路径
+    """
+    gallery_path = settings.face_recognition.gallery_file or DEFAULT_GALLERY_FILE
+    signature = face_set_signature()
+    if shared_gallery_stale(gallery_path, signature):
+        write_shared_gallery(settings, gallery_path, signature)
+    return gallery_path
+
+
+class SharedGalleryWriter(threading.Thread):
+    def __init__(self, settings, gallery_path, interval=2.0):
+        """
+        初始化共享图库更新线程（主进程）
+
+        定期计算 data/faces 的签名，变化时重新生成共享图库文件，
+        各工作进程的 GalleryWatcher 再从文件重新映射。
+
+        Args:
+            settings (Settings): 配置对象
+            gallery_path: 图库文件路径
+            interval (float): 轮询间隔（秒）
+        """
+        super().__init__(name="SharedGalleryWriter", daemon=True)
+        self.settings = settings
+        self.gallery_path = gallery_path
+        self.interval = interval
+        self.logger = logging.getLogger(__name__)
+
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """轮询循环"""
+        while not self._stop_event.wait(self.interval):
+            try:
+                signature = face_set_signature()
+                if not shared_gallery_stale(self.gallery_path, signature):
+                    continue
+                start = time.perf_counter()
+                count = write_shared_gallery(self.settings, self.gallery_path, signature)
+                self.logger.info(
+                    f"Shared gallery {self.gallery_path} rewritten in "
+                    f"{time.perf_counter() - start:.2f}s: {count} encodings"
+                )
+            except Exception as e:
+                self.logger.error(f"Shared gallery rewrite failed: {str(e)}")
+
+    def stop(self):
+        """停止更新线程"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=self.interval + 1)
+
+
+def camera_worker(camera_id, worker_index, settings, camera_settings, gallery_path, event_queue,
+                  stop_event, frame_ring=None):
+    """
+    单路摄像头的工作进程入口
+
+    Args:
+        camera_id: 摄像头编号（事件中的 camera_id）
+        worker_index (int): 工作进程序号
+        settings (Settings): 配置对象（随进程参数传入，工作进程不再读取配置文件）
+        camera_settings (CameraSettings): 该摄像头的配置（已合并默认的 camera 部分）
+        gallery_path (str): 共享图库文件路径
+        event_queue: 识别事件队列
+        stop_event: 停止信号
+        frame_ring: 可选的共享内存帧环（SharedFrameRing），供主进程显示
+    """
+    started_at = time.perf_counter()
+
+    # 每个工作进程写单独的日志文件，避免多个进程同时轮转同一个文件
+    logging_settings = settings.logging
+    app_log = Path(logging_settings.app_log)
+    setup_logger(
+        logging_settings.level,
+        log_file=app_log.with_name(f"{app_log.stem}.{camera_id}{app_log.suffix}"),
+        max_bytes=logging_settings.max_bytes,
+        backup_count=logging_settings.backup_count,
+        rotate_when=logging_settings.rotate_when,
+        queue_size=logging_settings.queue_size
+    )
+    logger = logging.getLogger(f"{__name__}.{camera_id}")
+
+    # 每个工作进程单独导出指标（文件名带摄像头编号，端口依次偏移）
+    metrics_exporter = metrics.setup_metrics(
+        settings.metrics, instance=camera_id, port_offset=worker_index + 1
+    )
+
+    cpus = pin_to_cpus(camera_settings.cpus)
+    logger.info(f"Camera worker {camera_id} started (pid {os.getpid()}, cpus {sorted(cpus) if cpus else 'all'})")
+
+    # 后台预热人脸模型并映射图库，与摄像头初始化并行
+    processor_future = start_frame_processor(
+        settings, gallery_path=gallery_path,
+        warm_up_size=(camera_settings.width, camera_settings.height)
+    )
+    camera = Camera(
+        device_id=camera_settings.device_id,
+        width=camera_settings.width,
+        height=camera_settings.height,
+        fps=camera_settings.fps,
+        threaded=camera_settings.threaded,
+        buffer_size=camera_settings.buffer_size,
+        source=create_frame_source(camera_settings)
+    )
+    processor = processor_future.result()
+    processor.started_at = started_at
+
+    # 在工作进程内按轨迹投票，只把离散事件发往主进程
+    def forward(event):
+        event_queue.put({'type': 'recognition', **event})
+
+    events = build_recognition_events(settings, subscribers=[forward])
+
+    gallery_watcher = None
+    if settings.gallery_watch.enabled:
+        gallery_watcher = GalleryWatcher(processor.recognizer, interval=settings.gallery_watch.interval)
+        gallery_watcher.start()
+
+    frames_processed = 0
+    start_time = time.perf_counter()
+    try:
+        while not stop_event.is_set():
+            frame = camera.get_frame()
+            if frame is None:
+                if camera.finished:
+                    logger.info(f"Frame source of camera {camera_id} exhausted")
+                    break
+                continue
+            frames_processed += 1
+
+            if frame_ring is not None:
+                _publish_frame(frame_ring, frame, camera.frame_timestamp)
+
+            events.update(processor.process(frame), camera.frame_timestamp, camera_id=camera_id)
+            processor.finish_frame(camera.frame_timestamp)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Camera worker {camera_id} failed: {str(e)}")
+    finally:
+        elapsed = time.perf_counter() - start_time
+        if gallery_watcher is not None:
+            gallery_watcher.stop()
+        events.flush(time.time())
+        processor.log_stats()
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+        camera.release()
+        event_queue.put({
+            'type': 'stopped',
+            'camera_id': camera_id,
+            'timestamp': time.time(),
+            'frames': frames_processed,
+            'fps': frames_processed / max(elapsed, 1e-9),
+        })
+        shutdown_logger()
+
+
+def _publish_frame(frame_ring, frame, timestamp):
+    """将帧写入共享内存帧环（尺寸不一致时直接缩放进槽内）"""
+    slot, view = frame_ring.begin_write()
+    if slot is None:
+        return
+    if frame.shape == view.shape:
+        view[...] = frame
+    else:
+        cv2.resize(frame, (view.shape[1], view.shape[0]), dst=view, interpolation=cv2.INTER_AREA)
+    frame_ring.commit(slot, timestamp)
+
+
+class EventMerger:
+    def __init__(self, event_queue, reorder_window=0.2):
+        """
+        将多个工作进程的事件按采集时间合并为单一有序流
+
+        事件在缓冲区中停留 reorder_window 秒，等待其他摄像头更早但晚到达的事件，
+        之后按时间戳输出并编上全局序号。
+
+        Args:
+            event_queue: 工作进程写入的事件队列
+            reorder_window (float): 重排序窗口（秒）
+        """
+        self.event_queue = event_queue
+        self.reorder_window = reorder_window
+        self._heap = []
+        self._arrivals = 0
+        self._next_seq = 1
+        self._last_timestamp = 0.0
+
+    def _push(self, event):
+        # 到达序号作为第二排序键，保证时间戳相同时稳定且不比较字典
+        heapq.heappush(self._heap, (event['timestamp'], self._arrivals, event))
+        self._arrivals += 1
+
+    def _pop(self):
+        timestamp, _, event = heapq.heappop(self._heap)
+        if timestamp < self._last_timestamp:
+            # 超出重排序窗口的迟到事件：保持序号递增，时间戳按原值保留
+            event['late'] = True
+        self._last_timestamp = max(self._last_timestamp, timestamp)
+        event['seq'] = self._next_seq
+        self._next_seq += 1
+        return event
+
+    def poll(self, timeout=0.1):
+        """
+        接收新事件并返回已超过重排序窗口的事件
+
+        Args:
+            timeout (float): 等待新事件的最长时间（秒）
+
+        Returns:
+            list: 按时间排序的事件
+        """
+        try:
+            self._push(self.event_queue.get(timeout=timeout))
+            while True:
+                self._push(self.event_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        ready = []
+        horizon = time.time() - self.reorder_window
+        while self._heap and self._heap[0][0] <= horizon:
+            ready.append(self._pop())
+        return ready
+
+    def flush(self):
+        """
+        取出剩余的全部事件（停止时调用）
+
+        Returns:
+            list: 按时间排序的事件
+        """
+        try:
+            while True:
+                self._push(self.event_queue.get_nowait())
+        except queue.Empty:
+            pass
+        return [self._pop() for _ in range(len(self._heap))]
+
+
+def camera_configs(settings):
+    """
+    列出多摄像头配置（cameras 中的每项已在加载时合并默认的 camera 部分）
+
+    Args:
+        settings (Settings): 配置对象
+
+    Returns:
+        list: [(摄像头编号, CameraSettings)]
+    """
+    return [
+        (index if camera_settings.id is None else camera_settings.id, camera_settings)
+        for index, camera_settings in enumerate(settings.cameras)
+    ]
+
+
+def run_multi_camera(settings, logger):
+    """
+    启动每路摄像头的工作进程并输出合并后的识别事件流
+
+    Args:
+        settings (Settings): 配置对象
+        logger: 日志记录器
+    """
+    gallery_path = prepare_shared_gallery(settings)
+    multi_camera = settings.multi_camera
+
+    # spawn 启动：子进程不继承父进程的线程和 OpenCV 状态
+    context = multiprocessing.get_context('spawn')
+    event_queue = context.Queue()
+    stop_event = context.Event()
+
+    # 可选：工作进程把帧写入共享内存帧环，主进程按槽号读取显示，像素不经过队列
+    rings = {}
+    workers = {}
+    for worker_index, (camera_id, camera_settings) in enumerate(camera_configs(settings)):
+        if multi_camera.display:
+            rings[camera_id] = SharedFrameRing(
+                (camera_settings.height, camera_settings.width, 3),
+                slots=multi_camera.ring_slots,
+                context=context
+            )
+        process = context.Process(
+            target=camera_worker,
+            args=(camera_id, worker_index, settings, camera_settings, gallery_path, event_queue,
+                  stop_event, rings.get(camera_id)),
+            name=f"CameraWorker-{camera_id}",
+            daemon=True
+        )
+        process.start()
+        workers[camera_id] = process
+    logger.info(f"Started {len(workers)} camera workers sharing gallery {gallery_path}")
+
+    # 主进程监视 data/faces 并重写图库文件，工作进程从文件重新映射
+    gallery_writer = None
+    if settings.gallery_watch.enabled:
+        gallery_writer = SharedGalleryWriter(settings, gallery_path, interval=settings.gallery_watch.interval)
+        gallery_writer.start()
+
+    merger = EventMerger(event_queue, reorder_window=multi_camera.reorder_window)
+    running = set(workers)
+    subscribers = build_event_subscribers(settings)
+
+    def handle(events):
+        for event in events:
+            if event['type'] == 'stopped':
+                running.discard(event['camera_id'])
+                logger.info(
+                    f"Camera {event['camera_id']} stopped: {event['frames']} frames "
+                    f"({event['fps']:.1f} fps)"
+                )
+            else:
+                for callback in subscribers:
+                    try:
+                        callback(event)
+                    except Exception as e:
+                        logger.error(f"Event subscriber failed: {str(e)}")
+
+    last_seqs = dict.fromkeys(rings, 0)
+    try:
+        while running:
+            handle(merger.poll(timeout=0.01 if rings else 0.1))
+            for camera_id, ring in rings.items():
+                item = ring.acquire_latest(last_seqs[camera_id], timeout=0)
+                if item is None:
+                    continue
+                slot, last_seqs[camera_id], _, frame = item
+                try:
+                    cv2.imshow(f"Camera {camera_id}", frame)
+                finally:
+                    ring.release(slot)
+            if rings and cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+            # 意外退出的进程不会发送 stopped 事件
+            for camera_id in list(running):
+                if not workers[camera_id].is_alive() and workers[camera_id].exitcode not in (None, 0):
+                    logger.error(f"Camera worker {camera_id} exited with code {workers[camera_id].exitcode}")
+                    running.discard(camera_id)
+    except KeyboardInterrupt:
+        logger.info("System stopped by user")
+    finally:
+        if gallery_writer is not None:
+            gallery_writer.stop()
+        stop_event.set()
+        deadline = time.time() + 5.0
+        while running and time.time() < deadline:
+            handle(merger.poll())
+        for process in workers.values():
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.terminate()
+        handle(merger.flush())
+        for ring in rings.values():
+            ring.close()
+        if rings:
+            cv2.destroyAllWindows()
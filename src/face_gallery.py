@@ -0,0 +1,492 @@
+import logging
+
+import numpy as np
+
+
+def pairwise_distances(encodings):
+    """
+    计算一组编码两两之间的欧氏距离
+
+    Args:
+        encodings: (N, dim) 编码矩阵
+
+    Returns:
+        numpy.ndarray: (N, N) 距离矩阵
+    """
+    sq_norms = np.einsum('ij,ij->i', encodings, encodings)
+    sq_dist = sq_norms[:, None] + sq_norms[None, :] - 2.0 * encodings @ encodings.T
+    np.maximum(sq_dist, 0.0, out=sq_dist)
+    return np.sqrt(sq_dist, out=sq_dist)
+
+
+def k_medoids(distances, k, iters=10):
+    """
+    在距离矩阵上运行 k-medoids 聚类
+
+    Args:
+        distances: (N, N) 距离矩阵
+        k (int): 中心点数量
+        iters (int): 最大迭代次数
+
+    Returns:
+        list: 中心点的行号
+    """
+    count = distances.shape[0]
+    if count <= k:
+        return list(range(count))
+
+    # 从整体中心点出发，依次选取离已选中心最远的点
+    medoids = [int(np.argmin(distances.sum(axis=1)))]
+    while len(medoids) < k:
+        medoids.append(int(np.argmax(distances[:, medoids].min(axis=1))))
+
+    for _ in range(iters):
+        assign = np.argmin(distances[:, medoids], axis=1)
+        updated = []
+        for c in range(k):
+            members = np.flatnonzero(assign == c)
+            if len(members) == 0:
+                updated.append(medoids[c])
+                continue
+            within = distances[np.ix_(members, members)].sum(axis=1)
+            updated.append(int(members[np.argmin(within)]))
+        if updated == medoids:
+            break
+        medoids = updated
+
+    return medoids
+
+
+# 量化存储的图库在距离计算时每次反量化的行数
+DEQUANTIZE_BLOCK_ROWS = 4096
+
+
+class FaceGallery:
+    """
+    已知人脸图库
+
+    所有编码保存在一个连续的 float32 矩阵中，并配有平行的整型标签数组。
+    一帧中的全部人脸通过一次矩阵乘法与整个图库比较。
+    """
+
+    def __init__(self, dim=128, capacity=64, index=None, max_per_identity=None,
+                 prototypes=5, outlier_distance=0.6, exact_recheck=False):
+        """
+        初始化人脸图库
+
+        Args:
+            dim (int): 编码维度
+            capacity (int): 初始容量（行数），不足时按倍数扩容
+            index: 可选的近似最近邻索引（如 IVFIndex），为None时始终精确搜索
+            max_per_identity (int): 单人编码数超过该值时自动压缩为原型，为None时不自动压缩
+            prototypes (int): 压缩后每人保留的原型数量
+            outlier_distance (float): 与该人中心编码距离超过该值的编码视为离群并丢弃
+            exact_recheck (bool): 是否保留原始编码，对最匹配的候选身份做精确复核
+        """
+        self.logger = logging.getLogger(__name__)
+        self.dim = dim
+        self.index = index
+        self.max_per_identity = max_per_identity
+        self.prototypes = prototypes
+        self.outlier_distance = outlier_distance
+        self.exact_recheck = exact_recheck
+        self._encodings = np.empty((capacity, dim), dtype=np.float32)
+        self._sq_norms = np.empty(capacity, dtype=np.float32)
+        self._labels = np.empty(capacity, dtype=np.int32)
+        self._size = 0
+        # float16 / int8 图库文件的逐行缩放系数；为None时 _encodings 为 float32
+        self._scales = None
+
+        # 标签 -> 人名
+        self.names = []
+        self._name_to_label = {}
+        # 标签 -> 矩阵中的行数
+        self._counts = []
+        # 标签 -> 原始编码（仅已压缩且开启精确复核的身份）
+        self._raw = {}
+
+    @classmethod
+    def from_file(cls, gallery_file, **options):
+        """
+        从图库文件（GalleryFile）构建图库
+
+        编码矩阵直接使用只读 memmap，多进程共享页缓存；float16 / int8 文件保持存储类型，
+        距离计算时分块反量化，不在每个进程中常驻一份 float32 副本。
+        首次写入（添加、压缩）时才复制为私有的 float32 数组。文件中保存的是压缩后的原型，
+        开启 exact_recheck 时原始编码同样直接映射文件中的原始编码段，加载时不做任何复制。
+
+        Args:
+            gallery_file: 已打开的 GalleryFile
+            **options: 其余 FaceGallery 参数
+
+        Returns:
+            FaceGallery: 图库
+        """
+        gallery = cls(dim=gallery_file.dim, capacity=0, **options)
+        count = len(gallery_file)
+
+        gallery._encodings = gallery_file.encodings
+        if gallery_file.dtype != np.float32:
+            gallery._scales = gallery_file.scales
+        gallery._sq_norms = np.empty(count, dtype=np.float32)
+        for start, block in gallery._dequantized_blocks(gallery._encodings, gallery._scales):
+            gallery._sq_norms[start:start + len(block)] = np.einsum('ij,ij->i', block, block)
+        gallery._labels = gallery_file.labels
+        gallery._size = count
+
+        for name in gallery_file.names:
+            gallery.label_of(name)
+        gallery._counts = np.bincount(
+            np.asarray(gallery_file.labels), minlength=len(gallery.names)
+        ).tolist()
+
+        if gallery.exact_recheck:
+            gallery._raw = gallery_file.raw_groups()
+
+        if gallery.index is not None and gallery.index.needs_rebuild(count):
+            gallery.rebuild_index()
+        return gallery
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def encodings(self):
+        """当前有效的编码矩阵（float32 时为视图，不复制；量化存储时反量化为新数组）"""
+        if self._scales is None:
+            return self._encodings[:self._size]
+        return self._encodings[:self._size].astype(np.float32) * self._scales[:self._size, None]
+
+    @staticmethod
+    def _dequantized_blocks(encodings, scales, block_rows=DEQUANTIZE_BLOCK_ROWS):
+        """按块反量化编码矩阵，临时内存不超过 block_rows 行"""
+        if scales is None:
+            yield 0, encodings
+            return
+        for start in range(0, encodings.shape[0], block_rows):
+            block = encodings[start:start + block_rows].astype(np.float32)
+            block *= scales[start:start + block_rows, None]
+            yield start, block
+
+    @property
+    def labels(self):
+        """与编码矩阵逐行对应的标签数组（视图，不复制）"""
+        return self._labels[:self._size]
+
+    def raw_encodings(self):
+        """
+        获取已压缩身份的原始编码（写入图库文件的原始编码段）
+
+        Returns:
+            tuple: ((M, dim) 原始编码, 逐行对应的标签)
+        """
+        if not self._raw:
+            return np.empty((0, self.dim), dtype=np.float32), np.empty(0, dtype=np.int32)
+        labels = sorted(self._raw)
+        encodings = np.vstack([self._raw[label] for label in labels])
+        raw_labels = np.concatenate([np.full(len(self._raw[label]), label, dtype=np.int32) for label in labels])
+        return encodings, raw_labels
+
+    def label_of(self, name):
+        """
+        获取人名对应的标签，不存在时新建
+
+        Args:
+            name: 人名
+
+        Returns:
+            int: 标签
+        """
+        label = self._name_to_label.get(name)
+        if label is None:
+            label = len(self.names)
+            self.names.append(name)
+            self._name_to_label[name] = label
+            self._counts.append(0)
+        return label
+
+    def _ensure_capacity(self, extra):
+        """按倍数扩容，保证还能追加 extra 行"""
+        required = self._size + extra
+        capacity = self._encodings.shape[0]
+        # 只读 memmap 在首次写入前复制为私有数组
+        if required <= capacity and self._encodings.flags.writeable and self._labels.flags.writeable:
+            return
+
+        new_capacity = max(required, capacity * 2, 1)
+        encodings = np.empty((new_capacity, self.dim), dtype=np.float32)
+        sq_norms = np.empty(new_capacity, dtype=np.float32)
+        labels = np.empty(new_capacity, dtype=np.int32)
+
+        encodings[:self._size] = self.encodings
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        labels[:self._size] = self._labels[:self._size]
+
+        self._encodings = encodings
+        self._scales = None
+        self._sq_norms = sq_norms
+        self._labels = labels
+
+    def add(self, encoding, name):
+        """
+        添加一条人脸编码
+
+        Args:
+            encoding: 人脸编码
+            name: 人名
+
+        Returns:
+            int: 新编码所在的行号
+        """
+        self._ensure_capacity(1)
+        row = self._size
+        encoding = np.asarray(encoding, dtype=np.float32)
+        label = self.label_of(name)
+        self._encodings[row] = encoding
+        self._sq_norms[row] = np.dot(encoding, encoding)
+        self._labels[row] = label
+        self._size += 1
+        self._counts[label] += 1
+        if label in self._raw:
+            self._raw[label] = np.vstack([self._raw[label], encoding[None, :]])
+
+        if self._over_limit(label):
+            self.compact(name)
+        else:
+            self._update_index(row, encoding)
+        return row
+
+    def add_many(self, encodings, names):
+        """
+        批量添加人脸编码
+
+        Args:
+            encodings: 编码列表或 (N, dim) 矩阵
+            names: 与编码对应的人名列表
+        """
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        count = encodings.shape[0]
+        if count == 0:
+            return
+
+        self._ensure_capacity(count)
+        start, end = self._size, self._size + count
+        self._encodings[start:end] = encodings
+        self._sq_norms[start:end] = np.einsum('ij,ij->i', encodings, encodings)
+        labels = np.array([self.label_of(name) for name in names], dtype=np.int32)
+        self._labels[start:end] = labels
+        self._size = end
+
+        added = np.unique(labels)
+        for label in added:
+            self._counts[label] += int(np.count_nonzero(labels == label))
+            if label in self._raw:
+                self._raw[label] = np.vstack([self._raw[label], encodings[labels == label]])
+
+        over_limit = [label for label in added if self._over_limit(label)]
+        if over_limit:
+            for label in over_limit:
+                self.compact(self.names[label])
+        else:
+            self._update_index(np.arange(start, end), encodings)
+
+    def _over_limit(self, label):
+        return self.max_per_identity is not None and self._counts[label] > self.max_per_identity
+
+    def _remove_label_rows(self, label):
+        """从矩阵中删除某个身份的全部行（保持其余行的相对顺序）"""
+        self._ensure_capacity(0)
+        keep = self.labels != label
+        count = int(np.count_nonzero(keep))
+        self._encodings[:count] = self.encodings[keep]
+        self._sq_norms[:count] = self._sq_norms[:self._size][keep]
+        self._labels[:count] = self.labels[keep]
+        self._size = count
+        self._counts[label] = 0
+
+    def compact(self, name=None):
+        """
+        将身份的编码压缩为少量原型（k-medoids，先剔除离群编码）
+
+        Args:
+            name: 要压缩的人名，为None时压缩全部身份
+
+        Returns:
+            int: 压缩后减少的行数
+        """
+        if name is None:
+            labels = range(len(self.names))
+        elif name in self._name_to_label:
+            labels = [self._name_to_label[name]]
+        else:
+            return 0
+
+        before = self._size
+        for label in labels:
+            raw = self._raw.get(label)
+            if raw is None:
+                raw = self.encodings[self.labels == label].copy()
+            if len(raw) <= self.prototypes:
+                continue
+
+            distances = pairwise_distances(raw)
+
+            # 剔除离该人中心编码过远的编码（误标注、遮挡等）
+            center = int(np.argmin(distances.sum(axis=1)))
+            inliers = np.flatnonzero(distances[center] <= self.outlier_distance)
+            if len(inliers) == 0:
+                inliers = np.arange(len(raw))
+            dropped = len(raw) - len(inliers)
+            distances = distances[np.ix_(inliers, inliers)]
+            raw = raw[inliers]
+
+            medoids = k_medoids(distances, self.prototypes)
+            prototypes = raw[medoids]
+
+            self._remove_label_rows(label)
+            self._ensure_capacity(len(prototypes))
+            start, end = self._size, self._size + len(prototypes)
+            self._encodings[start:end] = prototypes
+            self._sq_norms[start:end] = np.einsum('ij,ij->i', prototypes, prototypes)
+            self._labels[start:end] = label
+            self._size = end
+            self._counts[label] = len(prototypes)
+
+            if self.exact_recheck:
+                self._raw[label] = raw
+
+            self.logger.debug(
+                f"Compacted {self.names[label]}: {len(raw)} encodings -> "
+                f"{len(prototypes)} prototypes ({dropped} outliers dropped)"
+            )
+
+        # 行号已变化，重建索引
+        if self.index is not None and self.index.is_trained:
+            self.rebuild_index()
+
+        return before - self._size
+
+    def _update_index(self, rows, encodings):
+        """将新编码插入索引；图库规模跨过阈值或翻倍时重建"""
+        if self.index is None:
+            return
+        if self.index.needs_rebuild(self._size):
+            self.rebuild_index()
+        else:
+            self.index.add(rows, encodings)
+
+    def rebuild_index(self):
+        """在当前全部编码上重建近似最近邻索引"""
+        if self.index is not None and self._size > 0:
+            self.index.build(self.encodings)
+
+    def distances(self, queries, rows=None):
+        """
+        计算查询编码与图库编码的欧氏距离
+
+        Args:
+            queries: (N, dim) 查询编码
+            rows: 只与这些行比较，为None时与全部编码比较
+
+        Returns:
+            numpy.ndarray: (N, M) 距离矩阵
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        query_sq = np.einsum('ij,ij->i', queries, queries)
+        if rows is None:
+            encodings = self._encodings[:self._size]
+            scales = None if self._scales is None else self._scales[:self._size]
+            sq_norms = self._sq_norms[:self._size]
+        else:
+            encodings = self._encodings[rows]
+            scales = None if self._scales is None else self._scales[rows]
+            sq_norms = self._sq_norms[rows]
+
+        # |q - g|^2 = |q|^2 + |g|^2 - 2 q·g，float32 时一次 BLAS 矩阵乘法，量化存储时分块计算
+        if scales is None:
+            sq_dist = queries @ encodings.T
+        else:
+            sq_dist = np.empty((queries.shape[0], encodings.shape[0]), dtype=np.float32)
+            for start, block in self._dequantized_blocks(encodings, scales):
+                sq_dist[:, start:start + len(block)] = queries @ block.T
+        sq_dist *= -2.0
+        sq_dist += query_sq[:, None]
+        sq_dist += sq_norms[None, :]
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        return np.sqrt(sq_dist, out=sq_dist)
+
+    def match(self, queries):
+        """
+        为每个查询编码找到最匹配的身份及次优身份
+
+        Args:
+            queries: (N, dim) 查询编码
+
+        Returns:
+            list: 每个查询一个字典，包含：
+                - name: 最匹配的人名
+                - distance: 对应距离
+                - runner_up: 次优身份（不同于最匹配身份），不存在时为None
+                - runner_up_distance: 次优身份的距离，不存在时为inf
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if self._size == 0 or queries.shape[0] == 0:
+            return [None] * queries.shape[0]
+
+        if self.index is not None and self.index.is_active(self._size):
+            results = []
+            for query, rows in zip(queries, self.index.candidates(queries)):
+                # 候选为空时退回精确搜索
+                results.extend(self._match_rows(query[None, :], rows if len(rows) else None))
+        else:
+            results = self._match_rows(queries)
+
+        if self._raw:
+            for query, result in zip(queries, results):
+                self._recheck(query, result)
+        return results
+
+    def _recheck(self, query, result):
+        """用原始编码精确复核最匹配和次优两个候选身份，必要时交换两者"""
+        candidates = []
+        for key in ('name', 'runner_up'):
+            name = result[key]
+            if name is None:
+                continue
+            distance = result['distance' if key == 'name' else 'runner_up_distance']
+            raw = self._raw.get(self._name_to_label[name])
+            if raw is not None:
+                exact = np.sqrt(np.maximum(np.einsum('ij,ij->i', raw - query, raw - query), 0.0))
+                distance = min(distance, float(exact.min()))
+            candidates.append((distance, name))
+
+        candidates.sort(key=lambda candidate: candidate[0])
+        result['distance'], result['name'] = candidates[0]
+        if len(candidates) > 1:
+            result['runner_up_distance'], result['runner_up'] = candidates[1]
+
+    def _match_rows(self, queries, rows=None):
+        """在指定行（默认全部）中为每个查询找最匹配和次优身份"""
+        dist = self.distances(queries, rows)
+        labels = self.labels if rows is None else self._labels[rows]
+        query_rows = np.arange(dist.shape[0])
+
+        best = np.argmin(dist, axis=1)
+        best_labels = labels[best]
+        best_dist = dist[query_rows, best]
+
+        # 屏蔽最匹配身份的所有编码，再取最小值即为次优身份
+        dist[labels[None, :] == best_labels[:, None]] = np.inf
+        second = np.argmin(dist, axis=1)
+        second_dist = dist[query_rows, second]
+
+        results = []
+        for i in query_rows:
+            has_runner_up = np.isfinite(second_dist[i])
+            results.append({
+                'name': self.names[best_labels[i]],
+                'distance': float(best_dist[i]),
+                'runner_up': self.names[labels[second[i]]] if has_runner_up else None,
+                'runner_up_distance': float(second_dist[i])
+            })
+        return results
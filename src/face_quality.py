@@ -0,0 +1,80 @@
+import cv2
+import logging
+
+class FaceQualityGate:
+    def __init__(self, min_size=80, blur_threshold=40.0, min_aspect=0.65, max_aspect=1.5):
+        """
+        初始化人脸质量门限（在编码之前剔除过小、模糊或侧脸过大的人脸）
+
+        Args:
+            min_size (int): 人脸框最短边的最小像素数
+            blur_threshold (float): 拉普拉斯方差低于该值视为模糊
+            min_aspect (float): 人脸框宽高比下限（过窄通常是大角度侧脸）
+            max_aspect (float): 人脸框宽高比上限
+        """
+        self.min_size = min_size
+        self.blur_threshold = blur_threshold
+        self.min_aspect = min_aspect
+        self.max_aspect = max_aspect
+        self.logger = logging.getLogger(__name__)
+
+        self.last_stats = {'encoded': 0, 'skipped': 0}
+        self.totals = {'encoded': 0, 'small': 0, 'blurry': 0, 'pose': 0}
+
+    def assess(self, frame, location):
+        """
+        评估单个人脸的质量
+
+        Args:
+            frame: 原始图像（BGR）
+            location: 人脸框 (top, right, bottom, left)
+
+        Returns:
+            str: 不合格原因（'small'、'pose'、'blurry'），合格时返回None
+        """
+        top, right, bottom, left = location
+        width = right - left
+        height = bottom - top
+
+        if min(width, height) < self.min_size:
+            return 'small'
+
+        aspect = width / float(height)
+        if aspect < self.min_aspect or aspect > self.max_aspect:
+            return 'pose'
+
+        # 拉普拉斯方差：越小越模糊，只在人脸区域的灰度图上计算
+        crop = frame[max(0, top):bottom, max(0, left):right]
+        if crop.size == 0:
+            return 'small'
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        if cv2.Laplacian(gray, cv2.CV_64F).var() < self.blur_threshold:
+            return 'blurry'
+
+        return None
+
+    def filter(self, frame, locations):
+        """
+        过滤一帧中的人脸框
+
+        Args:
+            frame: 原始图像（BGR）
+            locations: 人脸框列表
+
+        Returns:
+            list: 与 locations 对应的不合格原因，合格的为None
+        """
+        reasons = [self.assess(frame, location) for location in locations]
+
+        skipped = sum(reason is not None for reason in reasons)
+        self.last_stats = {'encoded': len(reasons) - skipped, 'skipped': skipped}
+        self.totals['encoded'] += len(reasons) - skipped
+        for reason in reasons:
+            if reason is not None:
+                self.totals[reason] += 1
+
+        if skipped:
+            self.logger.debug(
+                f"Quality gate: {self.last_stats['encoded']} encoded, {skipped} skipped"
+            )
+        return reasons
@@ -1,60 +1,330 @@
 import cv2
 import numpy as np
-import face_recognition
 import os
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import logging
 from datetime import datetime
 
+from face_gallery import FaceGallery
+from gallery_store import GalleryFile
+from utils.boxes import expand_box, merge_boxes, suppress_duplicates
+from utils.encoding_cache import EncodingCache
+from utils import metrics
+from utils.frame_pool import FramePool
+from utils.lazy_import import lazy_import
+
+# 导入时会加载 dlib 模型权重，推迟到第一次使用（或 warm_up）时
+face_recognition = lazy_import('face_recognition')
+
+# dlib HOG 检测器的滑动窗口尺寸（像素），小于该尺寸的人脸需要上采样才能检出
+HOG_WINDOW_SIZE = 80
+
+def detection_plan(min_face_size):
+    """
+    根据最小人脸尺寸选择检测缩放比例和上采样次数
+    
+    Args:
+        min_face_size (int): 需要检出的最小人脸尺寸（像素）
+        
+    Returns:
+        tuple: (缩放比例, 上采样次数)
+    """
+    ratio = HOG_WINDOW_SIZE / float(min_face_size)
+    if ratio <= 1.0:
+        return ratio, 0
+        
+    upsample = int(math.ceil(math.log2(ratio)))
+    return ratio / 2 ** upsample, upsample
+
+def warm_up(width, height):
+    """
+    在合成帧上运行一次检测和编码：导入模型并完成首次推理的初始化，
+    使第一帧真实画面的耗时接近稳态
+    
+    Args:
+        width (int): 帧宽度
+        height (int): 帧高度
+        
+    Returns:
+        float: 耗时（秒）
+    """
+    start = time.perf_counter()
+    frame = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    face_recognition.face_locations(frame)
+    
+    # 在画面中央的假人脸框上编码，加载关键点模型和 ResNet
+    size = min(width, height) // 2
+    top, left = (height - size) // 2, (width - size) // 2
+    face_recognition.face_encodings(frame, [(top, left + size, top + size, left)])
+    
+    elapsed = time.perf_counter() - start
+    metrics.observe('warm_up', elapsed)
+    logging.getLogger(__name__).info(f"Face models warmed up in {elapsed:.2f}s")
+    return elapsed
+
+def _encode_face_file(face_file):
+    """
+    编码单个图像文件（进程池工作函数）
+    
+    Args:
+        face_file: 图像路径
+        
+    Returns:
+        tuple: (第一张人脸的编码或None, 错误信息或None)
+    """
+    try:
+        image = face_recognition.load_image_file(str(face_file))
+        face_encodings = face_recognition.face_encodings(image)
+        return (face_encodings[0] if face_encodings else None), None
+    except Exception as e:
+        return None, str(e)
+
 class FaceRecognition:
-    def __init__(self, tolerance=0.6, min_face_size=20):
+    def __init__(self, tolerance=0.6, min_face_size=20, cache_path=None, ann_index=None,
+                 detection_scale="auto", detection_upsample=0, coarse_to_fine=False,
+                 identity_cache=None, load_workers=1, load_chunk_size=8, gallery_options=None,
+                 quality_gate=None, roi_expand=None, roi_full_scan_interval=10, gallery_path=None):
         """
         初始化人脸识别系统
         
         Args:
             tolerance (float): 人脸识别容差（越小越严格）
             min_face_size (int): 最小人脸尺寸
+            cache_path (str): 人脸编码缓存文件路径，为None时不使用缓存
+            ann_index: 可选的近似最近邻索引（如 IVFIndex），为None时使用精确搜索
+            detection_scale: 检测时的图像缩放比例，"auto" 按 min_face_size 自动选择
+            detection_upsample (int): 手动指定缩放比例时的上采样次数
+            coarse_to_fine (bool): 粗尺度未检测到人脸时是否再上采样检测一次
+            identity_cache: 可选的按轨迹身份缓存（IdentityCache），命中时跳过编码和匹配
+            load_workers (int): 加载已知人脸时的编码进程数，0 表示使用全部 CPU 核
+            load_chunk_size (int): 每次提交给工作进程的图像数量
+            gallery_options (dict): 传给 FaceGallery 的参数（原型压缩等）
+            quality_gate: 可选的人脸质量门限（FaceQualityGate），编码前剔除不合格人脸
+            roi_expand (float): ROI 模式下人脸框每边扩展的比例，为None时关闭 ROI 模式
+            roi_full_scan_interval (int): ROI 模式下每隔多少次检测扫描一次整帧
+            gallery_path (str): 图库文件路径（见 gallery_store），存在时直接映射加载，不再扫描 data/faces
         """
         self.tolerance = tolerance
         self.min_face_size = min_face_size
-        self.known_face_encodings = []
-        self.known_face_names = []
+        self.cache_path = cache_path
+        self.ann_index = ann_index
+        self.coarse_to_fine = coarse_to_fine
+        self.identity_cache = identity_cache
+        self.load_workers = load_workers
+        self.load_chunk_size = load_chunk_size
+        self.gallery_options = gallery_options or {}
+        self.quality_gate = quality_gate
+        self.roi_expand = roi_expand
+        self.roi_full_scan_interval = roi_full_scan_interval
+        self.gallery_path = gallery_path
+        self._last_locations = []
+        self._roi_scans = 0
+        self.frame_pool = FramePool()
         self.logger = logging.getLogger(__name__)
         
+        # 检测尺度
+        if detection_scale == "auto":
+            self.detection_scale, self.detection_upsample = detection_plan(min_face_size)
+        else:
+            self.detection_scale = float(detection_scale)
+            self.detection_upsample = detection_upsample
+        self.logger.info(
+            f"Face detection at scale {self.detection_scale:.2f}, "
+            f"upsample {self.detection_upsample}"
+        )
+        
         # 加载已知人脸
-        self._load_known_faces()
+        self.gallery = self.load_gallery()
+        self._pending_gallery = None
+        
+    def load_gallery(self):
+        """
+        加载图库：优先映射图库文件，否则扫描 data/faces
+        
+        每次加载都使用独立的索引副本，可在后台线程中调用而不影响正在使用的图库。
+        
+        Returns:
+            FaceGallery: 已知人脸图库
+        """
+        index = self.ann_index.clone() if self.ann_index is not None else None
+        
+        if self.gallery_path and Path(self.gallery_path).exists():
+            try:
+                gallery = FaceGallery.from_file(
+                    GalleryFile(self.gallery_path),
+                    index=index,
+                    **self.gallery_options
+                )
+                self.logger.info(
+                    f"Mapped {len(gallery)} known faces of {len(gallery.names)} people "
+                    f"from {self.gallery_path}"
+                )
+                return gallery
+            except Exception as e:
+                self.logger.error(f"Failed to open gallery file {self.gallery_path}: {str(e)}")
+                
+        return self._load_known_faces(index)
+        
+    def set_pending_gallery(self, gallery):
+        """
+        提交新图库，下一次调用 swap_gallery 时生效（供后台重载线程使用）
+        
+        Args:
+            gallery: 新的 FaceGallery
+        """
+        self._pending_gallery = gallery
+        
+    def swap_gallery(self):
+        """
+        在两帧之间切换到待生效的新图库（单次引用赋值，识别过程不会看到半成品）
+        
+        Returns:
+            bool: 是否发生了切换
+        """
+        gallery, self._pending_gallery = self._pending_gallery, None
+        if gallery is None:
+            return False
+            
+        self.gallery = gallery
+        return True
+        
+    def _load_known_faces(self, index=None):
+        """
+        加载已知人脸数据
         
-    def _load_known_faces(self):
-        """加载已知人脸数据"""
+        Args:
+            index: 新图库使用的近似最近邻索引
+            
+        Returns:
+            FaceGallery: 已知人脸图库
+        """
+        gallery = FaceGallery(**self.gallery_options)
         faces_dir = Path("data/faces")
         if not faces_dir.exists():
             self.logger.warning("No faces directory found")
-            return
+            return gallery
             
-        for person_dir in faces_dir.iterdir():
+        cache = EncodingCache(self.cache_path, faces_dir) if self.cache_path else None
+        
+        # 收集所有图像，缓存命中的直接取编码，其余留待编码
+        face_entries = []
+        pending = []
+        reused = 0
+        for person_dir in sorted(faces_dir.iterdir()):
             if not person_dir.is_dir():
                 continue
                 
             person_name = person_dir.name
-            face_files = list(person_dir.glob("*.jpg"))
+            face_files = sorted(person_dir.glob("*.jpg"))
             
             if not face_files:
                 self.logger.warning(f"No face images found for {person_name}")
                 continue
                 
-            # 加载该人的所有面部编码
             for face_file in face_files:
-                try:
-                    image = face_recognition.load_image_file(str(face_file))
-                    face_encodings = face_recognition.face_encodings(image)
-                    
-                    if face_encodings:
-                        self.known_face_encodings.append(face_encodings[0])
-                        self.known_face_names.append(person_name)
-                except Exception as e:
-                    self.logger.error(f"Error loading face {face_file}: {str(e)}")
+                encoding = None
+                if cache is not None:
+                    hit, encoding = cache.lookup(face_file)
+                    if hit:
+                        reused += 1
+                    else:
+                        pending.append(len(face_entries))
+                else:
+                    pending.append(len(face_entries))
+                face_entries.append([face_file, person_name, encoding])
+                
+        # 编码未命中缓存的图像（可并行）
+        pending_files = [face_entries[i][0] for i in pending]
+        failed = 0
+        no_face = 0
+        for i, (encoding, error) in zip(pending, self._encode_face_files(pending_files)):
+            face_file = face_entries[i][0]
+            if error is not None:
+                self.logger.error(f"Error loading face {face_file}: {error}")
+                failed += 1
+                continue
+            if encoding is None:
+                no_face += 1
+            face_entries[i][2] = encoding
+            if cache is not None:
+                cache.store(face_file, encoding)
+                
+        # 按目录顺序组装图库，结果与并行度无关
+        loaded = [(encoding, person_name) for _, person_name, encoding in face_entries if encoding is not None]
+        if loaded:
+            encodings, names = zip(*loaded)
+            gallery.add_many(encodings, names)
+                
+        if cache is not None:
+            pruned = cache.prune(entry[0] for entry in face_entries)
+            cache.save()
+            self.logger.info(
+                f"Encoding cache: {reused} reused, {len(pending) - failed} encoded, {pruned} pruned"
+            )
+        if failed or no_face:
+            self.logger.warning(f"{failed} face images failed to load, {no_face} contained no face")
                     
-        self.logger.info(f"Loaded {len(self.known_face_names)} known faces")
+        self.logger.info(
+            f"Loaded {len(gallery)} known faces of {len(gallery.names)} people"
+        )
+        
+        # 全部加载完成后再训练索引，避免加载过程中反复重建
+        if index is not None:
+            gallery.index = index
+            if index.needs_rebuild(len(gallery)):
+                gallery.rebuild_index()
+                
+        return gallery
+        
+    def _encode_face_files(self, face_files):
+        """
+        编码一批图像文件，工作进程数大于1时使用进程池并行
+        
+        Args:
+            face_files: 图像路径列表
+            
+        Returns:
+            list: 与 face_files 顺序一致的 (编码或None, 错误信息或None)
+        """
+        total = len(face_files)
+        if total == 0:
+            return []
+            
+        workers = self.load_workers or os.cpu_count() or 1
+        workers = min(workers, total)
+        self.logger.info(f"Encoding {total} face images with {workers} worker(s)")
+        
+        if workers == 1:
+            results_iter = map(_encode_face_file, face_files)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            # map 按提交顺序返回结果，分块减少进程间通信
+            results_iter = executor.map(
+                _encode_face_file,
+                [str(face_file) for face_file in face_files],
+                chunksize=self.load_chunk_size
+            )
+            
+        results = []
+        report_every = max(1, total // 10)
+        try:
+            for result in results_iter:
+                results.append(result)
+                if len(results) % report_every == 0 or len(results) == total:
+                    self.logger.info(f"Encoded {len(results)}/{total} face images")
+        except Exception as e:
+            # 进程池本身失败（如工作进程被杀），剩余文件按失败处理
+            self.logger.error(f"Face encoding pool failed: {str(e)}")
+            results.extend((None, str(e)) for _ in range(total - len(results)))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+                
+        return results
         
     def detect_faces(self, frame):
         """
@@ -66,18 +336,41 @@ class FaceRecognition:
         Returns:
             list: 检测到的人脸列表
         """
-        # 转换为RGB格式
-        rgb_frame = frame[:, :, ::-1]
-        
         # 检测人脸位置
-        face_locations = face_recognition.face_locations(
-            rgb_frame,
-            model="hog",  # 使用HOG模型，更快但不太准确
-            number_of_times_to_upsample=1
-        )
+        face_locations = self.locate_faces(frame)
+        
+        # 编码前剔除质量不合格的人脸
+        if self.quality_gate is not None:
+            reasons = self.quality_gate.filter(frame, face_locations)
+            face_locations = [
+                location for location, reason in zip(face_locations, reasons)
+                if reason is None
+            ]
+            
+        return self.encode_faces(frame, face_locations)
         
-        # 获取人脸编码
-        face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+    def encode_faces(self, frame, face_locations):
+        """
+        计算指定位置人脸的编码
+        
+        Args:
+            frame: 输入图像（BGR）
+            face_locations: 人脸框列表 (top, right, bottom, left)
+            
+        Returns:
+            list: 包含位置和编码的人脸列表
+        """
+        if not face_locations:
+            return []
+            
+        # 转换为RGB格式（写入复用的连续缓冲）
+        rgb_frame = self.frame_pool.bgr_to_rgb(frame)
+        try:
+            # 获取人脸编码
+            with metrics.timer('encode'):
+                face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+        finally:
+            self.frame_pool.release(rgb_frame)
         
         # 返回人脸信息
         faces = []
@@ -89,31 +382,199 @@ class FaceRecognition:
             
         return faces
         
-    def recognize_face(self, face):
+    def locate_faces(self, frame):
+        """
+        检测人脸位置
+        
+        开启 ROI 模式时，优先在上次人脸框附近的扩展窗口内检测，
+        每隔 roi_full_scan_interval 次或窗口内未检出人脸时才扫描整帧。
+        
+        Args:
+            frame: 输入图像（BGR）
+            
+        Returns:
+            list: 原始分辨率下的人脸框 (top, right, bottom, left)
+        """
+        with metrics.timer('detect'):
+            if (self.roi_expand is not None and self._last_locations
+                    and self._roi_scans < self.roi_full_scan_interval):
+                face_locations = self._scan_rois(frame)
+                if face_locations:
+                    self._roi_scans += 1
+                    self._last_locations = face_locations
+                    return face_locations
+                    
+            face_locations = self._scan_frame(frame)
+            self._roi_scans = 0
+            self._last_locations = face_locations
+            return face_locations
+        
+    def _scan_rois(self, frame):
+        """在上次人脸框的扩展窗口内以原始分辨率检测，并映射回整帧坐标"""
+        height, width = frame.shape[:2]
+        rois = merge_boxes([
+            expand_box(location, self.roi_expand, width, height)
+            for location in self._last_locations
+        ])
+        
+        face_locations = []
+        for roi_top, roi_right, roi_bottom, roi_left in rois:
+            # ROI 尺寸几乎每帧都不同，不放入缓冲池（否则池中形状无限增长）
+            with metrics.timer('color_convert'):
+                rgb_roi = cv2.cvtColor(frame[roi_top:roi_bottom, roi_left:roi_right], cv2.COLOR_BGR2RGB)
+            roi_locations = face_recognition.face_locations(
+                rgb_roi,
+                model="hog",
+                number_of_times_to_upsample=self.detection_upsample
+            )
+            
+            for top, right, bottom, left in roi_locations:
+                face_locations.append(
+                    (top + roi_top, right + roi_left, bottom + roi_top, left + roi_left)
+                )
+                
+        return suppress_duplicates(face_locations)
+        
+    def _scan_frame(self, frame):
+        """在缩小后的整帧上检测人脸，并将人脸框映射回原始分辨率"""
+        scale = self.detection_scale
+        if scale != 1.0:
+            small_frame = self.frame_pool.resize(frame, scale)
+            rgb_small_frame = self.frame_pool.bgr_to_rgb(small_frame)
+            self.frame_pool.release(small_frame)
+        else:
+            rgb_small_frame = self.frame_pool.bgr_to_rgb(frame)
+            
+        try:
+            face_locations = face_recognition.face_locations(
+                rgb_small_frame,
+                model="hog",  # 使用HOG模型，更快但不太准确
+                number_of_times_to_upsample=self.detection_upsample
+            )
+            
+            # 粗尺度未检测到人脸时再上采样一次，检出更小的人脸
+            if not face_locations and self.coarse_to_fine:
+                face_locations = face_recognition.face_locations(
+                    rgb_small_frame,
+                    model="hog",
+                    number_of_times_to_upsample=self.detection_upsample + 1
+                )
+        finally:
+            self.frame_pool.release(rgb_small_frame)
+            
+        if scale == 1.0:
+            return face_locations
+            
+        height, width = frame.shape[:2]
+        return [
+            (
+                max(0, int(round(top / scale))),
+                min(width, int(round(right / scale))),
+                min(height, int(round(bottom / scale))),
+                max(0, int(round(left / scale)))
+            )
+            for top, right, bottom, left in face_locations
+        ]
+        
+    def recognize_face(self, face, frame=None):
         """
         识别人脸
         
         Args:
-            face: 包含位置和编码的人脸信息
+            face: 包含位置和编码的人脸信息（带 track_id 时先查询身份缓存）
+            frame: 原始图像，人脸缺少编码且缓存未命中时用于编码
             
         Returns:
             str: 识别出的人名，如果未识别则返回None
         """
-        if not self.known_face_encodings:
-            return None
+        return self.recognize_faces([face], frame)[0]
+        
+    def recognize_faces(self, faces, frame=None):
+        """
+        批量识别一帧中的所有人脸（一次矩阵运算完成匹配）
+        
+        带 track_id 的人脸先查询身份缓存，只有未命中的人脸才会编码和匹配。
+        
+        Args:
+            faces: 人脸列表，匹配详情写入每个人脸的 'match' 字段
+            frame: 原始图像，人脸缺少编码时用于编码
             
-        # 计算与已知人脸的距离
-        face_distances = face_recognition.face_distance(
-            self.known_face_encodings,
-            face['encoding']
-        )
+        Returns:
+            list: 与 faces 对应的人名列表，未识别的为None
+        """
+        if not faces:
+            return []
+            
+        if len(self.gallery) == 0:
+            return [None] * len(faces)
+            
+        names = [None] * len(faces)
+        pending = []
+        for i, face in enumerate(faces):
+            if self.identity_cache is not None and 'track_id' in face:
+                entry = self.identity_cache.lookup(face['track_id'], face['location'])
+                if entry is not None:
+                    face['encoding'] = entry['encoding']
+                    face['match'] = entry['match']
+                    names[i] = entry['name']
+                    continue
+            pending.append(i)
+            
+        if not pending:
+            return names
+            
+        # 缓存未命中且没有编码的人脸先过质量门限，再批量编码
+        unencoded = [faces[i] for i in pending if 'encoding' not in faces[i]]
+        if unencoded and self.quality_gate is not None:
+            reasons = self.quality_gate.filter(frame, [face['location'] for face in unencoded])
+            for face, reason in zip(unencoded, reasons):
+                face['quality'] = reason
+            unencoded = [face for face in unencoded if face['quality'] is None]
+            pending = [i for i in pending if faces[i].get('quality') is None]
+            if not pending:
+                return names
+                
+        if unencoded:
+            encoded = self.encode_faces(frame, [face['location'] for face in unencoded])
+            for face, result in zip(unencoded, encoded):
+                face['encoding'] = result['encoding']
+                
+        with metrics.timer('match'):
+            matches = self.gallery.match([faces[i]['encoding'] for i in pending])
         
-        # 找到最匹配的人脸
-        best_match_index = np.argmin(face_distances)
-        if face_distances[best_match_index] <= self.tolerance:
-            return self.known_face_names[best_match_index]
+        for i, match in zip(pending, matches):
+            face = faces[i]
+            face['match'] = match
+            name = match['name'] if match['distance'] <= self.tolerance else None
+            names[i] = name
             
-        return None
+            if self.identity_cache is not None and 'track_id' in face:
+                # 置信度取距离与阈值的相对差距，越接近判定边界越需要尽快复核
+                confidence = min(1.0, abs(self.tolerance - match['distance']) / self.tolerance)
+                self.identity_cache.store(
+                    face['track_id'], face['location'], face['encoding'],
+                    name, match, confidence
+                )
+                
+        return names
+        
+    def compact_gallery(self, name=None):
+        """
+        将图库中身份的编码压缩为原型
+        
+        Args:
+            name: 要压缩的人名，为None时压缩全部身份
+        """
+        before = len(self.gallery)
+        removed = self.gallery.compact(name)
+        self.logger.info(f"Compacted gallery: {before} -> {before - removed} encodings")
+        
+    def rebuild_index(self):
+        """在当前图库上重建近似最近邻索引"""
+        if self.gallery.index is None:
+            self.logger.warning("No ANN index configured")
+            return
+        self.gallery.rebuild_index()
         
     def add_face(self, frame, name):
         """
@@ -128,16 +589,19 @@ class FaceRecognition:
         """
         try:
             # 检测人脸
-            rgb_frame = frame[:, :, ::-1]
-            face_locations = face_recognition.face_locations(rgb_frame)
-            
-            if not face_locations:
-                self.logger.warning("No face detected in the image")
-                return False
+            rgb_frame = self.frame_pool.bgr_to_rgb(frame)
+            try:
+                face_locations = face_recognition.face_locations(rgb_frame)
+                
+                if not face_locations:
+                    self.logger.warning("No face detected in the image")
+                    return False
+                    
+                # 获取人脸编码
+                face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+            finally:
+                self.frame_pool.release(rgb_frame)
                 
-            # 获取人脸编码
-            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-            
             if not face_encodings:
                 self.logger.warning("Failed to encode face")
                 return False
@@ -154,9 +618,8 @@ class FaceRecognition:
             face_image = frame[top:bottom, left:right]
             cv2.imwrite(str(face_path), face_image)
             
-            # 添加到已知人脸列表
-            self.known_face_encodings.append(face_encodings[0])
-            self.known_face_names.append(name)
+            # 添加到已知人脸图库
+            self.gallery.add(face_encodings[0], name)
             
             self.logger.info(f"Added new face for {name}")
             return True
@@ -0,0 +1,171 @@
+import cv2
+import numpy as np
+import logging
+
+from utils import metrics
+from utils.boxes import box_iou, clip_box
+
+class FaceTracker:
+    def __init__(self, detect_interval=5, iou_threshold=0.3, min_confidence=0.6, max_missed=2):
+        """
+        初始化人脸跟踪器
+
+        每隔 detect_interval 帧（或跟踪置信度下降时）运行一次完整检测，
+        中间帧用金字塔 LK 光流平移人脸框，每条轨迹拥有稳定的 track_id。
+
+        Args:
+            detect_interval (int): 完整检测的帧间隔
+            iou_threshold (float): 检测框与轨迹关联的最小交并比
+            min_confidence (float): 跟踪置信度低于该值时强制检测
+            max_missed (int): 轨迹连续未被检测到的最大次数，超过后删除
+        """
+        self.detect_interval = max(1, detect_interval)
+        self.iou_threshold = iou_threshold
+        self.min_confidence = min_confidence
+        self.max_missed = max_missed
+        self.logger = logging.getLogger(__name__)
+
+        self.tracks = []
+        self.frame_index = 0
+        self._next_track_id = 1
+        self._prev_gray = None
+        self._spare_gray = None  # 与 _prev_gray 轮换使用的灰度缓冲
+
+    def needs_detection(self):
+        """
+        判断当前帧是否需要运行完整检测
+
+        Returns:
+            bool: 是否需要检测
+        """
+        if self._prev_gray is None or self.frame_index % self.detect_interval == 0:
+            return True
+
+        return any(track['confidence'] < self.min_confidence for track in self.tracks)
+
+    def update(self, frame, detections=None):
+        """
+        用当前帧更新轨迹
+
+        Args:
+            frame: 当前帧（BGR）
+            detections: 当前帧的检测框列表；为None时用光流传播已有轨迹
+
+        Returns:
+            list: 轨迹列表，每条轨迹包含：
+                - track_id: 轨迹编号
+                - location: 人脸框 (top, right, bottom, left)
+                - confidence: 跟踪置信度（0-1）
+                - age: 轨迹已存在的帧数
+                - is_new: 是否为本帧新出现的人脸
+        """
+        # 两个灰度缓冲轮换复用，避免每帧分配
+        spare = self._spare_gray
+        if spare is None or spare.shape != frame.shape[:2]:
+            spare = None
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=spare)
+
+        for track in self.tracks:
+            track['age'] += 1
+            track['is_new'] = False
+
+        if detections is None:
+            with metrics.timer('track'):
+                self._propagate(gray)
+        else:
+            self._associate(detections)
+
+        self._spare_gray = self._prev_gray
+        self._prev_gray = gray
+        self.frame_index += 1
+        return self.tracks
+
+    def _propagate(self, gray):
+        """用光流平移所有轨迹的人脸框"""
+        if not self.tracks or self._prev_gray is None:
+            return
+
+        height, width = gray.shape[:2]
+        points = np.concatenate([self._sample_points(track['location']) for track in self.tracks])
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            self._prev_gray, gray, points, None,
+            winSize=(15, 15), maxLevel=2
+        )
+
+        per_track = len(points) // len(self.tracks)
+        for i, track in enumerate(self.tracks):
+            sl = slice(i * per_track, (i + 1) * per_track)
+            good = status[sl, 0] == 1
+
+            # 成功跟踪的点越少，置信度衰减越快
+            track['confidence'] *= float(good.mean())
+            if not good.any():
+                continue
+
+            dx, dy = np.median((next_points[sl] - points[sl])[good, 0], axis=0)
+            top, right, bottom, left = track['location']
+            track['location'] = clip_box(
+                (round(top + dy), round(right + dx), round(bottom + dy), round(left + dx)),
+                width, height
+            )
+
+    @staticmethod
+    def _sample_points(location, grid=4):
+        """在人脸框中央区域均匀采样跟踪点"""
+        top, right, bottom, left = location
+        margin_x = (right - left) * 0.2
+        margin_y = (bottom - top) * 0.2
+        xs = np.linspace(left + margin_x, right - margin_x, grid)
+        ys = np.linspace(top + margin_y, bottom - margin_y, grid)
+        grid_x, grid_y = np.meshgrid(xs, ys)
+        return np.stack([grid_x.ravel(), grid_y.ravel()], axis=1).astype(np.float32).reshape(-1, 1, 2)
+
+    def _associate(self, detections):
+        """按交并比贪心关联检测框与已有轨迹"""
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            for d, detection in enumerate(detections):
+                iou = box_iou(track['location'], detection)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, t, d))
+        pairs.sort(reverse=True)
+
+        matched_tracks = set()
+        matched_detections = set()
+        for _, t, d in pairs:
+            if t in matched_tracks or d in matched_detections:
+                continue
+            track = self.tracks[t]
+            track['location'] = tuple(detections[d])
+            track['confidence'] = 1.0
+            track['missed'] = 0
+            matched_tracks.add(t)
+            matched_detections.add(d)
+
+        # 未被检测到的轨迹累计丢失次数
+        survivors = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track['missed'] += 1
+                track['confidence'] *= 0.5
+                if track['missed'] > self.max_missed:
+                    self.logger.debug(f"Track {track['track_id']} lost")
+                    continue
+            survivors.append(track)
+
+        # 未关联的检测框作为新轨迹
+        for d, detection in enumerate(detections):
+            if d in matched_detections:
+                continue
+            survivors.append({
+                'track_id': self._next_track_id,
+                'location': tuple(detection),
+                'confidence': 1.0,
+                'age': 0,
+                'missed': 0,
+                'is_new': True
+            })
+            self.logger.debug(f"Track {self._next_track_id} started")
+            self._next_track_id += 1
+
+        self.tracks = survivors
@@ -0,0 +1,416 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future
+
+from ann_index import IVFIndex
+from face_recognition import FaceRecognition, warm_up
+from face_quality import FaceQualityGate
+from face_tracker import FaceTracker
+from identity_cache import IdentityCache
+from motion_gate import MotionGate
+from quality_controller import QualityController
+from utils import metrics
+
+
+class FrameProcessor:
+    def __init__(self, recognizer, tracker=None, identity_cache=None, motion_gate=None, controller=None):
+        """
+        单路摄像头的逐帧检测、跟踪和识别流程
+
+        Args:
+            recognizer: FaceRecognition 实例
+            tracker: 可选的人脸跟踪器（FaceTracker），隔帧检测
+            identity_cache: 可选的按轨迹身份缓存（跟踪模式下生效），与 recognizer 使用的是同一个
+            motion_gate: 可选的运动门限（MotionGate），画面静止时跳过检测
+            controller: 可选的自适应质量控制器（QualityController），按各阶段耗时调节检测和复核参数
+        """
+        self.recognizer = recognizer
+        self.tracker = tracker
+        self.identity_cache = identity_cache
+        self.motion_gate = motion_gate
+        self.controller = controller
+        self.logger = logging.getLogger(__name__)
+
+        # 各轨迹最近一次的识别结果 (name, confidence)（识别阶段维护）
+        self._track_names = {}
+
+        # 进程启动时间（time.perf_counter()），设置后在第一帧识别完成时记录启动耗时
+        self.started_at = None
+
+    def process(self, frame):
+        """
+        处理一帧（顺序执行 detect 和 recognize）
+
+        Args:
+            frame: BGR 图像
+
+        Returns:
+            list: 本帧的识别观测，见 recognize
+        """
+        return self.recognize(frame, self.detect(frame))
+
+    def finish_frame(self, capture_timestamp):
+        """
+        一帧识别完成后记录端到端延迟（指标和质量控制器）
+
+        Args:
+            capture_timestamp (float): 采集时间（time.time()）
+        """
+        latency = time.time() - capture_timestamp
+        metrics.observe('frame_latency', latency)
+        metrics.count('frames_processed')
+        if self.controller is not None:
+            self.controller.observe_frame(latency)
+
+        if self.started_at is not None:
+            elapsed = time.perf_counter() - self.started_at
+            self.started_at = None
+            metrics.gauge('time_to_first_recognition', elapsed)
+            self.logger.info(f"Time to first recognition: {elapsed:.2f}s")
+
+    def detect(self, frame):
+        """
+        检测或跟踪阶段（耗时计入质量控制器的 detect 阶段）
+
+        Args:
+            frame: BGR 图像
+
+        Returns:
+            dict: 交给 recognize 的工作项，画面静止时为 None
+        """
+        start = time.perf_counter()
+        work = self._detect(frame)
+        if self.controller is not None:
+            self.controller.observe_stage('detect', time.perf_counter() - start)
+        return work
+
+    def _detect(self, frame):
+        """
+        检测或跟踪阶段：更新运动门限和跟踪器，确定需要识别的人脸
+
+        不访问图库和身份缓存，可以与 recognize 在不同线程中流水执行（同一帧先 detect 后 recognize）。
+
+        Args:
+            frame: BGR 图像
+
+        Returns:
+            dict: 交给 recognize 的工作项，画面静止时为 None
+        """
+        # 画面静止时沿用上一帧的结果
+        if self.motion_gate is not None and self.motion_gate.is_static(frame):
+            return None
+
+        if self.tracker is None:
+            return {
+                'faces': [{'location': location} for location in self.recognizer.locate_faces(frame)],
+                'tracks': None,
+            }
+
+        if self.tracker.needs_detection():
+            tracks = self.tracker.update(frame, self.recognizer.locate_faces(frame))
+        else:
+            tracks = self.tracker.update(frame)
+
+        if self.identity_cache is None:
+            # 只对新出现的人脸编码和识别，已有轨迹沿用之前的结果
+            tracks = [track for track in tracks if track['is_new']]
+
+        # 复制轨迹的当前状态，跟踪器在下一帧修改轨迹时不影响识别阶段
+        return {
+            'faces': [
+                {'location': track['location'], 'track_id': track['track_id'], 'is_new': track['is_new']}
+                for track in tracks
+            ],
+            'tracks': [(track['track_id'], track['location']) for track in self.tracker.tracks],
+        }
+
+    def recognize(self, frame, work):
+        """
+        识别阶段（耗时计入质量控制器的 recognize 阶段）
+
+        Args:
+            frame: detect 处理过的同一帧
+            work: detect 返回的工作项
+
+        Returns:
+            list: 本帧的识别观测，见 _recognize
+        """
+        start = time.perf_counter()
+        results = self._recognize(frame, work)
+        if self.controller is not None:
+            self.controller.observe_stage('recognize', time.perf_counter() - start)
+        return results
+
+    def _recognize(self, frame, work):
+        """
+        识别阶段：切换图库、查询身份缓存、编码并匹配
+
+        Args:
+            frame: detect 处理过的同一帧
+            work: detect 返回的工作项
+
+        Returns:
+            list: 本帧的识别观测，每项包含 track_id（无跟踪时为 None）、name（未识别为 None）、
+                confidence（本帧没有匹配结果时为 None）和 location；
+                跟踪模式下包含所有活动轨迹，本帧未重新识别的轨迹沿用上次的结果。
+                画面静止时返回 None（沿用上一帧）
+        """
+        # 在两帧之间切换到后台重载完成的新图库
+        self.recognizer.swap_gallery()
+
+        if work is None:
+            return None
+
+        faces = work['faces']
+        names = self.recognizer.recognize_faces(faces, frame)
+
+        if work['tracks'] is None:
+            return [
+                {'track_id': None, 'name': name, 'confidence': self._confidence(face), 'location': face['location']}
+                for face, name in zip(faces, names)
+            ]
+
+        active = {track_id for track_id, _ in work['tracks']}
+        if self.identity_cache is not None:
+            # 身份缓存只保留仍在跟踪的轨迹
+            self.identity_cache.retain(active)
+        self._track_names = {
+            track_id: result for track_id, result in self._track_names.items() if track_id in active
+        }
+
+        for face, name in zip(faces, names):
+            confidence = self._confidence(face)
+            if confidence is not None:
+                self._track_names[face['track_id']] = (name, confidence)
+
+        observations = []
+        for track_id, location in work['tracks']:
+            name, confidence = self._track_names.get(track_id, (None, None))
+            observations.append({
+                'track_id': track_id, 'name': name, 'confidence': confidence, 'location': location
+            })
+        return observations
+
+    def _confidence(self, face):
+        """匹配置信度：距离与阈值的相对差距（0-1），被质量门限跳过的人脸为 None"""
+        match = face.get('match')
+        if match is None:
+            return None
+        tolerance = self.recognizer.tolerance
+        return min(1.0, abs(tolerance - match['distance']) / tolerance)
+
+    def log_stats(self):
+        """输出各组件的统计信息"""
+        if self.controller is not None:
+            self.logger.info(
+                f"Quality controller: {self.controller.changes} adjustments, "
+                f"ending at level {self.controller.level}"
+            )
+        if self.motion_gate is not None:
+            stats = self.motion_gate.stats()
+            self.logger.info(
+                f"Motion gate: {stats['gated']}/{stats['frames']} frames skipped "
+                f"({stats['gated_ratio']:.1%})"
+            )
+        if self.identity_cache is not None:
+            stats = self.identity_cache.stats()
+            self.logger.info(
+                f"Identity cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.1%} encodings avoided)"
+            )
+        quality_gate = self.recognizer.quality_gate
+        if quality_gate is not None:
+            totals = quality_gate.totals
+            self.logger.info(
+                f"Quality gate: {totals['encoded']} encoded, skipped {totals['small']} small, "
+                f"{totals['blurry']} blurry, {totals['pose']} off-pose"
+            )
+
+
+def build_gallery_options(settings):
+    """
+    根据配置生成 FaceGallery 参数（图库原型压缩）
+
+    Args:
+        settings (Settings): 配置对象
+
+    Returns:
+        dict: 传给 FaceGallery 的参数，未开启压缩时为空
+    """
+    compaction = settings.face_recognition.compaction
+    if not compaction.enabled:
+        return {}
+    return {
+        'max_per_identity': compaction.max_per_identity,
+        'prototypes': compaction.prototypes,
+        'outlier_distance': compaction.outlier_distance,
+        'exact_recheck': compaction.exact_recheck
+    }
+
+
+def build_recognizer(settings, gallery_path=None, identity_cache=None):
+    """
+    根据配置创建人脸识别器
+
+    Args:
+        settings (Settings): 配置对象
+        gallery_path: 覆盖 face_recognition.gallery_file 的图库文件路径
+        identity_cache: 可选的按轨迹身份缓存
+
+    Returns:
+        FaceRecognition: 人脸识别器
+    """
+    recognition = settings.face_recognition
+
+    # 初始化近似最近邻索引（大规模图库）
+    ann_index = None
+    ann = recognition.ann_index
+    if ann.enabled:
+        ann_index = IVFIndex(
+            nlist=ann.nlist,
+            nprobe=ann.nprobe,
+            min_size=ann.min_size,
+            target_recall=ann.target_recall
+        )
+
+    # 编码前的人脸质量门限
+    quality_gate = None
+    quality = recognition.quality
+    if quality.enabled:
+        # 细尺度多上采样一次，能检出的最小人脸减半；默认下限随之减半，否则细检结果全被判为过小
+        min_size = quality.min_size or (
+            recognition.min_face_size // 2 if recognition.coarse_to_fine else recognition.min_face_size
+        )
+        quality_gate = FaceQualityGate(
+            min_size=min_size,
+            blur_threshold=quality.blur_threshold,
+            min_aspect=quality.min_aspect,
+            max_aspect=quality.max_aspect
+        )
+
+    # 在上次人脸附近检测（ROI 模式）
+    roi = recognition.roi
+
+    return FaceRecognition(
+        tolerance=recognition.tolerance,
+        min_face_size=recognition.min_face_size,
+        cache_path=recognition.encoding_cache,
+        ann_index=ann_index,
+        detection_scale=recognition.detection_scale,
+        detection_upsample=recognition.detection_upsample,
+        coarse_to_fine=recognition.coarse_to_fine,
+        identity_cache=identity_cache,
+        load_workers=recognition.load_workers,
+        load_chunk_size=recognition.load_chunk_size,
+        gallery_options=build_gallery_options(settings),
+        quality_gate=quality_gate,
+        roi_expand=roi.expand if roi.enabled else None,
+        roi_full_scan_interval=roi.full_scan_interval,
+        gallery_path=gallery_path or recognition.gallery_file
+    )
+
+
+def build_frame_processor(settings, gallery_path=None):
+    """
+    根据配置创建识别器、跟踪器、身份缓存和运动门限
+
+    Args:
+        settings (Settings): 配置对象
+        gallery_path: 覆盖 face_recognition.gallery_file 的图库文件路径
+
+    Returns:
+        FrameProcessor: 逐帧处理流程
+    """
+    # 初始化按轨迹的身份缓存（跟踪模式下避免每帧重复编码）
+    identity_cache = None
+    cache = settings.identity_cache
+    if cache.enabled:
+        identity_cache = IdentityCache(
+            reverify_interval=cache.reverify_interval,
+            min_iou=cache.min_iou,
+            half_life=cache.half_life,
+            min_confidence=cache.min_confidence
+        )
+
+    recognizer = build_recognizer(settings, gallery_path=gallery_path, identity_cache=identity_cache)
+
+    # 初始化人脸跟踪（隔帧检测，中间帧用光流跟踪）
+    tracker = None
+    tracking = settings.tracking
+    if tracking.enabled:
+        tracker = FaceTracker(
+            detect_interval=tracking.detect_interval,
+            iou_threshold=tracking.iou_threshold,
+            min_confidence=tracking.min_confidence,
+            max_missed=tracking.max_missed
+        )
+
+    # 画面静止时跳过检测
+    motion_gate = None
+    motion = settings.motion_gate
+    if motion.enabled:
+        motion_gate = MotionGate(
+            scale=motion.scale,
+            pixel_threshold=motion.pixel_threshold,
+            motion_ratio=motion.motion_ratio,
+            refresh_interval=motion.refresh_interval
+        )
+
+    # 按目标延迟自适应调节检测尺度、上采样、检测间隔和复核间隔
+    controller = None
+    adaptive = settings.adaptive_quality
+    if adaptive.enabled:
+        controller = QualityController(
+            recognizer,
+            tracker=tracker,
+            identity_cache=identity_cache if tracker is not None else None,
+            target_latency=adaptive.target_latency,
+            window=adaptive.window,
+            headroom=adaptive.headroom,
+            recover_windows=adaptive.recover_windows,
+            min_scale=adaptive.min_scale,
+            max_detect_interval=adaptive.max_detect_interval,
+            max_reverify_interval=adaptive.max_reverify_interval
+        )
+
+    return FrameProcessor(
+        recognizer,
+        tracker=tracker,
+        identity_cache=identity_cache,
+        motion_gate=motion_gate,
+        controller=controller
+    )
+
+
+def start_frame_processor(settings, gallery_path=None, warm_up_size=None):
+    """
+    在后台线程中预热模型并创建逐帧处理流程（加载图库），调用方同时初始化摄像头
+
+    预热和图库加载在同一个线程中先后进行，不会并发调用 dlib 模型。
+
+    Args:
+        settings (Settings): 配置对象
+        gallery_path: 覆盖 face_recognition.gallery_file 的图库文件路径
+        warm_up_size: 预热用的帧尺寸 (宽, 高)，为None时不预热
+
+    Returns:
+        Future: 结果为 FrameProcessor，出错时 result() 抛出原异常
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            if warm_up_size is not None:
+                warm_up(*warm_up_size)
+            start = time.perf_counter()
+            processor = build_frame_processor(settings, gallery_path=gallery_path)
+            metrics.observe('gallery_load', time.perf_counter() - start)
+            future.set_result(processor)
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="ProcessorStartup", daemon=True).start()
+    return future
@@ -0,0 +1,206 @@
+"""
+版本化的人脸图库文件格式，可通过 numpy.memmap 零拷贝打开。
+同一台机器上的多个识别进程共享同一份页缓存，无需 pickle 反序列化。
+
+文件布局（小端序，各段按 64 字节对齐）：
+    头部        128 字节，见 HEADER_FORMAT（版本 1 为 64 字节，不含原始编码段）
+    编码矩阵    count x dim，float32 / float16 / int8
+    行缩放系数  count x float32（int8 反量化用，其余类型为 1.0）
+    标签        count x int32
+    人名表      UTF-8 编码的 JSON 数组
+    原始编码    raw_count x dim，float32（已压缩身份的原始编码，按标签排序，供精确复核）
+    原始标签    raw_count x int32
+"""
+
+import os
+import json
+import struct
+import logging
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b'PHYSGAL\x00'
+VERSION = 2
+HEADER_FORMAT_V1 = '<8sHHIIIQQQQQ'
+HEADER_SIZE_V1 = 64
+HEADER_FORMAT = HEADER_FORMAT_V1 + 'QQQ'
+HEADER_SIZE = 128
+ALIGNMENT = 64
+
+DTYPE_CODES = {'float32': 0, 'float16': 1, 'int8': 2}
+CODE_DTYPES = {code: np.dtype(name) for name, code in DTYPE_CODES.items()}
+
+logger = logging.getLogger(__name__)
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_gallery(path, encodings, labels, names, dtype='float32', raw_encodings=None, raw_labels=None):
+    """
+    写入图库文件（先写临时文件再原子替换，已打开旧文件的进程不受影响）
+
+    Args:
+        path: 图库文件路径
+        encodings: (N, dim) 编码矩阵
+        labels: 与编码逐行对应的标签
+        names: 标签 -> 人名
+        dtype (str): 存储类型，'float32'、'float16' 或 'int8'（每行单独缩放）
+        raw_encodings: 可选的 (M, dim) 原始编码（已压缩身份压缩前的编码），始终以 float32 存储
+        raw_labels: 与原始编码逐行对应的标签
+    """
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported gallery dtype: {dtype}")
+
+    encodings = np.asarray(encodings, dtype=np.float32)
+    count, dim = encodings.shape
+    labels = np.asarray(labels, dtype=np.int32)
+    scales = np.ones(count, dtype=np.float32)
+
+    if dtype == 'int8':
+        # 对称量化：每行按最大绝对值缩放到 [-127, 127]
+        max_abs = np.abs(encodings).max(axis=1) if count else scales
+        scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+        stored = np.round(encodings / scales[:, None]).astype(np.int8)
+    else:
+        stored = encodings.astype(dtype)
+
+    if raw_encodings is None:
+        raw_encodings = np.empty((0, dim), dtype=np.float32)
+        raw_labels = np.empty(0, dtype=np.int32)
+    raw_encodings = np.asarray(raw_encodings, dtype=np.float32).reshape(-1, dim)
+    raw_labels = np.asarray(raw_labels, dtype=np.int32)
+    # 按标签排序，读取时每个身份的原始编码是一段连续的行
+    order = np.argsort(raw_labels, kind='stable')
+    raw_encodings = raw_encodings[order]
+    raw_labels = raw_labels[order]
+
+    name_bytes = json.dumps(list(names), ensure_ascii=False).encode('utf-8')
+
+    encodings_offset = _align(HEADER_SIZE)
+    scales_offset = _align(encodings_offset + stored.nbytes)
+    labels_offset = _align(scales_offset + scales.nbytes)
+    names_offset = _align(labels_offset + labels.nbytes)
+    raw_offset = _align(names_offset + len(name_bytes))
+    raw_labels_offset = _align(raw_offset + raw_encodings.nbytes)
+
+    header = struct.pack(
+        HEADER_FORMAT, MAGIC, VERSION, DTYPE_CODES[dtype], count, dim, len(names),
+        encodings_offset, scales_offset, labels_offset, names_offset, len(name_bytes),
+        len(raw_labels), raw_offset, raw_labels_offset
+    )
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        for offset, data in (
+            (0, header),
+            (encodings_offset, stored.tobytes()),
+            (scales_offset, scales.tobytes()),
+            (labels_offset, labels.tobytes()),
+            (names_offset, name_bytes),
+            (raw_offset, raw_encodings.tobytes()),
+            (raw_labels_offset, raw_labels.tobytes()),
+        ):
+            f.seek(offset)
+            f.write(data)
+    os.replace(tmp_path, path)
+    logger.info(
+        f"Wrote {count} encodings of {len(names)} people to {path} ({dtype}, "
+        f"{len(raw_labels)} raw encodings)"
+    )
+
+
+class GalleryFile:
+    def __init__(self, path):
+        """
+        以只读 memmap 方式打开图库文件
+
+        Args:
+            path: 图库文件路径
+        """
+        self.path = Path(path)
+
+        with open(self.path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < struct.calcsize(HEADER_FORMAT_V1):
+            raise ValueError(f"Truncated gallery file: {self.path}")
+
+        (magic, version, dtype_code, count, dim, name_count, encodings_offset,
+         scales_offset, labels_offset, names_offset, names_length) = struct.unpack_from(
+            HEADER_FORMAT_V1, header
+        )
+        if magic != MAGIC:
+            raise ValueError(f"Not a gallery file: {self.path}")
+        if version == 1:
+            # 版本 1 没有原始编码段
+            raw_count = raw_offset = raw_labels_offset = 0
+        elif version == VERSION:
+            if len(header) < struct.calcsize(HEADER_FORMAT):
+                raise ValueError(f"Truncated gallery file: {self.path}")
+            raw_count, raw_offset, raw_labels_offset = struct.unpack_from(HEADER_FORMAT, header)[-3:]
+        else:
+            raise ValueError(f"Unsupported gallery version {version}: {self.path}")
+
+        self.dtype = CODE_DTYPES[dtype_code]
+        self.count = count
+        self.dim = dim
+
+        if count:
+            self.encodings = np.memmap(self.path, dtype=self.dtype, mode='r',
+                                       offset=encodings_offset, shape=(count, dim))
+            self.scales = np.memmap(self.path, dtype=np.float32, mode='r',
+                                    offset=scales_offset, shape=(count,))
+            self.labels = np.memmap(self.path, dtype=np.int32, mode='r',
+                                    offset=labels_offset, shape=(count,))
+        else:
+            self.encodings = np.empty((0, dim), dtype=self.dtype)
+            self.scales = np.empty(0, dtype=np.float32)
+            self.labels = np.empty(0, dtype=np.int32)
+
+        if raw_count:
+            self.raw_encodings = np.memmap(self.path, dtype=np.float32, mode='r',
+                                           offset=raw_offset, shape=(raw_count, dim))
+            self.raw_labels = np.memmap(self.path, dtype=np.int32, mode='r',
+                                        offset=raw_labels_offset, shape=(raw_count,))
+        else:
+            self.raw_encodings = np.empty((0, dim), dtype=np.float32)
+            self.raw_labels = np.empty(0, dtype=np.int32)
+
+        with open(self.path, 'rb') as f:
+            f.seek(names_offset)
+            self.names = json.loads(f.read(names_length).decode('utf-8'))
+        if len(self.names) != name_count:
+            raise ValueError(f"Corrupted name table in {self.path}")
+
+    def __len__(self):
+        return self.count
+
+    def float32_encodings(self):
+        """
+        获取 float32 编码矩阵
+
+        Returns:
+            numpy.ndarray: float32 存储时直接返回 memmap（零拷贝），否则反量化为新数组
+                （FaceGallery.from_file 不调用本方法，直接在存储类型上分块计算距离）
+        """
+        if self.dtype == np.float32:
+            return self.encodings
+        return self.encodings.astype(np.float32) * self.scales[:, None]
+
+    def raw_groups(self):
+        """
+        按标签分组的原始编码（只读 memmap 的切片，零拷贝）
+
+        Returns:
+            dict: 标签 -> (M, dim) 原始编码
+        """
+        labels = np.asarray(self.raw_labels)
+        if not len(labels):
+            return {}
+        starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+        ends = np.r_[starts[1:], len(labels)]
+        return {int(labels[start]): self.raw_encodings[start:end] for start, end in zip(starts, ends)}
@@ -0,0 +1,85 @@
+import time
+import logging
+import threading
+from pathlib import Path
+
+class GalleryWatcher(threading.Thread):
+    def __init__(self, recognizer, faces_dir="data/faces", interval=2.0):
+        """
+        初始化图库监视线程
+
+        定期轮询 data/faces（或图库文件）的文件列表、大小和修改时间，
+        发生变化时在后台重新加载图库（编码缓存保证只编码新图像），
+        再交给识别器在两帧之间切换。
+
+        Args:
+            recognizer: FaceRecognition 实例
+            faces_dir: 人脸图像目录
+            interval (float): 轮询间隔（秒）
+        """
+        super().__init__(name="GalleryWatcher", daemon=True)
+        self.recognizer = recognizer
+        self.faces_dir = Path(faces_dir)
+        self.interval = interval
+        self.logger = logging.getLogger(__name__)
+
+        self._stop_event = threading.Event()
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        """记录被监视文件的 (大小, 修改时间)"""
+        gallery_path = self.recognizer.gallery_path
+        if gallery_path and Path(gallery_path).exists():
+            paths = [Path(gallery_path)]
+        elif self.faces_dir.exists():
+            paths = self.faces_dir.glob("*/*.jpg")
+        else:
+            paths = []
+
+        snapshot = {}
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[str(path)] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def run(self):
+        """轮询循环"""
+        while not self._stop_event.wait(self.interval):
+            try:
+                self._check()
+            except Exception as e:
+                self.logger.error(f"Gallery reload failed: {str(e)}")
+
+    def _check(self):
+        """检测变化并重新加载"""
+        snapshot = self._take_snapshot()
+        if snapshot == self._snapshot:
+            return
+
+        added = len(snapshot.keys() - self._snapshot.keys())
+        removed = len(self._snapshot.keys() - snapshot.keys())
+        changed = sum(
+            1 for path in snapshot.keys() & self._snapshot.keys()
+            if snapshot[path] != self._snapshot[path]
+        )
+
+        start = time.perf_counter()
+        before = len(self.recognizer.gallery)
+        gallery = self.recognizer.load_gallery()
+        self.recognizer.set_pending_gallery(gallery)
+        self._snapshot = snapshot
+
+        self.logger.info(
+            f"Gallery reloaded in {time.perf_counter() - start:.2f}s: "
+            f"{added} files added, {removed} removed, {changed} changed; "
+            f"encodings {before} -> {len(gallery)} ({len(gallery) - before:+d})"
+        )
+
+    def stop(self):
+        """停止监视线程"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=self.interval + 1)
@@ -0,0 +1,110 @@
+import time
+import logging
+
+from utils.boxes import box_iou
+
+class IdentityCache:
+    def __init__(self, reverify_interval=1.0, min_iou=0.5, half_life=2.0, min_confidence=0.3):
+        """
+        初始化按轨迹缓存的身份识别结果
+
+        同一轨迹在缓存有效期内直接复用上次的编码与匹配结果，
+        超过复核间隔、人脸框变化过大或置信度衰减到阈值以下时重新编码匹配。
+
+        Args:
+            reverify_interval (float): 复核间隔（秒）
+            min_iou (float): 当前框与缓存时的框的最小交并比，低于该值视为变化过大
+            half_life (float): 置信度衰减半衰期（秒）
+            min_confidence (float): 衰减后置信度低于该值时重新识别
+        """
+        self.reverify_interval = reverify_interval
+        self.min_iou = min_iou
+        self.half_life = half_life
+        self.min_confidence = min_confidence
+        self.logger = logging.getLogger(__name__)
+
+        # track_id -> 缓存项
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, track_id, location, now=None):
+        """
+        查询轨迹的缓存身份
+
+        Args:
+            track_id: 轨迹编号
+            location: 当前人脸框 (top, right, bottom, left)
+            now (float): 当前时间（time.monotonic），默认取系统时间
+
+        Returns:
+            dict: 命中时返回缓存项（含 name、match、encoding、confidence），否则返回None
+        """
+        now = time.monotonic() if now is None else now
+        entry = self._entries.get(track_id)
+
+        if entry is None or not self._is_valid(entry, location, now):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    def _is_valid(self, entry, location, now):
+        """判断缓存项是否仍然可信"""
+        age = now - entry['verified_at']
+        if age >= self.reverify_interval:
+            return False
+
+        if box_iou(entry['location'], location) < self.min_iou:
+            return False
+
+        confidence = entry['confidence'] * 0.5 ** (age / self.half_life)
+        return confidence >= self.min_confidence
+
+    def store(self, track_id, location, encoding, name, match, confidence, now=None):
+        """
+        记录轨迹的识别结果
+
+        Args:
+            track_id: 轨迹编号
+            location: 识别时的人脸框
+            encoding: 人脸编码
+            name: 识别出的人名，未识别为None
+            match: 图库匹配详情
+            confidence (float): 识别置信度（0-1）
+            now (float): 当前时间（time.monotonic），默认取系统时间
+        """
+        self._entries[track_id] = {
+            'location': location,
+            'encoding': encoding,
+            'name': name,
+            'match': match,
+            'confidence': confidence,
+            'verified_at': time.monotonic() if now is None else now
+        }
+
+    def retain(self, track_ids):
+        """
+        只保留仍然存在的轨迹
+
+        Args:
+            track_ids: 当前活跃的轨迹编号
+        """
+        active = set(track_ids)
+        for track_id in [key for key in self._entries if key not in active]:
+            del self._entries[track_id]
+
+    def stats(self):
+        """
+        获取命中统计
+
+        Returns:
+            dict: 命中次数、未命中次数和命中率
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
@@ -1,60 +1,274 @@
+import time
+
+# 启动计时起点（导入其余模块之前），用于 time_to_first_recognition
+START_TIME = time.perf_counter()
+
 import cv2
-import yaml
+import queue
 import logging
 from pathlib import Path
 from datetime import datetime
 
-from face_recognition import FaceRecognition
+from camera_worker import run_multi_camera
+from frame_processor import start_frame_processor
+from gallery_watcher import GalleryWatcher
+from recognition_events import build_recognition_events
 from utils.camera import Camera
-from utils.logger import setup_logger
+from utils import metrics
+from utils.frame_pool import FramePool
+from utils.frame_sources import create_frame_source
+from utils.logger import setup_logger, shutdown_logger
+from utils.pipeline import STOP, BoundedQueue, Pipeline, Stage
+from utils.settings import SettingsWatcher, load_settings
+
+def apply_settings(settings, processor, logger):
+    """
+    配置文件变化后应用可以在运行中生效的项（日志级别、识别容差），其余项需重启
+
+    Args:
+        settings (Settings): 重新加载的配置对象
+        processor: FrameProcessor 实例
+        logger: 日志记录器
+    """
+    setup_logger(settings.logging.level)
+    recognizer = processor.recognizer
+    if recognizer.tolerance != settings.face_recognition.tolerance:
+        logger.info(f"Tolerance {recognizer.tolerance} -> {settings.face_recognition.tolerance}")
+        recognizer.tolerance = settings.face_recognition.tolerance
+    logger.info("Other setting changes take effect after restart")
+
+def handle_key(key, face_recognition):
+    """
+    处理按键：'r' 重建人脸索引，'c' 压缩图库
+    
+    Returns:
+        bool: 是否按下了 'q'（退出）
+    """
+    if key == ord('q'):
+        return True
+    elif key == ord('r'):
+        face_recognition.rebuild_index()
+    elif key == ord('c'):
+        face_recognition.compact_gallery()
+    return False
 
-def load_config():
-    """加载配置文件"""
-    with open('config/settings.yaml', 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+def run_pipeline(settings, camera, processor, events, logger):
+    """
+    流水线模式：采集、检测/跟踪、识别、事件输出各占一个线程，
+    由有界队列连接；显示在主线程中进行
+    
+    Args:
+        events: 识别事件层（RecognitionEvents），在事件线程中按帧序更新
+    
+    Returns:
+        int: 完成识别的帧数
+    """
+    pipeline_settings = settings.pipeline
+    frame_depth = pipeline_settings.frame_queue_depth
+    
+    # 采集的帧复制进缓冲池，沿流水线传递，显示后或被丢弃时归还
+    frame_pool = FramePool(max_per_shape=3 * frame_depth + 4)
+    
+    def release_item(item):
+        frame_pool.release(item['frame'])
+        
+    # 帧队列丢弃最旧的帧（非实时来源改为阻塞，保证结果可复现），事件队列绝不丢弃
+    drop_frames = camera.source.live
+    detect_queue = BoundedQueue('detect', frame_depth, drop_oldest=drop_frames, on_drop=release_item)
+    recognize_queue = BoundedQueue('recognize', frame_depth, drop_oldest=drop_frames, on_drop=release_item)
+    display_queue = BoundedQueue(
+        'display', pipeline_settings.display_queue_depth, drop_oldest=True, on_drop=release_item
+    )
+    event_queue = BoundedQueue('events', pipeline_settings.event_queue_depth)
+    
+    # 主线程的按键命令在识别线程的两帧之间执行，避免与匹配并发修改图库
+    commands = BoundedQueue('commands', 16)
+    
+    def capture():
+        frame = camera.get_frame()
+        if frame is None:
+            if camera.finished:
+                logger.info("Frame source exhausted")
+                return False
+            logger.error("Failed to capture frame")
+            return True
+        buffer = frame_pool.acquire(frame.shape, frame.dtype)
+        buffer[...] = frame
+        detect_queue.put({'frame': buffer, 'seq': camera.frame_seq, 'timestamp': camera.frame_timestamp})
+        return True
+        
+    def detect(item):
+        item['work'] = processor.detect(item['frame'])
+        recognize_queue.put(item)
+        
+    def recognize(item):
+        while len(commands):
+            commands.get()()
+        observations = processor.recognize(item['frame'], item['work'])
+        event_queue.put({'timestamp': item['timestamp'], 'observations': observations})
+        processor.finish_frame(item['timestamp'])
+        display_queue.put(item)
+        
+    def emit(item):
+        events.update(item['observations'], item['timestamp'])
+        
+    stages = [
+        Stage('capture', capture, downstream=[detect_queue]),
+        Stage('detect', detect, detect_queue, downstream=[recognize_queue]),
+        Stage('recognize', recognize, recognize_queue, downstream=[display_queue, event_queue]),
+        Stage('events', emit, event_queue),
+    ]
+    pipeline = Pipeline(stages, [detect_queue, recognize_queue, display_queue, event_queue])
+    pipeline.start()
+    
+    stats_interval = pipeline_settings.stats_interval
+    next_stats = time.perf_counter() + stats_interval if stats_interval else None
+    
+    try:
+        while True:
+            # 显示结果
+            try:
+                item = display_queue.get(timeout=0.1)
+            except queue.Empty:
+                item = None
+            if item is STOP:
+                break
+            with metrics.timer('display'):
+                if item is not None:
+                    cv2.imshow('Face Recognition', item['frame'])
+                    release_item(item)
+                    metrics.count('frames_displayed')
+                    
+                key = cv2.waitKey(1) & 0xFF
+            for q in (detect_queue, recognize_queue, event_queue):
+                metrics.gauge(f"queue_{q.name}_depth", len(q))
+            if key == ord('q'):
+                break
+            elif key in (ord('r'), ord('c')):
+                commands.put(lambda key=key: handle_key(key, processor.recognizer))
+                
+            if next_stats is not None and time.perf_counter() >= next_stats:
+                pipeline.log_stats()
+                next_stats += stats_interval
+    except KeyboardInterrupt:
+        logger.info("System stopped by user")
+    finally:
+        # 停止采集，结束标记沿流水线传递，已入队的帧和事件处理完后各线程退出
+        pipeline.stop()
+        while True:
+            try:
+                item = display_queue.get(timeout=0.1)
+            except queue.Empty:
+                if not stages[2].is_alive():
+                    break
+                continue
+            if item is STOP:
+                break
+            release_item(item)
+        pipeline.join()
+        pipeline.log_stats()
+        
+    return stages[2].processed
 
 def main():
-    # 加载配置
-    config = load_config()
+    # 加载并校验配置（本进程内只解析一次，各组件通过参数注入）
+    settings = load_settings()
     
     # 设置日志
-    logger = setup_logger(config['logging']['level'])
+    logging_settings = settings.logging
+    logger = setup_logger(
+        logging_settings.level,
+        log_file=logging_settings.app_log,
+        max_bytes=logging_settings.max_bytes,
+        backup_count=logging_settings.backup_count,
+        rotate_when=logging_settings.rotate_when,
+        queue_size=logging_settings.queue_size
+    )
     logger.info("Starting face recognition system...")
     
-    # 初始化摄像头
-    camera = Camera(
-        device_id=config['camera']['device_id'],
-        width=config['camera']['width'],
-        height=config['camera']['height'],
-        fps=config['camera']['fps']
+    # 多摄像头：每路摄像头一个工作进程
+    if settings.cameras:
+        run_multi_camera(settings, logger)
+        return
+    
+    # 各阶段耗时和帧率指标（未启用时开销可忽略）
+    metrics_exporter = metrics.setup_metrics(settings.metrics)
+    
+    # 后台预热人脸模型并加载图库，与摄像头初始化并行
+    camera_settings = settings.camera
+    processor_future = start_frame_processor(
+        settings, warm_up_size=(camera_settings.width, camera_settings.height)
     )
     
-    # 初始化人脸识别
-    face_recognition = FaceRecognition(
-        tolerance=config['face_recognition']['tolerance'],
-        min_face_size=config['face_recognition']['min_face_size']
+    # 初始化摄像头（帧来源可以是设备、视频文件、图像目录或合成流）
+    camera = Camera(
+        device_id=camera_settings.device_id,
+        width=camera_settings.width,
+        height=camera_settings.height,
+        fps=camera_settings.fps,
+        threaded=camera_settings.threaded,
+        buffer_size=camera_settings.buffer_size,
+        source=create_frame_source(camera_settings)
     )
     
+    # 等待检测、跟踪和识别流程就绪
+    processor = processor_future.result()
+    processor.started_at = START_TIME
+    face_recognition = processor.recognizer
+    
+    # 逐帧结果按轨迹投票融合为 arrived / still_present / left 事件，日志等下游只订阅事件
+    events = build_recognition_events(settings)
+    
+    # 后台监视图库变化并热加载
+    gallery_watcher = None
+    if settings.gallery_watch.enabled:
+        gallery_watcher = GalleryWatcher(
+            face_recognition,
+            interval=settings.gallery_watch.interval
+        )
+        gallery_watcher.start()
+        
+    # 可选：监视配置文件，变化时重新加载并应用可热更新的项
+    settings_watcher = None
+    if settings.settings_watch.enabled:
+        settings_watcher = SettingsWatcher(
+            lambda new_settings: apply_settings(new_settings, processor, logger),
+            path=settings.path,
+            interval=settings.settings_watch.interval
+        )
+        settings_watcher.start()
+    
+    frames_processed = 0
+    start_time = time.perf_counter()
+    
     try:
+        if settings.pipeline.enabled:
+            frames_processed = run_pipeline(settings, camera, processor, events, logger)
+            return
+            
         while True:
             # 获取图像
             frame = camera.get_frame()
             if frame is None:
+                if camera.finished:
+                    logger.info("Frame source exhausted")
+                    break
                 logger.error("Failed to capture frame")
                 continue
+            frames_processed += 1
                 
-            # 检测和识别人脸
-            faces = face_recognition.detect_faces(frame)
-            for face in faces:
-                name = face_recognition.recognize_face(face)
-                if name:
-                    logger.info(f"Recognized: {name}")
-                    
+            # 检测、跟踪和识别人脸
+            events.update(processor.process(frame), camera.frame_timestamp)
+            processor.finish_frame(camera.frame_timestamp)
+            
             # 显示结果
-            cv2.imshow('Face Recognition', frame)
+            with metrics.timer('display'):
+                cv2.imshow('Face Recognition', frame)
+                key = cv2.waitKey(1) & 0xFF
+            metrics.count('frames_displayed')
             
-            # 按'q'退出
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            # 按'q'退出，按'r'重建人脸索引，按'c'压缩图库
+            if handle_key(key, face_recognition):
                 break
                 
     except KeyboardInterrupt:
@@ -62,8 +276,25 @@ def main():
     except Exception as e:
         logger.error(f"Error occurred: {str(e)}")
     finally:
+        elapsed = time.perf_counter() - start_time
+        logger.info(
+            f"Processed {frames_processed} frames in {elapsed:.1f}s "
+            f"({frames_processed / max(elapsed, 1e-9):.1f} fps)"
+        )
+        if gallery_watcher is not None:
+            gallery_watcher.stop()
+        if settings_watcher is not None:
+            settings_watcher.stop()
+        events.flush(time.time())
+        processor.log_stats()
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
         camera.release()
         cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    try:
+        main()
+    finally:
+        # 写出日志队列中剩余的记录
+        shutdown_logger() 
\ No newline at end of file
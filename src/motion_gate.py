@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+import logging
+
+class MotionGate:
+    def __init__(self, scale=0.125, pixel_threshold=15, motion_ratio=0.002, refresh_interval=30):
+        """
+        初始化运动门限（画面静止时跳过检测，沿用上一帧结果）
+
+        在大幅缩小的灰度图上与上一次处理的帧做差分，变化像素比例低于阈值时视为静止。
+
+        Args:
+            scale (float): 差分前的缩放比例（640x480 * 0.125 = 80x60）
+            pixel_threshold (int): 灰度差超过该值的像素视为变化
+            motion_ratio (float): 变化像素比例低于该值时视为静止
+            refresh_interval (int): 连续跳过的最大帧数，到达后强制刷新
+        """
+        self.scale = scale
+        self.pixel_threshold = pixel_threshold
+        self.motion_ratio = motion_ratio
+        self.refresh_interval = refresh_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._reference = None
+        self._gated_streak = 0
+        self.frames = 0
+        self.gated = 0
+
+    def is_static(self, frame):
+        """
+        判断当前帧相对上一次处理的帧是否静止
+
+        Args:
+            frame: 当前帧（BGR）
+
+        Returns:
+            bool: 是否可以跳过检测
+        """
+        small = cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (3, 3), 0)
+        self.frames += 1
+
+        if self._reference is not None and self._gated_streak < self.refresh_interval:
+            diff = cv2.absdiff(gray, self._reference)
+            changed = np.count_nonzero(diff > self.pixel_threshold) / float(diff.size)
+            if changed < self.motion_ratio:
+                self._gated_streak += 1
+                self.gated += 1
+                return True
+
+        # 与上一次处理的帧比较，缓慢变化也会逐渐累积并触发
+        self._reference = gray
+        self._gated_streak = 0
+        return False
+
+    def stats(self):
+        """
+        获取跳过统计
+
+        Returns:
+            dict: 总帧数、跳过帧数和跳过比例
+        """
+        return {
+            'frames': self.frames,
+            'gated': self.gated,
+            'gated_ratio': self.gated / self.frames if self.frames else 0.0
+        }
@@ -4,6 +4,8 @@ from datetime import datetime
 import logging
 from pathlib import Path
 
+from utils import metrics
+
 class MemoryStore:
     def __init__(self, db_path="data/owner_memory.db"):
         """
@@ -68,6 +70,19 @@ class MemoryStore:
                     )
                 ''')
                 
+                # 创建人员出现记录表（识别事件：到达 / 仍在场 / 离开）
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS presence_history (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        timestamp DATETIME NOT NULL,
+                        name TEXT NOT NULL,
+                        event TEXT NOT NULL,
+                        camera_id TEXT,
+                        confidence REAL,
+                        duration REAL
+                    )
+                ''')
+                
                 conn.commit()
                 self.logger.info("Database initialized successfully")
                 
@@ -83,7 +98,7 @@ class MemoryStore:
             interaction_data: 交互数据字典
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with metrics.timer('db_write'), sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
                 # 准备数据
@@ -118,7 +133,7 @@ class MemoryStore:
             confidence: 置信度
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with metrics.timer('db_write'), sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -141,7 +156,7 @@ class MemoryStore:
             confidence: 置信度
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with metrics.timer('db_write'), sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -163,7 +178,7 @@ class MemoryStore:
             distance: 距离值
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with metrics.timer('db_write'), sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -177,6 +192,35 @@ class MemoryStore:
             self.logger.error(f"Failed to store distance: {str(e)}")
             raise
             
+    def store_presence(self, name, event, timestamp=None, camera_id=None, confidence=None, duration=None):
+        """
+        存储人员出现记录
+        
+        Args:
+            name: 人名
+            event: 事件类型（arrived / still_present / left）
+            timestamp: 事件时间，默认为当前时间
+            camera_id: 摄像头编号
+            confidence: 投票置信度
+            duration: 已在场时长（秒）
+        """
+        try:
+            with metrics.timer('db_write'), sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO presence_history
+                    (timestamp, name, event, camera_id, confidence, duration)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (timestamp or datetime.now(), name, event,
+                      None if camera_id is None else str(camera_id), confidence, duration))
+                
+                conn.commit()
+                
+        except Exception as e:
+            self.logger.error(f"Failed to store presence: {str(e)}")
+            raise
+            
     def get_recent_interactions(self, minutes=60):
         """
         获取最近的交互记录
@@ -0,0 +1,168 @@
+import math
+import logging
+import threading
+
+
+class QualityController:
+    def __init__(self, recognizer, tracker=None, identity_cache=None, target_latency=0.1,
+                 window=30, headroom=0.6, recover_windows=3, min_scale=0.25, scale_step=0.75,
+                 max_detect_interval=15, max_reverify_interval=5.0, reverify_step=1.5):
+        """
+        初始化自适应质量控制器
+
+        每 window 帧统计一次端到端延迟的 p95：超过目标时降低一档质量，
+        连续 recover_windows 个窗口低于 headroom * 目标时按相反顺序恢复一档。
+        降档时根据检测和识别两个阶段的耗时占比选择调节对象：
+            - 检测占主导：先拉长检测间隔，再减少上采样，最后缩小检测尺度
+            - 识别占主导：拉长身份缓存的复核间隔
+        每次调节都会记录日志，说明触发原因和旋钮的新旧取值。
+
+        Args:
+            recognizer: FaceRecognition 实例（detection_scale / detection_upsample）
+            tracker: 可选的人脸跟踪器（detect_interval）
+            identity_cache: 可选的身份缓存（reverify_interval）
+            target_latency (float): 目标单帧延迟（秒）
+            window (int): 每次决策统计的帧数
+            headroom (float): 低于目标的该比例时视为有余量
+            recover_windows (int): 连续多少个有余量的窗口后恢复一档
+            min_scale (float): 检测尺度下限
+            scale_step (float): 每档检测尺度的缩放系数
+            max_detect_interval (int): 检测间隔上限（帧）
+            max_reverify_interval (float): 复核间隔上限（秒）
+            reverify_step (float): 每档复核间隔的放大系数
+        """
+        self.recognizer = recognizer
+        self.tracker = tracker
+        self.identity_cache = identity_cache
+        self.target_latency = target_latency
+        self.window = window
+        self.headroom = headroom
+        self.recover_windows = recover_windows
+        self.min_scale = min_scale
+        self.scale_step = scale_step
+        self.max_detect_interval = max_detect_interval
+        self.max_reverify_interval = max_reverify_interval
+        self.reverify_step = reverify_step
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._latencies = []
+        self._stage_times = {'detect': 0.0, 'recognize': 0.0}
+        self._calm_windows = 0
+        # 已应用的降档：(旋钮名, 原值)，恢复时后进先出
+        self._degradations = []
+        self.changes = 0
+
+    @property
+    def level(self):
+        """当前降档的档数（0 为配置的最高质量）"""
+        return len(self._degradations)
+
+    def observe_stage(self, stage, seconds):
+        """
+        记录一帧中某个阶段的耗时
+
+        Args:
+            stage (str): 'detect' 或 'recognize'
+            seconds (float): 耗时（秒）
+        """
+        with self._lock:
+            self._stage_times[stage] = self._stage_times.get(stage, 0.0) + seconds
+
+    def observe_frame(self, latency):
+        """
+        记录一帧的端到端延迟，攒满一个窗口后做一次调节决策
+
+        Args:
+            latency (float): 从采集到识别完成的延迟（秒）
+        """
+        with self._lock:
+            self._latencies.append(latency)
+            if len(self._latencies) < self.window:
+                return
+            latencies = sorted(self._latencies)
+            stage_times = self._stage_times
+            self._latencies = []
+            self._stage_times = {'detect': 0.0, 'recognize': 0.0}
+
+        p95 = latencies[min(len(latencies) - 1, int(math.ceil(0.95 * len(latencies))) - 1)]
+        if p95 > self.target_latency:
+            self._calm_windows = 0
+            self._degrade(p95, stage_times)
+        elif p95 < self.headroom * self.target_latency and self._degradations:
+            self._calm_windows += 1
+            if self._calm_windows >= self.recover_windows:
+                self._calm_windows = 0
+                self._recover(p95)
+        else:
+            self._calm_windows = 0
+
+    # 各旋钮的读写
+    def _get(self, knob):
+        if knob == 'detect_interval':
+            return self.tracker.detect_interval
+        if knob == 'reverify_interval':
+            return self.identity_cache.reverify_interval
+        return getattr(self.recognizer, knob)
+
+    def _set(self, knob, value):
+        if knob == 'detect_interval':
+            self.tracker.detect_interval = value
+        elif knob == 'reverify_interval':
+            self.identity_cache.reverify_interval = value
+        else:
+            setattr(self.recognizer, knob, value)
+
+    def _detection_step(self):
+        """检测侧的下一档调节，已到下限时返回 None"""
+        if self.tracker is not None and self.tracker.detect_interval < self.max_detect_interval:
+            return 'detect_interval', self.tracker.detect_interval + 1
+        if self.recognizer.detection_upsample > 0:
+            return 'detection_upsample', self.recognizer.detection_upsample - 1
+        if self.recognizer.detection_scale > self.min_scale:
+            return 'detection_scale', max(self.min_scale, self.recognizer.detection_scale * self.scale_step)
+        return None
+
+    def _recognition_step(self):
+        """识别侧的下一档调节，已到上限时返回 None"""
+        if self.identity_cache is not None and self.identity_cache.reverify_interval < self.max_reverify_interval:
+            return 'reverify_interval', min(
+                self.max_reverify_interval, self.identity_cache.reverify_interval * self.reverify_step
+            )
+        return None
+
+    def _degrade(self, p95, stage_times):
+        total = sum(stage_times.values()) or 1.0
+        detect_share = stage_times.get('detect', 0.0) / total
+        if detect_share >= 0.5:
+            step = self._detection_step() or self._recognition_step()
+        else:
+            step = self._recognition_step() or self._detection_step()
+        if step is None:
+            self.logger.warning(
+                f"Quality controller: p95 latency {p95 * 1000:.0f}ms over target "
+                f"{self.target_latency * 1000:.0f}ms at lowest quality"
+            )
+            return
+
+        knob, value = step
+        old = self._get(knob)
+        self._degradations.append((knob, old))
+        self._set(knob, value)
+        self.changes += 1
+        self.logger.info(
+            f"Quality controller: p95 latency {p95 * 1000:.0f}ms > target "
+            f"{self.target_latency * 1000:.0f}ms (detect {detect_share:.0%} of stage time), "
+            f"{knob} {old:g} -> {value:g} (level {self.level})"
+        )
+
+    def _recover(self, p95):
+        knob, value = self._degradations.pop()
+        old = self._get(knob)
+        self._set(knob, value)
+        self.changes += 1
+        self.logger.info(
+            f"Quality controller: p95 latency {p95 * 1000:.0f}ms < "
+            f"{self.headroom * self.target_latency * 1000:.0f}ms for {self.recover_windows} windows, "
+            f"{knob} {old:g} -> {value:g} (level {self.level})"
+        )
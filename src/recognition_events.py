@@ -0,0 +1,341 @@
+"""
+识别事件层：把逐帧的匹配结果按轨迹在滑动窗口内投票融合，
+输出离散的 arrived / still_present（限频）/ left 事件，
+日志、MemoryStore、语音等下游只订阅事件，不再处理逐帧结果。
+"""
+
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class _TrackVotes:
+    """单条轨迹的投票窗口"""
+
+    def __init__(self, window, timestamp, track_id=None, camera_id=None):
+        self.votes = deque(maxlen=window)
+        self.identity = None
+        self.confidence = 0.0
+        self.last_seen = timestamp
+        self.track_id = track_id
+        self.camera_id = camera_id
+
+
+class RecognitionEvents:
+    def __init__(self, window=15, min_votes=5, vote_ratio=0.6, present_interval=60.0,
+                 leave_timeout=3.0):
+        """
+        初始化识别事件层
+
+        每条轨迹保留最近 window 次识别结果，按置信度加权投票：得票最多的身份
+        至少获得 min_votes 票且占总权重的 vote_ratio 以上时才确认，否则保持原身份。
+        同一人的多条轨迹合并为一次出现。
+
+        Args:
+            window (int): 每条轨迹的投票窗口大小（帧）
+            min_votes (int): 确认身份所需的最少票数
+            vote_ratio (float): 确认身份所需的最小权重占比
+            present_interval (float): still_present 事件的最小间隔（秒）
+            leave_timeout (float): 多久未见到后判定离开（秒）
+        """
+        self.window = window
+        self.min_votes = min_votes
+        self.vote_ratio = vote_ratio
+        self.present_interval = present_interval
+        self.leave_timeout = leave_timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._tracks = {}
+        # 摄像头编号 -> 最近一次非静止帧中出现的轨迹键（静止帧只刷新这些轨迹）
+        self._last_keys = {}
+        # 人名 -> {'since', 'last_seen', 'last_report', 'track_id', 'confidence', 'camera_id'}
+        self._present = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self.totals = {'arrived': 0, 'still_present': 0, 'left': 0}
+
+    def subscribe(self, callback):
+        """
+        订阅事件
+
+        Args:
+            callback: callback(event)，event 包含 event、name、timestamp、track_id、
+                camera_id、confidence 和 duration（在场时长，秒）
+        """
+        self._subscribers.append(callback)
+
+    def present(self):
+        """
+        获取当前在场的人
+
+        Returns:
+            list: 人名列表
+        """
+        return list(self._present)
+
+    def update(self, observations, timestamp, camera_id=None):
+        """
+        输入一帧的识别结果
+
+        Args:
+            observations: 每条轨迹一项，包含 track_id（无跟踪时为 None）、name（未识别为 None）、
+                confidence（本帧未识别时为 None，只更新在场时间）；
+                为 None 表示画面静止、沿用上一帧，上一帧中的轨迹视为仍然可见
+            timestamp (float): 采集时间（time.time()）
+            camera_id: 摄像头编号
+        """
+        with self._lock:
+            if observations is None:
+                # 只刷新上一帧仍在的轨迹，已离开的轨迹照常超时
+                for key in self._last_keys.get(camera_id, ()):
+                    track = self._tracks.get(key)
+                    if track is not None:
+                        track.last_seen = timestamp
+            else:
+                keys = (self._observe(observation, timestamp, camera_id) for observation in observations)
+                self._last_keys[camera_id] = {key for key in keys if key is not None}
+
+            events = self._update_presence(timestamp)
+
+        for event in events:
+            self._publish(event)
+
+    def flush(self, timestamp):
+        """
+        结束时为所有在场的人发布 left 事件
+
+        Args:
+            timestamp (float): 当前时间
+        """
+        with self._lock:
+            events = [self._event('left', name, timestamp) for name in list(self._present)]
+            self._present.clear()
+            self._tracks.clear()
+            self._last_keys.clear()
+        for event in events:
+            self._publish(event)
+
+    def _observe(self, observation, timestamp, camera_id):
+        name = observation.get('name')
+        track_id = observation.get('track_id')
+        if track_id is None:
+            if name is None:
+                return None
+            # 无跟踪时按人名聚合
+            key = (camera_id, 'name', name)
+        else:
+            key = (camera_id, track_id)
+
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = _TrackVotes(self.window, timestamp, track_id, camera_id)
+        track.last_seen = timestamp
+
+        confidence = observation.get('confidence')
+        if confidence is None:
+            return key
+        track.votes.append((name, max(confidence, 0.05)))
+
+        scores = {}
+        counts = {}
+        for voted, weight in track.votes:
+            scores[voted] = scores.get(voted, 0.0) + weight
+            counts[voted] = counts.get(voted, 0) + 1
+        winner = max(scores, key=scores.get)
+        share = scores[winner] / sum(scores.values())
+        if counts[winner] >= min(self.min_votes, self.window) and share >= self.vote_ratio:
+            track.identity = winner
+            track.confidence = share
+        return key
+
+    def _update_presence(self, timestamp):
+        events = []
+
+        # 长时间未见的轨迹不再参与投票
+        for key in [key for key, track in self._tracks.items()
+                    if timestamp - track.last_seen > self.leave_timeout]:
+            del self._tracks[key]
+
+        # 同一人的多条轨迹取置信度最高的一条
+        visible = {}
+        for track in self._tracks.values():
+            if track.identity is not None and (
+                    track.identity not in visible or track.confidence > visible[track.identity].confidence):
+                visible[track.identity] = track
+
+        for name, track in visible.items():
+            state = self._present.get(name)
+            if state is None:
+                self._present[name] = {
+                    'since': timestamp, 'last_seen': track.last_seen, 'last_report': timestamp,
+                    'track_id': track.track_id, 'confidence': track.confidence, 'camera_id': track.camera_id,
+                }
+                events.append(self._event('arrived', name, timestamp))
+                continue
+
+            state.update(last_seen=max(state['last_seen'], track.last_seen), track_id=track.track_id,
+                         confidence=track.confidence, camera_id=track.camera_id)
+            if timestamp - state['last_report'] >= self.present_interval:
+                state['last_report'] = timestamp
+                events.append(self._event('still_present', name, timestamp))
+
+        for name in [name for name, state in self._present.items()
+                     if name not in visible and timestamp - state['last_seen'] > self.leave_timeout]:
+            events.append(self._event('left', name, timestamp))
+            del self._present[name]
+
+        return events
+
+    def _event(self, kind, name, timestamp):
+        state = self._present[name]
+        self.totals[kind] += 1
+        return {
+            'event': kind,
+            'name': name,
+            'timestamp': timestamp,
+            'track_id': state['track_id'],
+            'camera_id': state['camera_id'],
+            'confidence': state['confidence'],
+            # 离开事件的时长截止到最后一次见到
+            'duration': (state['last_seen'] if kind == 'left' else timestamp) - state['since'],
+        }
+
+    def _publish(self, event):
+        for callback in self._subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                self.logger.error(f"Event subscriber failed: {str(e)}")
+
+
+def log_event(event, logger=None):
+    """
+    日志订阅者：每个事件一行
+
+    Args:
+        event (dict): 识别事件
+        logger: 日志记录器，默认为本模块的记录器
+    """
+    logger = logger or logging.getLogger(__name__)
+    # 多摄像头合并后的事件带全局序号
+    prefix = f"[{event['seq']}] " if 'seq' in event else ""
+    where = f"camera {event['camera_id']}, " if event.get('camera_id') is not None else ""
+    track = f"track {event['track_id']}, " if event.get('track_id') is not None else ""
+    if event['event'] == 'arrived':
+        logger.info(f"{prefix}Arrived: {event['name']} ({where}{track}confidence {event['confidence']:.2f})")
+    elif event['event'] == 'still_present':
+        logger.info(f"{prefix}Still present: {event['name']} ({where}{event['duration']:.0f}s)")
+    else:
+        logger.info(f"{prefix}Left: {event['name']} ({where}after {event['duration']:.0f}s)")
+
+
+class MemoryStoreSubscriber:
+    def __init__(self, memory_store):
+        """
+        MemoryStore 订阅者：把识别事件写入 presence_history 表
+
+        Args:
+            memory_store: MemoryStore 实例
+        """
+        self.memory_store = memory_store
+
+    def __call__(self, event):
+        self.memory_store.store_presence(
+            event['name'],
+            event['event'],
+            timestamp=datetime.fromtimestamp(event['timestamp']),
+            camera_id=event.get('camera_id'),
+            confidence=event.get('confidence'),
+            duration=event.get('duration')
+        )
+
+
+class VoiceGreeter:
+    def __init__(self, language="zh-CN", volume=0.8, rate=150):
+        """
+        语音订阅者：有人到达时播报问候（pyttsx3 为可选依赖，在后台线程中播报）
+
+        Args:
+            language (str): 语音语言
+            volume (float): 音量（0.0-1.0）
+            rate (int): 语速
+        """
+        self.language = language
+        self.volume = volume
+        self.rate = rate
+        self.logger = logging.getLogger(__name__)
+        self._pending = deque(maxlen=4)
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="VoiceGreeter", daemon=True)
+        self._thread.start()
+
+    def __call__(self, event):
+        if event['event'] == 'arrived':
+            self._pending.append(f"你好，{event['name']}")
+            self._wakeup.set()
+
+    def _run(self):
+        try:
+            import pyttsx3
+        except ImportError:
+            self.logger.warning("pyttsx3 is not installed, voice greetings disabled")
+            return
+
+        engine = pyttsx3.init()
+        engine.setProperty('volume', self.volume)
+        engine.setProperty('rate', self.rate)
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                engine.say(self._pending.popleft())
+                engine.runAndWait()
+
+
+def build_event_subscribers(settings):
+    """
+    根据配置创建事件订阅者（日志、MemoryStore、语音）
+
+    Args:
+        settings (Settings): 配置对象
+
+    Returns:
+        list: 订阅者回调
+    """
+    subscribers = [log_event]
+
+    if settings.recognition_events.store_to_memory:
+        from owner_cognition.memory_store import MemoryStore
+        subscribers.append(MemoryStoreSubscriber(MemoryStore(settings.memory.db_path)))
+
+    voice = settings.voice
+    if voice.enabled:
+        subscribers.append(VoiceGreeter(language=voice.language, volume=voice.volume, rate=voice.rate))
+    return subscribers
+
+
+def build_recognition_events(settings, subscribers=None):
+    """
+    根据配置创建识别事件层并挂接订阅者
+
+    Args:
+        settings (Settings): 配置对象
+        subscribers: 订阅者列表，为None时按配置创建（见 build_event_subscribers）
+
+    Returns:
+        RecognitionEvents: 识别事件层
+    """
+    events_settings = settings.recognition_events
+    events = RecognitionEvents(
+        window=events_settings.window,
+        min_votes=events_settings.min_votes,
+        vote_ratio=events_settings.vote_ratio,
+        present_interval=events_settings.present_interval,
+        leave_timeout=events_settings.leave_timeout
+    )
+    if subscribers is None:
+        subscribers = build_event_subscribers(settings)
+    for callback in subscribers:
+        events.subscribe(callback)
+    return events
@@ -0,0 +1,116 @@
+def box_area(box):
+    """
+    计算人脸框面积
+    
+    Args:
+        box: (top, right, bottom, left)
+        
+    Returns:
+        int: 面积（像素）
+    """
+    top, right, bottom, left = box
+    return max(0, bottom - top) * max(0, right - left)
+
+def box_iou(box_a, box_b):
+    """
+    计算两个人脸框的交并比
+    
+    Args:
+        box_a: (top, right, bottom, left)
+        box_b: (top, right, bottom, left)
+        
+    Returns:
+        float: 交并比（0-1）
+    """
+    top = max(box_a[0], box_b[0])
+    right = min(box_a[1], box_b[1])
+    bottom = min(box_a[2], box_b[2])
+    left = max(box_a[3], box_b[3])
+    
+    intersection = box_area((top, right, bottom, left))
+    if intersection == 0:
+        return 0.0
+        
+    return intersection / float(box_area(box_a) + box_area(box_b) - intersection)
+
+def clip_box(box, width, height):
+    """
+    将人脸框裁剪到图像范围内
+    
+    Args:
+        box: (top, right, bottom, left)
+        width (int): 图像宽度
+        height (int): 图像高度
+        
+    Returns:
+        tuple: 裁剪后的人脸框
+    """
+    top, right, bottom, left = box
+    return (
+        max(0, min(height, int(top))),
+        max(0, min(width, int(right))),
+        max(0, min(height, int(bottom))),
+        max(0, min(width, int(left)))
+    )
+
+
+def expand_box(box, ratio, width, height):
+    """
+    按人脸框尺寸向四周扩展，并裁剪到图像范围内
+    
+    Args:
+        box: (top, right, bottom, left)
+        ratio (float): 每边扩展的比例（相对框的宽/高）
+        width (int): 图像宽度
+        height (int): 图像高度
+        
+    Returns:
+        tuple: 扩展后的框
+    """
+    top, right, bottom, left = box
+    pad_x = int((right - left) * ratio)
+    pad_y = int((bottom - top) * ratio)
+    return clip_box((top - pad_y, right + pad_x, bottom + pad_y, left - pad_x), width, height)
+
+def merge_boxes(boxes):
+    """
+    合并相互重叠的框，直到没有重叠为止
+    
+    Args:
+        boxes: 框列表 (top, right, bottom, left)
+        
+    Returns:
+        list: 合并后的框
+    """
+    merged = [tuple(box) for box in boxes]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                a, b = merged[i], merged[j]
+                if a[0] < b[2] and b[0] < a[2] and a[3] < b[1] and b[3] < a[1]:
+                    merged[i] = (min(a[0], b[0]), max(a[1], b[1]), max(a[2], b[2]), min(a[3], b[3]))
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
+
+def suppress_duplicates(boxes, iou_threshold=0.5):
+    """
+    去除重复的框（交并比超过阈值时保留面积较大的一个）
+    
+    Args:
+        boxes: 框列表 (top, right, bottom, left)
+        iou_threshold (float): 视为重复的交并比阈值
+        
+    Returns:
+        list: 去重后的框
+    """
+    kept = []
+    for box in sorted(boxes, key=box_area, reverse=True):
+        if all(box_iou(box, other) < iou_threshold for other in kept):
+            kept.append(box)
+    return kept
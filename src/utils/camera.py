@@ -1,8 +1,13 @@
-import cv2
+import time
 import logging
+import threading
+
+from utils import metrics
+from utils.frame_sources import DeviceSource
 
 class Camera:
-    def __init__(self, device_id=0, width=640, height=480, fps=30):
+    def __init__(self, device_id=0, width=640, height=480, fps=30, threaded=False, buffer_size=3,
+                 source=None):
         """
         初始化摄像头
         
@@ -11,41 +16,151 @@ class Camera:
             width (int): 图像宽度
             height (int): 图像高度
             fps (int): 帧率
+            threaded (bool): 是否使用后台采集线程（get_frame 总是返回最新帧）
+            buffer_size (int): 后台采集的环形缓冲槽数（至少3个：读者持有、最新、写入中）
+            source: 帧来源（见 utils.frame_sources），留空则打开 device_id 对应的摄像头
         """
         self.device_id = device_id
         self.width = width
         self.height = height
         self.fps = fps
+        self.threaded = threaded
         self.logger = logging.getLogger(__name__)
         
-        # 初始化摄像头
-        self.cap = cv2.VideoCapture(device_id)
-        if not self.cap.isOpened():
-            raise RuntimeError(f"Failed to open camera {device_id}")
-            
-        # 设置摄像头参数
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-        self.cap.set(cv2.CAP_PROP_FPS, fps)
+        # 初始化帧来源（默认为摄像头设备）
+        self.source = source if source is not None else DeviceSource(device_id, width, height, fps)
+        
+        # 最近一次 get_frame 返回的帧序号和采集时间
+        self.frame_seq = 0
+        self.frame_timestamp = None
+        self.dropped_frames = 0
+        self._frame_buffer = None
+        
+        if threaded:
+            self._start_capture_thread(max(3, buffer_size))
         
-        self.logger.info(f"Camera initialized: {width}x{height} @ {fps}fps")
+        self.logger.info(
+            f"Camera initialized: {self.source.describe()}, {width}x{height} @ {fps}fps"
+            f"{' (threaded)' if threaded else ''}"
+        )
+        
+    def _start_capture_thread(self, buffer_size):
+        """启动后台采集线程"""
+        self._slots = [None] * buffer_size
+        self._slot_seqs = [0] * buffer_size
+        self._slot_timestamps = [0.0] * buffer_size
+        self._latest = None
+        self._held = None
+        self._captured_seq = 0
+        self._consumed_seq = 0
+        self._running = True
+        self._cond = threading.Condition()
+        
+        self._thread = threading.Thread(target=self._capture_loop, name="CameraCapture", daemon=True)
+        self._thread.start()
+        
+    def _capture_loop(self):
+        """持续采集，写入既不是最新帧也未被读者持有的槽（实时来源会丢弃未取走的旧帧）"""
+        while self._running:
+            with self._cond:
+                if not self.source.live:
+                    # 非实时来源：等读者取走上一帧再读下一帧，不丢帧
+                    self._cond.wait_for(
+                        lambda: self._captured_seq == self._consumed_seq or not self._running
+                    )
+                if not self._running:
+                    break
+                slot = next(
+                    i for i in range(len(self._slots))
+                    if i != self._latest and i != self._held
+                )
+            
+            with metrics.timer('capture'):
+                ret, frame = self.source.read(self._slots[slot])
+            timestamp = time.time()
+            if not ret:
+                if self.source.finished:
+                    # 有限来源读完，唤醒等待中的读者
+                    with self._cond:
+                        self._running = False
+                        self._cond.notify_all()
+                    break
+                self.logger.error("Failed to capture frame")
+                time.sleep(0.01)
+                continue
+            
+            with self._cond:
+                # 上一帧最新帧还没被取走就被覆盖，计为丢帧
+                if self._captured_seq > self._consumed_seq:
+                    self.dropped_frames += 1
+                self._captured_seq += 1
+                metrics.count('frames_captured')
+                self._slots[slot] = frame
+                self._slot_seqs[slot] = self._captured_seq
+                self._slot_timestamps[slot] = timestamp
+                self._latest = slot
+                self._cond.notify_all()
         
-    def get_frame(self):
+    def get_frame(self, timeout=1.0):
         """
         获取一帧图像
         
+        帧数据读入复用的缓冲，返回的数组在下一次调用 get_frame 之前保持有效；
+        后台采集模式下返回最新的一帧（等待比上次更新的帧）。
+        
+        Args:
+            timeout (float): 后台采集模式下等待新帧的最长时间（秒）
+        
         Returns:
             numpy.ndarray: 图像数据，如果失败则返回None
         """
-        ret, frame = self.cap.read()
-        if not ret:
-            self.logger.error("Failed to capture frame")
-            return None
+        if not self.threaded:
+            # 读入复用的缓冲，避免每帧分配新数组
+            with metrics.timer('capture'):
+                ret, frame = self.source.read(self._frame_buffer)
+            if not ret:
+                if not self.source.finished:
+                    self.logger.error("Failed to capture frame")
+                return None
             
-        return frame
+            self._frame_buffer = frame
+            metrics.count('frames_captured')
+            self.frame_seq += 1
+            self.frame_timestamp = time.time()
+            return frame
+        
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._captured_seq > self._consumed_seq or not self._running, timeout
+            ) or self._captured_seq == self._consumed_seq:
+                return None
+            
+            self._held = self._latest
+            self._consumed_seq = self._slot_seqs[self._held]
+            self._cond.notify_all()
+            self.frame_seq = self._consumed_seq
+            self.frame_timestamp = self._slot_timestamps[self._held]
+            return self._slots[self._held]
+        
+    @property
+    def finished(self):
+        """有限来源（视频文件、图像目录）是否已读完且没有未取走的帧"""
+        if not self.source.finished:
+            return False
+        return not self.threaded or self._captured_seq == self._consumed_seq
         
     def release(self):
         """释放摄像头资源"""
-        if self.cap is not None:
-            self.cap.release()
-            self.logger.info("Camera released") 
\ No newline at end of file
+        if self.threaded:
+            # 持锁置位并唤醒，等待中的采集线程才能立即退出
+            with self._cond:
+                self._running = False
+                self._cond.notify_all()
+            # 采集线程退出后再释放来源，避免与 source.read 并发
+            self._thread.join(timeout=1.0)
+            if self._thread.is_alive():
+                self.logger.warning("Capture thread did not stop within 1.0s")
+        
+        if self.source is not None:
+            self.source.release()
+            self.logger.info(f"Camera released ({self.dropped_frames} frames dropped)")
\ No newline at end of file
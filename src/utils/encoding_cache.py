@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+ENCODING_DIM = 128
+
+
+def file_digest(path, chunk_size=1 << 16):
+    """
+    计算文件内容的 SHA-1 摘要
+
+    Args:
+        path: 文件路径
+        chunk_size (int): 每次读取的字节数
+
+    Returns:
+        str: 十六进制摘要
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class EncodingCache:
+    """
+    人脸编码磁盘缓存
+
+    每个图库对应一个 .npz 文件，按 文件路径 + 大小 + mtime 索引；
+    大小相同但 mtime 变化时再用内容摘要确认，避免被 touch 过的文件重新编码。
+    未检测到人脸的图像同样会被记录，下次启动直接跳过。
+    """
+
+    VERSION = 1
+
+    def __init__(self, cache_path, root):
+        """
+        初始化编码缓存
+
+        Args:
+            cache_path: 缓存文件路径
+            root: 图库根目录，缓存中的路径相对该目录保存
+        """
+        self.cache_path = Path(cache_path)
+        self.root = Path(root)
+        self.logger = logging.getLogger(__name__)
+        # 相对路径 -> (大小, mtime_ns, 摘要, 编码或None)
+        self._entries = {}
+        self._dirty = False
+
+        self._load()
+
+    def _key(self, path):
+        return Path(path).relative_to(self.root).as_posix()
+
+    def _load(self):
+        """从磁盘加载缓存（一次性读取全部数组）"""
+        if not self.cache_path.exists():
+            return
+
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                if int(data['version']) != self.VERSION:
+                    self.logger.warning(
+                        f"Encoding cache version mismatch, rebuilding {self.cache_path}"
+                    )
+                    return
+                paths = data['paths']
+                sizes = data['sizes']
+                mtimes = data['mtimes']
+                digests = data['digests']
+                encodings = data['encodings']
+                valid = data['valid']
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable encoding cache {self.cache_path}: {str(e)}")
+            return
+
+        for i, key in enumerate(paths):
+            self._entries[str(key)] = (
+                int(sizes[i]),
+                int(mtimes[i]),
+                str(digests[i]),
+                encodings[i] if valid[i] else None
+            )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, path):
+        """
+        查询图像的缓存编码
+
+        Args:
+            path: 图像路径
+
+        Returns:
+            tuple: (是否命中, 编码)；命中但图像中无人脸时编码为None
+        """
+        key = self._key(path)
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+
+        size, mtime_ns, digest, encoding = entry
+        stat = os.stat(path)
+        if stat.st_size != size:
+            return False, None
+        if stat.st_mtime_ns == mtime_ns:
+            return True, encoding
+
+        # mtime 变化但内容可能未变（复制、touch 等）
+        if file_digest(path) != digest:
+            return False, None
+
+        self._entries[key] = (size, stat.st_mtime_ns, digest, encoding)
+        self._dirty = True
+        return True, encoding
+
+    def store(self, path, encoding):
+        """
+        记录图像的编码结果
+
+        Args:
+            path: 图像路径
+            encoding: 人脸编码，未检测到人脸时为None
+        """
+        stat = os.stat(path)
+        if encoding is not None:
+            encoding = np.asarray(encoding, dtype=np.float64)
+        self._entries[self._key(path)] = (
+            stat.st_size,
+            stat.st_mtime_ns,
+            file_digest(path),
+            encoding
+        )
+        self._dirty = True
+
+    def prune(self, existing_paths):
+        """
+        删除已不存在的图像对应的缓存项
+
+        Args:
+            existing_paths: 当前图库中的全部图像路径
+
+        Returns:
+            int: 删除的条目数
+        """
+        keep = {self._key(path) for path in existing_paths}
+        stale = [key for key in self._entries if key not in keep]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def save(self):
+        """将缓存写回磁盘（先写临时文件再原子替换）"""
+        if not self._dirty:
+            return
+
+        keys = sorted(self._entries)
+        count = len(keys)
+        encodings = np.zeros((count, ENCODING_DIM), dtype=np.float64)
+        valid = np.zeros(count, dtype=bool)
+        sizes = np.zeros(count, dtype=np.int64)
+        mtimes = np.zeros(count, dtype=np.int64)
+        digests = []
+
+        for i, key in enumerate(keys):
+            size, mtime_ns, digest, encoding = self._entries[key]
+            sizes[i] = size
+            mtimes[i] = mtime_ns
+            digests.append(digest)
+            if encoding is not None:
+                encodings[i] = encoding
+                valid[i] = True
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    version=np.int32(self.VERSION),
+                    paths=np.array(keys, dtype=str),
+                    sizes=sizes,
+                    mtimes=mtimes,
+                    digests=np.array(digests, dtype=str),
+                    encodings=encodings,
+                    valid=valid
+                )
+            os.replace(tmp_path, self.cache_path)
+            self._dirty = False
+            self.logger.debug(f"Saved {count} cached encodings to {self.cache_path}")
+        except Exception as e:
+            self.logger.error(f"Failed to save encoding cache: {str(e)}")
@@ -0,0 +1,111 @@
+import cv2
+import numpy as np
+import threading
+from collections import OrderedDict
+
+from utils import metrics
+
+class FramePool:
+    def __init__(self, max_per_shape=4, max_bytes=64 * 1024 * 1024):
+        """
+        初始化图像缓冲池（按形状复用预分配的数组，避免每帧分配）
+
+        空闲缓冲的总字节数超过 max_bytes 时，丢弃最久未使用的形状的缓冲。
+        形状每帧都在变化的图像（如 ROI 裁剪）不应放入缓冲池。
+
+        Args:
+            max_per_shape (int): 每种形状最多缓存的空闲缓冲数量
+            max_bytes (int): 空闲缓冲的总字节数上限
+        """
+        self.max_per_shape = max_per_shape
+        self.max_bytes = max_bytes
+        # (形状, 类型) -> 空闲缓冲列表，按最近使用排序
+        self._free = OrderedDict()
+        self._free_bytes = 0
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        """
+        取出一个指定形状的缓冲（内容未初始化）
+
+        Args:
+            shape: 数组形状
+            dtype: 数据类型
+
+        Returns:
+            numpy.ndarray: C 连续的缓冲数组
+        """
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self._free.move_to_end(key)
+                self.reuses += 1
+                buffer = free.pop()
+                self._free_bytes -= buffer.nbytes
+                return buffer
+            self.allocations += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer):
+        """
+        归还缓冲，之后调用方不得再使用该数组
+
+        Args:
+            buffer: acquire 取出的数组
+        """
+        if buffer is None or buffer.nbytes > self.max_bytes:
+            return
+        key = (buffer.shape, buffer.dtype.str)
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            self._free.move_to_end(key)
+            if len(free) >= self.max_per_shape:
+                return
+            free.append(buffer)
+            self._free_bytes += buffer.nbytes
+
+            # 超出总量上限时从最久未使用的形状开始丢弃
+            while self._free_bytes > self.max_bytes:
+                oldest_key, oldest = next(iter(self._free.items()))
+                if oldest:
+                    self._free_bytes -= oldest.pop(0).nbytes
+                    self.evictions += 1
+                if not oldest:
+                    del self._free[oldest_key]
+
+    def bgr_to_rgb(self, frame):
+        """
+        将 BGR 图像一次性转换到池中的连续 RGB 缓冲（dlib 无需再复制）
+
+        Args:
+            frame: BGR 图像（可以是非连续的切片）
+
+        Returns:
+            numpy.ndarray: RGB 缓冲，用完后需 release
+        """
+        rgb = self.acquire(frame.shape, frame.dtype)
+        with metrics.timer('color_convert'):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        return rgb
+
+    def resize(self, frame, scale, interpolation=cv2.INTER_AREA):
+        """
+        按比例缩放到池中的缓冲
+
+        Args:
+            frame: 输入图像
+            scale (float): 缩放比例
+            interpolation: 插值方式
+
+        Returns:
+            numpy.ndarray: 缩放后的缓冲，用完后需 release
+        """
+        height, width = frame.shape[:2]
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        resized = self.acquire((size[1], size[0]) + frame.shape[2:], frame.dtype)
+        cv2.resize(frame, size, dst=resized, interpolation=interpolation)
+        return resized
@@ -0,0 +1,348 @@
+"""
+帧来源：摄像头、视频文件、图像目录和合成人脸流。
+所有来源都实现与 cv2.VideoCapture 相同的 read(image=None) 接口，
+可以直接交给 Camera 使用，便于在没有摄像头的机器上复现吞吐测试。
+"""
+
+import time
+import logging
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class _Pacer:
+    def __init__(self, fps):
+        """
+        按固定帧率节流（fps 为 0 或 None 时不等待，尽可能快地输出）
+
+        Args:
+            fps (float): 目标帧率
+        """
+        self.interval = 1.0 / fps if fps else 0.0
+        self._next = None
+
+    def wait(self):
+        """等待到下一帧的输出时间"""
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        if self._next is None or now - self._next > self.interval:
+            # 首帧或落后超过一帧时重新对齐，不追赶积压的帧
+            self._next = now
+        elif self._next > now:
+            time.sleep(self._next - now)
+        self._next += self.interval
+
+
+def _copy_into(image, buffer):
+    """将图像复制进复用缓冲（形状不一致时直接返回原图像）"""
+    if buffer is not None and buffer.shape == image.shape and buffer.dtype == image.dtype:
+        np.copyto(buffer, image)
+        return buffer
+    return image
+
+
+class FrameSource:
+    """帧来源基类"""
+
+    # 有限来源（文件、目录）读完后置为 True
+    finished = False
+    # 是否按实时节奏产生帧；非实时来源由 Camera 背压而不丢帧，保证结果可复现
+    live = True
+
+    def read(self, image=None):
+        """
+        读取一帧
+
+        Args:
+            image: 可选的复用缓冲，形状匹配时帧数据写入其中
+
+        Returns:
+            tuple: (是否成功, 图像)
+        """
+        raise NotImplementedError
+
+    def release(self):
+        """释放资源"""
+
+    def describe(self):
+        """用于日志的来源描述"""
+        return type(self).__name__
+
+
+class DeviceSource(FrameSource):
+    def __init__(self, device_id=0, width=640, height=480, fps=30):
+        """
+        打开摄像头设备
+
+        Args:
+            device_id (int): 摄像头设备ID
+            width (int): 图像宽度
+            height (int): 图像高度
+            fps (int): 帧率
+        """
+        self.device_id = device_id
+        self.cap = cv2.VideoCapture(device_id)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Failed to open camera {device_id}")
+
+        # 设置摄像头参数
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.cap.set(cv2.CAP_PROP_FPS, fps)
+
+    def read(self, image=None):
+        return self.cap.read(image)
+
+    def release(self):
+        self.cap.release()
+
+    def describe(self):
+        return f"device {self.device_id}"
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, realtime=True, loop=False):
+        """
+        从录制的视频文件读取帧
+
+        Args:
+            path: 视频文件路径
+            realtime (bool): 是否按文件帧率实时输出（False 则尽可能快）
+            loop (bool): 读完后是否从头循环
+        """
+        self.path = Path(path)
+        self.loop = loop
+        self.cap = cv2.VideoCapture(str(self.path))
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Failed to open video {self.path}")
+
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.live = realtime
+        self._pacer = _Pacer(self.fps if realtime else None)
+
+    def read(self, image=None):
+        if self.finished:
+            return False, None
+
+        ret, frame = self.cap.read(image)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image)
+        if not ret:
+            self.finished = True
+            return False, None
+
+        self._pacer.wait()
+        return True, frame
+
+    def release(self):
+        self.cap.release()
+
+    def describe(self):
+        return f"video {self.path} ({self.frame_count} frames @ {self.fps:.1f}fps)"
+
+
+class ImageDirectorySource(FrameSource):
+    def __init__(self, path, fps=0, loop=False):
+        """
+        按文件名顺序读取目录中的图像
+
+        Args:
+            path: 图像目录
+            fps (float): 输出帧率（0 = 尽可能快）
+            loop (bool): 读完后是否从头循环
+        """
+        self.path = Path(path)
+        self.loop = loop
+        self.files = sorted(
+            p for p in self.path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+        ) if self.path.is_dir() else []
+        if not self.files:
+            raise RuntimeError(f"No images found in {self.path}")
+
+        self._position = 0
+        self.live = bool(fps)
+        self._pacer = _Pacer(fps)
+        self.logger = logging.getLogger(__name__)
+
+    def read(self, image=None):
+        while not self.finished:
+            if self._position >= len(self.files):
+                if not self.loop:
+                    self.finished = True
+                    break
+                self._position = 0
+
+            path = self.files[self._position]
+            self._position += 1
+            frame = cv2.imread(str(path))
+            if frame is None:
+                self.logger.warning(f"Skipping unreadable image {path}")
+                continue
+
+            self._pacer.wait()
+            return True, _copy_into(frame, image)
+        return False, None
+
+    def describe(self):
+        return f"images {self.path} ({len(self.files)} files)"
+
+
+class SyntheticSource(FrameSource):
+    def __init__(self, width=640, height=480, faces_dir="data/faces", backgrounds_dir=None,
+                 faces_per_frame=1, face_size=(80, 160), frame_count=0, fps=30, seed=0):
+        """
+        把人脸裁剪图贴到背景上生成合成帧（固定随机种子，结果可复现）
+
+        人脸沿直线缓慢移动并在边缘反弹，使跟踪、运动门限等逻辑得到真实的负载。
+        data/faces 中没有图像时退化为绘制的简笔人脸（HOG 不一定能检出）。
+
+        Args:
+            width (int): 图像宽度
+            height (int): 图像高度
+            faces_dir: 人脸裁剪图目录（<人名>/*.jpg）
+            backgrounds_dir: 背景图目录，留空则生成渐变噪声背景
+            faces_per_frame (int): 每帧人脸数量
+            face_size (tuple): 人脸边长范围（像素）
+            frame_count (int): 总帧数（0 = 无限）
+            fps (float): 输出帧率（0 = 尽可能快）
+            seed (int): 随机种子
+        """
+        self.width = width
+        self.height = height
+        self.frame_count = frame_count
+        self.rng = np.random.default_rng(seed)
+        self.live = bool(fps)
+        self._pacer = _Pacer(fps)
+        self._produced = 0
+
+        self.faces = self._load_images(faces_dir, "*/*") or [self._draw_face()]
+        self.backgrounds = [
+            cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+            for image in self._load_images(backgrounds_dir, "*")
+        ] or [self._make_background()]
+        self._background = self.backgrounds[0]
+
+        # 每张人脸的 [x, y, vx, vy, 边长, 裁剪图]
+        self._actors = []
+        for _ in range(faces_per_frame):
+            size = int(self.rng.integers(face_size[0], face_size[1] + 1))
+            size = min(size, width, height)
+            face = self.faces[int(self.rng.integers(len(self.faces)))]
+            self._actors.append([
+                float(self.rng.uniform(0, width - size)),
+                float(self.rng.uniform(0, height - size)),
+                float(self.rng.uniform(-3, 3)),
+                float(self.rng.uniform(-2, 2)),
+                size,
+                cv2.resize(face, (size, size), interpolation=cv2.INTER_AREA),
+            ])
+
+        # 最近一帧中各人脸的真实位置 (top, right, bottom, left)
+        self.last_boxes = []
+
+    @staticmethod
+    def _load_images(directory, pattern):
+        if not directory or not Path(directory).is_dir():
+            return []
+        images = []
+        for path in sorted(Path(directory).glob(pattern)):
+            if path.suffix.lower() in IMAGE_SUFFIXES:
+                image = cv2.imread(str(path))
+                if image is not None:
+                    images.append(image)
+        return images
+
+    def _make_background(self):
+        """生成带噪声的渐变背景"""
+        gradient = np.linspace(60, 180, self.width, dtype=np.float32)
+        background = np.repeat(gradient[None, :, None], self.height, axis=0).repeat(3, axis=2)
+        background += self.rng.normal(0, 8, background.shape).astype(np.float32)
+        return np.clip(background, 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def _draw_face():
+        """绘制一张简笔人脸"""
+        face = np.full((128, 128, 3), 90, dtype=np.uint8)
+        cv2.ellipse(face, (64, 64), (44, 56), 0, 0, 360, (150, 180, 220), -1)
+        for x in (46, 82):
+            cv2.circle(face, (x, 52), 6, (40, 40, 40), -1)
+        cv2.ellipse(face, (64, 88), (18, 8), 0, 0, 180, (60, 60, 140), 3)
+        return face
+
+    def read(self, image=None):
+        if self.frame_count and self._produced >= self.frame_count:
+            self.finished = True
+            return False, None
+
+        if image is None or image.shape != (self.height, self.width, 3):
+            image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        if len(self.backgrounds) > 1 and self._produced % 300 == 0:
+            self._background = self.backgrounds[int(self.rng.integers(len(self.backgrounds)))]
+        np.copyto(image, self._background)
+
+        self.last_boxes = []
+        for actor in self._actors:
+            x, y, vx, vy, size, face = actor
+            x, y = x + vx, y + vy
+            if not 0 <= x <= self.width - size:
+                vx = -vx
+                x = min(max(x, 0), self.width - size)
+            if not 0 <= y <= self.height - size:
+                vy = -vy
+                y = min(max(y, 0), self.height - size)
+            actor[:4] = [x, y, vx, vy]
+
+            left, top = int(x), int(y)
+            image[top:top + size, left:left + size] = face
+            self.last_boxes.append((top, left + size, top + size, left))
+
+        self._produced += 1
+        self._pacer.wait()
+        return True, image
+
+    def describe(self):
+        return (f"synthetic {self.width}x{self.height} "
+                f"({len(self._actors)} faces from {len(self.faces)} crops)")
+
+
+def create_frame_source(camera):
+    """
+    根据配置创建帧来源
+
+    Args:
+        camera (CameraSettings): 配置中的 camera 部分
+
+    Returns:
+        FrameSource: 帧来源
+    """
+    if camera.source == 'device':
+        return DeviceSource(camera.device_id, camera.width, camera.height, camera.fps)
+
+    if camera.source == 'video':
+        return VideoFileSource(camera.video.path, realtime=camera.video.realtime, loop=camera.video.loop)
+
+    if camera.source == 'images':
+        return ImageDirectorySource(camera.images.path, fps=camera.images.fps, loop=camera.images.loop)
+
+    if camera.source == 'synthetic':
+        synthetic = camera.synthetic
+        return SyntheticSource(
+            width=camera.width,
+            height=camera.height,
+            faces_dir=synthetic.faces_dir,
+            backgrounds_dir=synthetic.backgrounds_dir,
+            faces_per_frame=synthetic.faces_per_frame,
+            face_size=synthetic.face_size,
+            frame_count=synthetic.frame_count,
+            fps=camera.fps if synthetic.fps is None else synthetic.fps,
+            seed=synthetic.seed
+        )
+
+    raise ValueError(f"Unknown frame source: {camera.source}")
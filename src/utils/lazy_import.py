@@ -0,0 +1,61 @@
+"""
+延迟导入：带模型权重的模块（如 face_recognition 在导入时加载 dlib 检测器、
+关键点模型和 ResNet 权重）在第一次访问属性时才导入，不拖慢进程启动。
+"""
+
+import time
+import logging
+import importlib
+import threading
+
+
+class LazyModule:
+    def __init__(self, name):
+        """
+        初始化延迟导入的模块代理
+
+        Args:
+            name (str): 模块名
+        """
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        """模块是否已经导入"""
+        return self._module is not None
+
+    def load(self):
+        """
+        导入模块（线程安全，只导入一次）
+
+        Returns:
+            module: 导入的模块
+        """
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    logging.getLogger(__name__).info(
+                        f"Imported {self._name} in {time.perf_counter() - start:.2f}s"
+                    )
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+def lazy_import(name):
+    """
+    创建延迟导入的模块代理，用法与 import 得到的模块相同
+
+    Args:
+        name (str): 模块名
+
+    Returns:
+        LazyModule: 模块代理
+    """
+    return LazyModule(name)
@@ -1,45 +1,156 @@
-import logging
 import sys
+import queue
+import atexit
+import logging
+import threading
 from pathlib import Path
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+# 进程内唯一的后台日志线程（setup_logger 重复调用时复用）
+_listener = None
+_queue_handler = None
+_setup_lock = threading.Lock()
+
+
+class DroppingQueueHandler(QueueHandler):
+    def __init__(self, log_queue):
+        """
+        非阻塞的队列日志处理器：队列满时丢弃记录并计数，绝不阻塞调用线程
+
+        丢弃发生后，队列有空位时先补发一条警告，说明期间丢弃了多少条记录。
+
+        Args:
+            log_queue: 有界队列（queue.Queue）
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+
+    def enqueue(self, record):
+        try:
+            if self._unreported:
+                count = self._unreported
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': __name__,
+                    'levelno': logging.WARNING,
+                    'levelname': 'WARNING',
+                    'msg': f"Log queue full, dropped {count} records",
+                }))
+                self._unreported -= count
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
 
-def setup_logger(level="INFO"):
+
+class _DrainingQueueListener(QueueListener):
+    """结束标记阻塞放入：队列已满时等待后台线程腾出空位，保证停止时不丢失结束标记"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def setup_logger(level="INFO", log_file="logs/app.log", max_bytes=10 * 1024 * 1024, backup_count=5,
+                 rotate_when=None, queue_size=10000):
     """
     设置日志系统
-    
+
+    日志记录只在调用线程中格式化后放入有界队列，控制台和文件输出由后台线程完成，
+    磁盘变慢时丢弃记录而不是阻塞识别线程。重复调用只更新日志级别，不会重复添加处理器。
+
     Args:
         level (str): 日志级别
-        
+        log_file (str): 日志文件路径
+        max_bytes (int): 按大小轮转的文件上限（字节），设置了 rotate_when 时不生效
+        backup_count (int): 保留的历史日志文件数
+        rotate_when (str): 按时间轮转的周期（如 'midnight'、'H'），为None时按大小轮转
+        queue_size (int): 日志队列容量
+
     Returns:
         logging.Logger: 配置好的日志记录器
     """
-    # 创建日志目录
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    # 创建日志记录器
+    global _listener, _queue_handler
+
     logger = logging.getLogger()
-    logger.setLevel(getattr(logging, level.upper()))
-    
-    # 创建控制台处理器
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(getattr(logging, level.upper()))
-    
-    # 创建文件处理器
-    file_handler = logging.FileHandler(
-        log_dir / "app.log",
-        encoding='utf-8'
-    )
-    file_handler.setLevel(getattr(logging, level.upper()))
-    
-    # 创建格式化器
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    console_handler.setFormatter(formatter)
-    file_handler.setFormatter(formatter)
-    
-    # 添加处理器
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
-    
-    return logger 
\ No newline at end of file
+    log_level = getattr(logging, level.upper())
+    logger.setLevel(log_level)
+
+    with _setup_lock:
+        if _listener is not None:
+            for handler in _listener.handlers:
+                handler.setLevel(log_level)
+            return logger
+
+        # 创建日志目录
+        log_path = Path(log_file)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 创建控制台处理器
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(log_level)
+
+        # 创建文件处理器（按大小或时间轮转）
+        if rotate_when:
+            file_handler = TimedRotatingFileHandler(
+                log_path,
+                when=rotate_when,
+                backupCount=backup_count,
+                encoding='utf-8'
+            )
+        else:
+            file_handler = RotatingFileHandler(
+                log_path,
+                maxBytes=max_bytes,
+                backupCount=backup_count,
+                encoding='utf-8'
+            )
+        file_handler.setLevel(log_level)
+
+        # 创建格式化器
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        console_handler.setFormatter(formatter)
+        file_handler.setFormatter(formatter)
+
+        # 根记录器只挂队列处理器，实际输出在后台线程中进行
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = _DrainingQueueListener(
+            _queue_handler.queue, console_handler, file_handler, respect_handler_level=True
+        )
+        _listener.start()
+        logger.addHandler(_queue_handler)
+        atexit.register(shutdown_logger)
+
+    return logger
+
+
+def dropped_records():
+    """
+    获取因队列已满而丢弃的日志记录数
+
+    Returns:
+        int: 丢弃数，未初始化时为0
+    """
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def shutdown_logger():
+    """停止后台日志线程并写出队列中剩余的记录（可重复调用）"""
+    global _listener
+
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logging.getLogger().removeHandler(_queue_handler)
+        for handler in _listener.handlers:
+            if _queue_handler.dropped:
+                handler.handle(logging.makeLogRecord({
+                    'name': __name__,
+                    'levelno': logging.WARNING,
+                    'levelname': 'WARNING',
+                    'msg': f"Dropped {_queue_handler.dropped} log records in total (queue full)",
+                }))
+            handler.close()
+        _listener = None
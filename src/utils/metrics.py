@@ -0,0 +1,444 @@
+"""
+轻量级性能指标：各阶段耗时直方图、计数器（帧率）和瞬时值。
+
+与 logging 类似，通过模块级函数使用全局注册表：
+
+    from utils import metrics
+
+    with metrics.timer('detect'):
+        ...
+    metrics.count('frames_captured')
+
+未启用时注册表是空实现，timer 返回共享的空上下文管理器，开销只有一次函数调用。
+启用后由 MetricsExporter 定期将每个统计区间的 p50/p95/p99、帧率写入 JSON lines 文件，
+并可选地在本地 HTTP 端口以 Prometheus 文本格式提供最近一次的统计。
+"""
+
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 直方图精度：每个 2 的幂区间划分的线性子桶数（相对误差约 1/SUB_BUCKETS）
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# 以微秒记录，覆盖 1us 到约 2^40us
+MAX_EXPONENT = 40
+
+PROMETHEUS_PREFIX = "physai"
+
+
+def _bucket_index(micros):
+    """对数-线性分桶（HDR 直方图）：小于 SUB_BUCKETS 的值精确记录，之后每个 2 的幂区间分 SUB_BUCKETS 个子桶"""
+    if micros < SUB_BUCKETS:
+        return max(micros, 0)
+    exponent = min(micros.bit_length() - SUB_BUCKET_BITS - 1, MAX_EXPONENT)
+    sub = min((micros >> exponent) - SUB_BUCKETS, SUB_BUCKETS - 1)
+    return (exponent + 1) * SUB_BUCKETS + sub
+
+
+def _bucket_value(index):
+    """子桶的代表值（微秒，取子桶中点）"""
+    if index < SUB_BUCKETS:
+        return float(index)
+    exponent = index // SUB_BUCKETS - 1
+    sub = index % SUB_BUCKETS
+    return ((SUB_BUCKETS + sub) << exponent) + ((1 << exponent) - 1) / 2.0
+
+
+class LatencyHistogram:
+    def __init__(self):
+        """初始化耗时直方图（当前统计区间 + 累计总数）"""
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self.total_count = 0
+        self.total_sum = 0.0
+
+    def record(self, seconds):
+        """
+        记录一次耗时
+
+        Args:
+            seconds (float): 耗时（秒）
+        """
+        index = _bucket_index(int(seconds * 1e6))
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self._count += 1
+            self._sum += seconds
+            if seconds > self._max:
+                self._max = seconds
+
+    def snapshot(self, quantiles=(0.5, 0.95, 0.99)):
+        """
+        取出当前统计区间的分位数并开始新的区间
+
+        Args:
+            quantiles: 需要计算的分位数
+
+        Returns:
+            dict: count、mean、max 和各分位数（秒），区间内没有记录时分位数为 None
+        """
+        with self._lock:
+            counts, count, total, maximum = self._counts, self._count, self._sum, self._max
+            self._counts, self._count, self._sum, self._max = {}, 0, 0.0, 0.0
+            self.total_count += count
+            self.total_sum += total
+
+        result = {
+            'count': count,
+            'mean': total / count if count else None,
+            'max': maximum if count else None,
+        }
+        targets = [(q, q * count) for q in quantiles]
+        values = {}
+        seen = 0
+        for index in sorted(counts):
+            seen += counts[index]
+            while targets and seen >= targets[0][1]:
+                q, _ = targets.pop(0)
+                # 代表值不超过真实最大值
+                values[q] = min(_bucket_value(index) / 1e6, maximum)
+        for q in quantiles:
+            result[f"p{round(q * 100):d}"] = values.get(q) if count else None
+        return result
+
+
+class _NullTimer:
+    """未启用时的空计时器"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+
+class NullRegistry:
+    """未启用指标时的空注册表"""
+
+    enabled = False
+
+    def timer(self, name):
+        return _NULL_TIMER
+
+    def observe(self, name, seconds):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """初始化指标注册表"""
+        self.enabled = True
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._last_counters = {}
+        self._last_snapshot_time = time.perf_counter()
+        self.last_snapshot = None
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def timer(self, name):
+        """
+        计时上下文管理器
+
+        Args:
+            name (str): 阶段名称
+        """
+        return _Timer(self.histogram(name))
+
+    def observe(self, name, seconds):
+        """
+        直接记录一次耗时
+
+        Args:
+            name (str): 阶段名称
+            seconds (float): 耗时（秒）
+        """
+        self.histogram(name).record(seconds)
+
+    def count(self, name, value=1):
+        """
+        累加计数器
+
+        Args:
+            name (str): 计数器名称
+            value (int): 增量
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        """
+        设置瞬时值
+
+        Args:
+            name (str): 名称
+            value (float): 当前值
+        """
+        self.gauges[name] = value
+
+    def snapshot(self):
+        """
+        结束当前统计区间，汇总各直方图分位数和计数器速率
+
+        Returns:
+            dict: 统计结果
+        """
+        now = time.perf_counter()
+        interval = max(now - self._last_snapshot_time, 1e-9)
+        self._last_snapshot_time = now
+
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = list(self.histograms.items())
+
+        snapshot = {
+            'timestamp': time.time(),
+            'interval': interval,
+            'timers': {},
+            'counters': {},
+            'gauges': dict(self.gauges),
+        }
+        for name, histogram in histograms:
+            stats = histogram.snapshot()
+            stats['total_count'] = histogram.total_count
+            stats['total_sum'] = histogram.total_sum
+            snapshot['timers'][name] = stats
+        for name, total in counters.items():
+            delta = total - self._last_counters.get(name, 0)
+            snapshot['counters'][name] = {'total': total, 'rate': delta / interval}
+        self._last_counters = counters
+        self.last_snapshot = snapshot
+        return snapshot
+
+
+_registry = NullRegistry()
+
+
+def get_registry():
+    """获取当前的全局注册表"""
+    return _registry
+
+
+def configure(enabled=True):
+    """
+    启用或关闭全局指标注册表
+
+    Args:
+        enabled (bool): 是否启用
+
+    Returns:
+        当前的注册表
+    """
+    global _registry
+    if enabled and not _registry.enabled:
+        _registry = MetricsRegistry()
+    elif not enabled:
+        _registry = NullRegistry()
+    return _registry
+
+
+def timer(name):
+    """计时上下文管理器，见 MetricsRegistry.timer"""
+    return _registry.timer(name)
+
+
+def observe(name, seconds):
+    """记录一次耗时，见 MetricsRegistry.observe"""
+    _registry.observe(name, seconds)
+
+
+def count(name, value=1):
+    """累加计数器，见 MetricsRegistry.count"""
+    _registry.count(name, value)
+
+
+def gauge(name, value):
+    """设置瞬时值，见 MetricsRegistry.gauge"""
+    _registry.gauge(name, value)
+
+
+def format_prometheus(snapshot):
+    """
+    将统计结果格式化为 Prometheus 文本格式
+
+    Args:
+        snapshot (dict): MetricsRegistry.snapshot 的结果
+
+    Returns:
+        str: 文本格式的指标
+    """
+    if snapshot is None:
+        return ""
+
+    lines = [
+        f"# HELP {PROMETHEUS_PREFIX}_stage_latency_seconds Per-stage latency over the last export interval",
+        f"# TYPE {PROMETHEUS_PREFIX}_stage_latency_seconds summary",
+    ]
+    for name, stats in sorted(snapshot['timers'].items()):
+        for key, quantile in (('p50', '0.5'), ('p95', '0.95'), ('p99', '0.99')):
+            if stats[key] is not None:
+                lines.append(
+                    f'{PROMETHEUS_PREFIX}_stage_latency_seconds{{stage="{name}",quantile="{quantile}"}} '
+                    f'{stats[key]:.6f}'
+                )
+        lines.append(f'{PROMETHEUS_PREFIX}_stage_latency_seconds_count{{stage="{name}"}} {stats["total_count"]}')
+        lines.append(f'{PROMETHEUS_PREFIX}_stage_latency_seconds_sum{{stage="{name}"}} {stats["total_sum"]:.6f}')
+
+    for name, stats in sorted(snapshot['counters'].items()):
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name}_total counter")
+        lines.append(f"{PROMETHEUS_PREFIX}_{name}_total {stats['total']}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name}_per_second gauge")
+        lines.append(f"{PROMETHEUS_PREFIX}_{name}_per_second {stats['rate']:.3f}")
+
+    for name, value in sorted(snapshot['gauges'].items()):
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge")
+        lines.append(f"{PROMETHEUS_PREFIX}_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter(threading.Thread):
+    def __init__(self, registry, interval=10.0, jsonl_path=None, prometheus_port=None,
+                 prometheus_host="127.0.0.1"):
+        """
+        初始化指标导出线程
+
+        Args:
+            registry: 已启用的 MetricsRegistry
+            interval (float): 统计区间 / 导出间隔（秒）
+            jsonl_path: JSON lines 输出文件，为None时不写文件
+            prometheus_port (int): Prometheus 文本格式的 HTTP 端口，为None时不启动
+            prometheus_host (str): HTTP 监听地址（默认只监听本机）
+        """
+        super().__init__(name="MetricsExporter", daemon=True)
+        self.registry = registry
+        self.interval = interval
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.logger = logging.getLogger(__name__)
+        self._stop_event = threading.Event()
+
+        if self.jsonl_path is not None:
+            self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._server = None
+        if prometheus_port:
+            self._server = self._start_http_server(prometheus_host, prometheus_port)
+
+    def _start_http_server(self, host, port):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = format_prometheus(registry.last_snapshot).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="MetricsHTTP", daemon=True).start()
+        self.logger.info(f"Serving Prometheus metrics on http://{host}:{port}/metrics")
+        return server
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.export()
+
+    def export(self):
+        """结束当前统计区间并写出"""
+        snapshot = self.registry.snapshot()
+        if self.jsonl_path is not None:
+            try:
+                with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+            except OSError as e:
+                self.logger.error(f"Failed to write metrics: {str(e)}")
+        return snapshot
+
+    def stop(self):
+        """停止导出线程并写出最后一个区间"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=1.0)
+        self.export()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def setup_metrics(metrics_settings, instance=None, port_offset=0):
+    """
+    按配置启用指标并启动导出线程
+
+    Args:
+        metrics_settings (MetricsSettings): 配置中的 metrics 部分
+        instance: 实例名（多进程时区分 JSON lines 文件，如摄像头编号）
+        port_offset (int): Prometheus 端口偏移（多进程时每个进程一个端口）
+
+    Returns:
+        MetricsExporter: 已启动的导出线程，未启用时返回 None
+    """
+    if not metrics_settings.enabled:
+        configure(False)
+        return None
+
+    jsonl_path = metrics_settings.jsonl_path
+    if jsonl_path and instance is not None:
+        path = Path(jsonl_path)
+        jsonl_path = path.with_name(f"{path.stem}.{instance}{path.suffix}")
+    port = metrics_settings.prometheus_port
+
+    exporter = MetricsExporter(
+        configure(True),
+        interval=metrics_settings.interval,
+        jsonl_path=jsonl_path,
+        prometheus_port=port + port_offset if port else None,
+        prometheus_host=metrics_settings.prometheus_host
+    )
+    exporter.start()
+    return exporter
@@ -0,0 +1,240 @@
+"""
+由有界队列连接的多阶段流水线：每个阶段一个线程，吞吐由最慢的阶段决定，
+而不是所有阶段耗时之和。
+
+队列满时的策略：
+    - drop_oldest=True：丢弃最旧的元素（帧队列，总是处理最新的画面）
+    - drop_oldest=False：阻塞上游直到有空位（事件队列，绝不丢弃）
+队列深度、丢弃数和上游阻塞时间都会统计，用于观察背压。
+"""
+
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+# 结束标记：不受队列容量限制，沿流水线向下游传递
+STOP = object()
+
+
+class BoundedQueue:
+    def __init__(self, name, maxsize, drop_oldest=False, on_drop=None):
+        """
+        初始化有界队列
+
+        Args:
+            name (str): 队列名称（用于统计）
+            maxsize (int): 最大深度
+            drop_oldest (bool): 队列满时丢弃最旧元素（否则阻塞上游）
+            on_drop: 元素被丢弃时的回调（如归还帧缓冲）
+        """
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.drop_oldest = drop_oldest
+        self.on_drop = on_drop
+
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.puts = 0
+        self.dropped = 0
+        self.blocked_time = 0.0
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        """
+        放入元素（按队列策略丢弃最旧元素或阻塞）
+
+        Args:
+            item: 元素
+        """
+        dropped = None
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.drop_oldest:
+                    dropped = self._items.popleft()
+                    self.dropped += 1
+                else:
+                    start = time.perf_counter()
+                    self._cond.wait_for(lambda: len(self._items) < self.maxsize)
+                    self.blocked_time += time.perf_counter() - start
+            self._items.append(item)
+            self.puts += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+
+        if dropped is not None and self.on_drop is not None:
+            self.on_drop(dropped)
+
+    def put_stop(self):
+        """放入结束标记（不受容量限制）"""
+        with self._cond:
+            self._items.append(STOP)
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """
+        取出元素
+
+        Args:
+            timeout (float): 最长等待时间（秒），为None时一直等待
+
+        Returns:
+            队首元素
+
+        Raises:
+            queue.Empty: 超时
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def stats(self):
+        """
+        获取队列统计
+
+        Returns:
+            dict: 当前深度、最大深度、放入数、丢弃数和上游阻塞时间
+        """
+        return {
+            'name': self.name,
+            'depth': len(self._items),
+            'maxsize': self.maxsize,
+            'max_depth': self.max_depth,
+            'puts': self.puts,
+            'dropped': self.dropped,
+            'blocked_time': self.blocked_time,
+        }
+
+
+class Stage(threading.Thread):
+    def __init__(self, name, handler, inbox=None, downstream=(), on_stop=None):
+        """
+        初始化流水线阶段
+
+        Args:
+            name (str): 阶段名称
+            handler: 处理函数；有 inbox 时为 handler(item)，
+                没有 inbox（源阶段）时为 handler()，返回 False 表示数据源结束
+            inbox (BoundedQueue): 输入队列，为None时为源阶段
+            downstream: 结束时需要传递结束标记的下游队列
+            on_stop: 阶段退出前的回调
+        """
+        super().__init__(name=f"Stage-{name}", daemon=True)
+        self.stage_name = name
+        self.handler = handler
+        self.inbox = inbox
+        self.downstream = list(downstream)
+        self.on_stop = on_stop
+        self.logger = logging.getLogger(__name__)
+
+        self.processed = 0
+        self.busy_time = 0.0
+        self.errors = 0
+        self._stop_event = threading.Event()
+
+    def request_stop(self):
+        """请求源阶段停止（其余阶段在收到结束标记后停止）"""
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            while True:
+                if self.inbox is None:
+                    if self._stop_event.is_set():
+                        break
+                    item = None
+                else:
+                    try:
+                        item = self.inbox.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if item is STOP:
+                        break
+
+                start = time.perf_counter()
+                try:
+                    result = self.handler() if self.inbox is None else self.handler(item)
+                except Exception as e:
+                    self.errors += 1
+                    self.logger.error(f"Stage {self.stage_name} failed: {str(e)}")
+                    result = None
+                self.busy_time += time.perf_counter() - start
+                self.processed += 1
+
+                if self.inbox is None and result is False:
+                    break
+        finally:
+            if self.on_stop is not None:
+                self.on_stop()
+            for downstream in self.downstream:
+                downstream.put_stop()
+
+
+class Pipeline:
+    def __init__(self, stages, queues):
+        """
+        初始化流水线
+
+        Args:
+            stages: 按上下游顺序排列的阶段，第一个为源阶段
+            queues: 阶段之间的队列（用于统计）
+        """
+        self.stages = stages
+        self.queues = queues
+        self.logger = logging.getLogger(__name__)
+        self._start_time = None
+
+    def start(self):
+        """启动所有阶段"""
+        self._start_time = time.perf_counter()
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        """停止数据源，结束标记随后沿流水线传递，下游处理完已入队的元素后退出"""
+        self.stages[0].request_stop()
+
+    def join(self, timeout=5.0):
+        """
+        等待所有阶段退出
+
+        Args:
+            timeout (float): 总等待时间（秒）
+
+        Returns:
+            bool: 是否全部退出
+        """
+        deadline = time.perf_counter() + timeout
+        for stage in self.stages:
+            stage.join(max(0.0, deadline - time.perf_counter()))
+        alive = [stage.stage_name for stage in self.stages if stage.is_alive()]
+        if alive:
+            self.logger.warning(f"Pipeline stages still running after {timeout:.1f}s: {', '.join(alive)}")
+        return not alive
+
+    def log_stats(self):
+        """输出各阶段吞吐、利用率和各队列的背压情况，并指出瓶颈阶段"""
+        elapsed = max(time.perf_counter() - self._start_time, 1e-9) if self._start_time else 1e-9
+        for stage in self.stages:
+            service_ms = stage.busy_time / stage.processed * 1000 if stage.processed else 0.0
+            self.logger.info(
+                f"Stage {stage.stage_name}: {stage.processed / elapsed:.1f} items/s, "
+                f"{service_ms:.1f} ms/item, {stage.busy_time / elapsed:.0%} busy"
+                f"{f', {stage.errors} errors' if stage.errors else ''}"
+            )
+        for q in self.queues:
+            stats = q.stats()
+            self.logger.info(
+                f"Queue {stats['name']}: depth {stats['depth']}/{stats['maxsize']} "
+                f"(max {stats['max_depth']}), {stats['puts']} put, {stats['dropped']} dropped, "
+                f"producer blocked {stats['blocked_time']:.2f}s"
+            )
+        bottleneck = max(self.stages, key=lambda stage: stage.busy_time)
+        self.logger.info(f"Pipeline bottleneck: {bottleneck.stage_name}")
@@ -0,0 +1,483 @@
+"""
+配置对象：config/settings.yaml 在每个进程中只解析和校验一次，
+得到不可变的分节对象（frozen dataclass），各组件通过构造参数注入后按属性访问，
+热路径中不再查找字典键。
+
+字段的默认值即配置文件缺少该项时的取值；未知的键、类型错误和超出范围的取值
+在启动时直接报错（ValueError），而不是在运行中途出现 KeyError。
+"""
+
+import time
+import logging
+import threading
+import dataclasses
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, Union, get_args, get_origin
+
+import yaml
+
+DEFAULT_SETTINGS_PATH = "config/settings.yaml"
+
+FRAME_SOURCES = ('device', 'video', 'images', 'synthetic')
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+def _check(condition, message):
+    if not condition:
+        raise ValueError(message)
+
+
+@dataclass(frozen=True)
+class VideoSettings:
+    path: Optional[str] = None
+    realtime: bool = True
+    loop: bool = False
+
+
+@dataclass(frozen=True)
+class ImagesSettings:
+    path: Optional[str] = None
+    fps: float = 0.0
+    loop: bool = False
+
+
+@dataclass(frozen=True)
+class SyntheticSettings:
+    faces_dir: str = "data/faces"
+    backgrounds_dir: Optional[str] = None
+    faces_per_frame: int = 1
+    face_size: Tuple[int, ...] = (80, 160)
+    frame_count: int = 0
+    fps: Optional[float] = None     # 为None时使用 camera.fps
+    seed: int = 0
+
+    def __post_init__(self):
+        _check(len(self.face_size) == 2 and 0 < self.face_size[0] <= self.face_size[1],
+               f"camera.synthetic.face_size must be [min, max], got {list(self.face_size)}")
+
+
+@dataclass(frozen=True)
+class CameraSettings:
+    device_id: int = 0
+    width: int = 640
+    height: int = 480
+    fps: float = 30.0
+    threaded: bool = False
+    buffer_size: int = 3
+    source: str = "device"
+    video: VideoSettings = field(default_factory=VideoSettings)
+    images: ImagesSettings = field(default_factory=ImagesSettings)
+    synthetic: SyntheticSettings = field(default_factory=SyntheticSettings)
+    # 多摄像头（cameras 中的每项）专用
+    id: Union[int, str, None] = None
+    cpus: Tuple[int, ...] = ()
+
+    def __post_init__(self):
+        _check(self.source in FRAME_SOURCES,
+               f"camera.source must be one of {', '.join(FRAME_SOURCES)}, got {self.source!r}")
+        _check(self.width > 0 and self.height > 0, f"camera size must be positive, got {self.width}x{self.height}")
+        _check(self.buffer_size >= 3, f"camera.buffer_size must be at least 3, got {self.buffer_size}")
+        _check(self.source != 'video' or self.video.path, "camera.video.path is required for source 'video'")
+        _check(self.source != 'images' or self.images.path, "camera.images.path is required for source 'images'")
+
+
+@dataclass(frozen=True)
+class MultiCameraSettings:
+    reorder_window: float = 0.2
+    display: bool = False
+    ring_slots: int = 4
+
+    def __post_init__(self):
+        _check(self.ring_slots >= 2, f"multi_camera.ring_slots must be at least 2, got {self.ring_slots}")
+
+
+@dataclass(frozen=True)
+class RoiSettings:
+    enabled: bool = False
+    expand: float = 0.5
+    full_scan_interval: int = 10
+
+
+@dataclass(frozen=True)
+class QualitySettings:
+    enabled: bool = False
+    min_size: Optional[int] = None  # 为None时使用 face_recognition.min_face_size（开启 coarse_to_fine 时为其一半）
+    blur_threshold: float = 40.0
+    min_aspect: float = 0.65
+    max_aspect: float = 1.5
+
+
+@dataclass(frozen=True)
+class CompactionSettings:
+    enabled: bool = False
+    max_per_identity: int = 20
+    prototypes: int = 5
+    outlier_distance: float = 0.6
+    exact_recheck: bool = False
+
+
+@dataclass(frozen=True)
+class AnnIndexSettings:
+    enabled: bool = False
+    min_size: int = 2000
+    nlist: Optional[int] = None
+    nprobe: int = 8
+    target_recall: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class FaceRecognitionSettings:
+    tolerance: float = 0.6
+    min_face_size: int = 20
+    capture_count: int = 10
+    capture_interval: float = 1.0
+    model_type: str = "hog"
+    detection_scale: Union[float, str] = "auto"
+    detection_upsample: int = 0
+    coarse_to_fine: bool = False
+    encoding_cache: Optional[str] = None
+    gallery_file: Optional[str] = None
+    load_workers: int = 1
+    load_chunk_size: int = 8
+    roi: RoiSettings = field(default_factory=RoiSettings)
+    quality: QualitySettings = field(default_factory=QualitySettings)
+    compaction: CompactionSettings = field(default_factory=CompactionSettings)
+    ann_index: AnnIndexSettings = field(default_factory=AnnIndexSettings)
+
+    def __post_init__(self):
+        _check(0 < self.tolerance <= 1, f"face_recognition.tolerance must be in (0, 1], got {self.tolerance}")
+        _check(self.model_type in ('hog', 'cnn'),
+               f"face_recognition.model_type must be 'hog' or 'cnn', got {self.model_type!r}")
+        _check(self.detection_scale == 'auto' or (
+                   not isinstance(self.detection_scale, str) and 0 < self.detection_scale <= 1),
+               f"face_recognition.detection_scale must be 'auto' or in (0, 1], got {self.detection_scale!r}")
+
+
+@dataclass(frozen=True)
+class TrackingSettings:
+    enabled: bool = False
+    detect_interval: int = 5
+    iou_threshold: float = 0.3
+    min_confidence: float = 0.6
+    max_missed: int = 2
+
+    def __post_init__(self):
+        _check(self.detect_interval >= 1, f"tracking.detect_interval must be at least 1, got {self.detect_interval}")
+
+
+@dataclass(frozen=True)
+class GalleryWatchSettings:
+    enabled: bool = False
+    interval: float = 2.0
+
+
+@dataclass(frozen=True)
+class MotionGateSettings:
+    enabled: bool = False
+    scale: float = 0.125
+    pixel_threshold: int = 15
+    motion_ratio: float = 0.002
+    refresh_interval: int = 30
+
+
+@dataclass(frozen=True)
+class IdentityCacheSettings:
+    enabled: bool = False
+    reverify_interval: float = 1.0
+    min_iou: float = 0.5
+    half_life: float = 2.0
+    min_confidence: float = 0.3
+
+
+@dataclass(frozen=True)
+class RecognitionEventsSettings:
+    window: int = 15
+    min_votes: int = 5
+    vote_ratio: float = 0.6
+    present_interval: float = 60.0
+    leave_timeout: float = 3.0
+    store_to_memory: bool = False
+
+    def __post_init__(self):
+        _check(0 < self.vote_ratio <= 1, f"recognition_events.vote_ratio must be in (0, 1], got {self.vote_ratio}")
+        _check(self.window >= 1, f"recognition_events.window must be at least 1, got {self.window}")
+
+
+@dataclass(frozen=True)
+class PipelineSettings:
+    enabled: bool = False
+    frame_queue_depth: int = 2
+    display_queue_depth: int = 1
+    event_queue_depth: int = 256
+    stats_interval: float = 10.0
+
+    def __post_init__(self):
+        _check(min(self.frame_queue_depth, self.display_queue_depth, self.event_queue_depth) >= 1,
+               "pipeline queue depths must be at least 1")
+
+
+@dataclass(frozen=True)
+class AdaptiveQualitySettings:
+    enabled: bool = False
+    target_latency: float = 0.1
+    window: int = 30
+    headroom: float = 0.6
+    recover_windows: int = 3
+    min_scale: float = 0.25
+    max_detect_interval: int = 15
+    max_reverify_interval: float = 5.0
+
+    def __post_init__(self):
+        _check(self.target_latency > 0, f"adaptive_quality.target_latency must be positive, got {self.target_latency}")
+        _check(0 < self.headroom < 1, f"adaptive_quality.headroom must be in (0, 1), got {self.headroom}")
+
+
+@dataclass(frozen=True)
+class MetricsSettings:
+    enabled: bool = False
+    interval: float = 10.0
+    jsonl_path: Optional[str] = None
+    prometheus_port: Optional[int] = None
+    prometheus_host: str = "127.0.0.1"
+
+
+@dataclass(frozen=True)
+class SettingsWatchSettings:
+    enabled: bool = False
+    interval: float = 2.0
+
+
+@dataclass(frozen=True)
+class TrainingSettings:
+    face_encoding_model: str = "hog"
+    save_interval: int = 5
+
+
+@dataclass(frozen=True)
+class VoiceSettings:
+    enabled: bool = False
+    language: str = "zh-CN"
+    volume: float = 0.8
+    rate: int = 150
+
+
+@dataclass(frozen=True)
+class LoggingSettings:
+    level: str = "INFO"
+    app_log: str = "logs/app.log"
+    max_bytes: int = 10 * 1024 * 1024
+    rotate_when: Optional[str] = None
+    backup_count: int = 5
+    queue_size: int = 10000
+    save_images: bool = True
+    save_audio: bool = True
+    log_file: str = "logs/training_log.txt"
+
+    def __post_init__(self):
+        _check(self.level.upper() in LOG_LEVELS,
+               f"logging.level must be one of {', '.join(LOG_LEVELS)}, got {self.level!r}")
+
+
+@dataclass(frozen=True)
+class MemorySettings:
+    db_path: str = "data/memory.db"
+    backup_interval: float = 3600
+    max_entries: int = 10000
+    retention_days: int = 30
+
+
+@dataclass(frozen=True)
+class BondingSettings:
+    initial_score: float = 0.5
+    learning_rate: float = 0.01
+    update_interval: float = 3600
+    decay_factor: float = 0.95
+
+
+@dataclass(frozen=True)
+class Settings:
+    camera: CameraSettings = field(default_factory=CameraSettings)
+    # 多摄像头：每项为合并了 camera 部分后的完整摄像头配置
+    cameras: Tuple[CameraSettings, ...] = ()
+    multi_camera: MultiCameraSettings = field(default_factory=MultiCameraSettings)
+    face_recognition: FaceRecognitionSettings = field(default_factory=FaceRecognitionSettings)
+    tracking: TrackingSettings = field(default_factory=TrackingSettings)
+    gallery_watch: GalleryWatchSettings = field(default_factory=GalleryWatchSettings)
+    motion_gate: MotionGateSettings = field(default_factory=MotionGateSettings)
+    identity_cache: IdentityCacheSettings = field(default_factory=IdentityCacheSettings)
+    recognition_events: RecognitionEventsSettings = field(default_factory=RecognitionEventsSettings)
+    pipeline: PipelineSettings = field(default_factory=PipelineSettings)
+    adaptive_quality: AdaptiveQualitySettings = field(default_factory=AdaptiveQualitySettings)
+    metrics: MetricsSettings = field(default_factory=MetricsSettings)
+    settings_watch: SettingsWatchSettings = field(default_factory=SettingsWatchSettings)
+    training: TrainingSettings = field(default_factory=TrainingSettings)
+    voice: VoiceSettings = field(default_factory=VoiceSettings)
+    logging: LoggingSettings = field(default_factory=LoggingSettings)
+    memory: MemorySettings = field(default_factory=MemorySettings)
+    bonding: BondingSettings = field(default_factory=BondingSettings)
+    camera_index: int = 0
+    face_distance_threshold: float = 0.45
+    encoding_output_path: str = "data/master_face_encoding.pkl"
+    # 加载来源（不来自配置文件）
+    path: Optional[str] = None
+
+
+def _convert(value, annotation, key):
+    """按字段注解校验并转换一个配置值"""
+    origin = get_origin(annotation)
+
+    if dataclasses.is_dataclass(annotation):
+        _check(isinstance(value, dict), f"{key} must be a mapping, got {type(value).__name__}")
+        return _build(annotation, value, key)
+
+    if origin is Union:
+        options = get_args(annotation)
+        if value is None:
+            _check(type(None) in options, f"{key} must not be empty")
+            return None
+        errors = []
+        for option in options:
+            if option is type(None):
+                continue
+            try:
+                return _convert(value, option, key)
+            except ValueError as e:
+                errors.append(str(e))
+        raise ValueError(errors[0] if len(errors) == 1 else f"{key} has an invalid value {value!r}")
+
+    if origin is tuple:
+        _check(isinstance(value, (list, tuple)), f"{key} must be a list, got {type(value).__name__}")
+        item_type = get_args(annotation)[0]
+        return tuple(_convert(item, item_type, f"{key}[{i}]") for i, item in enumerate(value))
+
+    # YAML 中的整数可以用于浮点字段；布尔值不当作数字
+    if annotation is float:
+        _check(isinstance(value, (int, float)) and not isinstance(value, bool),
+               f"{key} must be a number, got {value!r}")
+        return float(value)
+    if annotation is int:
+        _check(isinstance(value, int) and not isinstance(value, bool), f"{key} must be an integer, got {value!r}")
+        return value
+    _check(isinstance(value, annotation), f"{key} must be {annotation.__name__}, got {value!r}")
+    return value
+
+
+def _build(cls, data, prefix):
+    """由配置字典创建分节对象，拒绝未知的键"""
+    fields = {f.name: f for f in dataclasses.fields(cls)}
+    keys = {name: f"{prefix}.{name}" if prefix else name for name in data}
+    unknown = sorted(keys[name] for name in data if name not in fields)
+    _check(not unknown, f"Unknown setting {', '.join(unknown)}")
+    values = {name: _convert(value, fields[name].type, keys[name]) for name, value in data.items()}
+    return cls(**values)
+
+
+def parse_settings(raw, path=None):
+    """
+    校验配置字典并创建配置对象
+
+    Args:
+        raw (dict): yaml.safe_load 的结果
+        path: 配置文件路径（记录在 Settings.path 中）
+
+    Returns:
+        Settings: 不可变的配置对象
+
+    Raises:
+        ValueError: 未知的键、类型错误或取值超出范围
+    """
+    raw = dict(raw or {})
+    camera = raw.get('camera') or {}
+    # cameras 中的每项覆盖 camera 部分的同名配置
+    cameras = raw.pop('cameras', None) or []
+    _check(isinstance(cameras, list), "cameras must be a list")
+    settings = _build(Settings, raw, "")
+    entries = tuple(
+        _build(CameraSettings, {**camera, **entry}, f"cameras[{index}]")
+        for index, entry in enumerate(cameras)
+    )
+    return dataclasses.replace(settings, cameras=entries, path=str(path) if path else None)
+
+
+# 每个进程按路径缓存已加载的配置
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_settings(path=DEFAULT_SETTINGS_PATH, reload=False):
+    """
+    加载配置（每个进程只解析一次，之后返回同一个对象）
+
+    Args:
+        path: 配置文件路径
+        reload (bool): 重新读取文件（校验失败时抛出异常，缓存保持不变）
+
+    Returns:
+        Settings: 不可变的配置对象
+    """
+    key = str(Path(path).resolve())
+    with _cache_lock:
+        if not reload and key in _cache:
+            return _cache[key]
+        with open(path, 'r', encoding='utf-8') as f:
+            settings = parse_settings(yaml.safe_load(f), path)
+        _cache[key] = settings
+        return settings
+
+
+class SettingsWatcher(threading.Thread):
+    def __init__(self, on_change, path=DEFAULT_SETTINGS_PATH, interval=2.0):
+        """
+        初始化配置监视线程
+
+        定期检查配置文件的大小和修改时间，变化时重新加载并校验，
+        成功后把新的配置对象交给 on_change；校验失败时记录错误并继续使用原配置。
+
+        Args:
+            on_change: on_change(settings) 回调，在监视线程中调用
+            path: 配置文件路径
+            interval (float): 轮询间隔（秒）
+        """
+        super().__init__(name="SettingsWatcher", daemon=True)
+        self.on_change = on_change
+        self.path = Path(path)
+        self.interval = interval
+        self.logger = logging.getLogger(__name__)
+
+        self._stop_event = threading.Event()
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        """记录配置文件的 (大小, 修改时间)"""
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def run(self):
+        """轮询循环"""
+        while not self._stop_event.wait(self.interval):
+            snapshot = self._take_snapshot()
+            if snapshot is None or snapshot == self._snapshot:
+                continue
+            self._snapshot = snapshot
+
+            start = time.perf_counter()
+            try:
+                settings = load_settings(self.path, reload=True)
+            except Exception as e:
+                self.logger.error(f"Settings reload failed, keeping previous settings: {str(e)}")
+                continue
+            self.logger.info(f"Settings reloaded from {self.path} in {(time.perf_counter() - start) * 1000:.1f}ms")
+            try:
+                self.on_change(settings)
+            except Exception as e:
+                self.logger.error(f"Applying reloaded settings failed: {str(e)}")
+
+    def stop(self):
+        """停止监视线程"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=self.interval + 1)
@@ -0,0 +1,214 @@
+"""
+基于 multiprocessing.shared_memory 的跨进程帧环形缓冲。
+
+像素数据只写一次：采集进程直接写入共享内存中的槽，检测、编码、显示等进程
+按 (槽号, 序号) 映射同一个槽读取，进程之间只传递两个整数，不复制也不 pickle 图像。
+
+每个槽有一个序号和读者计数：
+    - 写者只会写入没有读者持有、也不是最新帧的槽；没有空闲槽时丢弃该帧而不是等待
+    - 读者持有槽期间该槽不会被覆盖；按 (槽号, 序号) 获取时若槽已被覆盖则返回 None
+"""
+
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 控制块：每个槽的序号、读者计数（int64）和时间戳（float64）
+_SEQ, _READERS, _TIMESTAMP = range(3)
+
+
+class SharedFrameRing:
+    def __init__(self, frame_shape, dtype=np.uint8, slots=4, name=None, context=None):
+        """
+        创建帧环形缓冲（拥有者进程调用，子进程通过 Process 参数传递后自动映射）
+
+        Args:
+            frame_shape (tuple): 单帧形状，如 (480, 640, 3)
+            dtype: 像素类型
+            slots (int): 槽数量（至少 2 个：最新帧和写入中）
+            name (str): 共享内存名称，留空自动生成
+            context: multiprocessing 上下文，用于创建跨进程的条件变量
+        """
+        if slots < 2:
+            raise ValueError("SharedFrameRing needs at least 2 slots")
+
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.dropped = 0
+
+        context = context or multiprocessing
+        self._cond = context.Condition(context.Lock())
+        # 全局最新帧的槽号与序号
+        self._latest = context.Value('q', -1, lock=False)
+        self._next_seq = context.Value('q', 0, lock=False)
+
+        control_bytes = slots * 3 * 8
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=True, size=control_bytes + slots * self.frame_bytes
+        )
+        self._owner = True
+        self._attach()
+        self._control[:] = 0
+
+    def _attach(self):
+        """在共享内存上建立控制块和各槽的数组视图"""
+        buffer = self._shm.buf
+        self._control = np.ndarray((self.slots, 3), dtype=np.int64, buffer=buffer)
+        self._timestamps = self._control[:, _TIMESTAMP].view(np.float64)
+        offset = self._control.nbytes
+        self._frames = np.ndarray(
+            (self.slots,) + self.frame_shape, dtype=self.dtype, buffer=buffer, offset=offset
+        )
+
+    def __getstate__(self):
+        return {
+            'frame_shape': self.frame_shape,
+            'dtype': self.dtype.str,
+            'slots': self.slots,
+            'frame_bytes': self.frame_bytes,
+            'name': self._shm.name,
+            'cond': self._cond,
+            'latest': self._latest,
+            'next_seq': self._next_seq,
+        }
+
+    def __setstate__(self, state):
+        self.frame_shape = state['frame_shape']
+        self.dtype = np.dtype(state['dtype'])
+        self.slots = state['slots']
+        self.frame_bytes = state['frame_bytes']
+        self.dropped = 0
+        self._cond = state['cond']
+        self._latest = state['latest']
+        self._next_seq = state['next_seq']
+        self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._owner = False
+        self._attach()
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def begin_write(self):
+        """
+        取一个空闲槽供写入
+
+        Returns:
+            tuple: (槽号, 该槽的数组视图)；所有其他槽都被读者持有时返回 (None, None)，该帧应丢弃
+        """
+        with self._cond:
+            latest = self._latest.value
+            candidates = [
+                i for i in range(self.slots)
+                if i != latest and self._control[i, _READERS] == 0
+            ]
+            if not candidates:
+                self.dropped += 1
+                return None, None
+            # 覆盖最旧的槽，并立即作废其序号，防止读者按旧序号取到写了一半的数据
+            slot = min(candidates, key=lambda i: self._control[i, _SEQ])
+            self._control[slot, _SEQ] = -1
+        return slot, self._frames[slot]
+
+    def commit(self, slot, timestamp=None):
+        """
+        发布写入完成的槽，成为最新帧并唤醒等待的读者
+
+        Args:
+            slot (int): begin_write 返回的槽号
+            timestamp (float): 采集时间，留空使用当前时间
+
+        Returns:
+            int: 该帧的序号
+        """
+        with self._cond:
+            self._next_seq.value += 1
+            seq = self._next_seq.value
+            self._control[slot, _SEQ] = seq
+            self._timestamps[slot] = time.time() if timestamp is None else timestamp
+            self._latest.value = slot
+            self._cond.notify_all()
+        return seq
+
+    def write(self, frame, timestamp=None):
+        """
+        复制一帧到空闲槽并发布（已有图像时使用；采集设备可以直接写入 begin_write 的视图）
+
+        Args:
+            frame: 图像
+            timestamp (float): 采集时间
+
+        Returns:
+            tuple: (槽号, 序号)，丢帧时为 (None, None)
+        """
+        slot, view = self.begin_write()
+        if slot is None:
+            return None, None
+        np.copyto(view, frame)
+        return slot, self.commit(slot, timestamp)
+
+    def acquire_latest(self, after_seq=0, timeout=1.0):
+        """
+        等待并持有比 after_seq 更新的最新帧
+
+        Args:
+            after_seq (int): 上次读到的序号
+            timeout (float): 最长等待时间（秒）
+
+        Returns:
+            tuple: (槽号, 序号, 时间戳, 只读数组视图)，超时返回 None；用完后需 release(槽号)
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._latest.value >= 0
+                and self._control[self._latest.value, _SEQ] > after_seq,
+                timeout
+            ):
+                return None
+            slot = self._latest.value
+            self._control[slot, _READERS] += 1
+            return slot, int(self._control[slot, _SEQ]), float(self._timestamps[slot]), self._view(slot)
+
+    def acquire(self, slot, seq):
+        """
+        按其他进程传来的 (槽号, 序号) 持有同一帧
+
+        Args:
+            slot (int): 槽号
+            seq (int): 序号
+
+        Returns:
+            numpy.ndarray: 只读数组视图；该槽已被新帧覆盖时返回 None；用完后需 release(槽号)
+        """
+        with self._cond:
+            if self._control[slot, _SEQ] != seq:
+                return None
+            self._control[slot, _READERS] += 1
+            return self._view(slot)
+
+    def release(self, slot):
+        """
+        释放持有的槽
+
+        Args:
+            slot (int): 槽号
+        """
+        with self._cond:
+            if self._control[slot, _READERS] > 0:
+                self._control[slot, _READERS] -= 1
+
+    def _view(self, slot):
+        view = self._frames[slot].view()
+        view.flags.writeable = False
+        return view
+
+    def close(self):
+        """解除映射；拥有者进程同时删除共享内存"""
+        self._control = self._timestamps = self._frames = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()